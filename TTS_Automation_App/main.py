@@ -5,19 +5,52 @@ TTS Automation Tool
 - CapCut Automation: Tự động hóa flow TTS trên CapCut Desktop
 - API Export: Xuất trực tiếp audio qua Edge TTS (miễn phí)
 
-Sử dụng: python main.py
+Sử dụng:
+    python main.py                      # Mở giao diện
+    python main.py --serve [--port N]   # Chạy job server (không GUI)
 """
+import argparse
 import sys
 import os
 
 # Thêm project root vào path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from src.gui.main_window import MainWindow
+
+def serve(args):
+    """Chạy job server export nền (không cần GUI)"""
+    from src.core.config_manager import ConfigManager
+    from src.core.job_server import ExportJobServer
+    from src.utils.logger import AppLogger
+
+    config = ConfigManager()
+    logger = AppLogger()
+    logger.set_gui_callback(print)
+
+    server = ExportJobServer(
+        config_manager=config,
+        host=args.host or config.get_setting('server.host', '127.0.0.1'),
+        port=args.port if args.port is not None else config.get_setting('server.port', 8765),
+        workers=args.workers or config.get_setting('server.workers', 2),
+        logger=logger,
+    )
+    server.serve_forever()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="TTS Automation Tool")
+    parser.add_argument('--serve', action='store_true', help="Chạy job server export (không GUI)")
+    parser.add_argument('--host', default=None, help="Địa chỉ bind của job server")
+    parser.add_argument('--port', type=int, default=None, help="Cổng của job server")
+    parser.add_argument('--workers', type=int, default=None, help="Số worker chạy job song song")
+    args = parser.parse_args()
+
     try:
+        if args.serve:
+            serve(args)
+            return
+
+        from src.gui.main_window import MainWindow
         app = MainWindow()
         app.run()
     except KeyboardInterrupt:
@@ -30,4 +63,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Bản build PyInstaller: process pool (load thư mục nhiều file) cần freeze_support
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
@@ -2,10 +2,17 @@
 API Engine - Xuất âm thanh TTS trực tiếp qua Edge TTS (miễn phí)
 """
 import asyncio
+import bisect
 import os
+import random
 import threading
 import time
 
+import numpy as np
+
+from src.core.data_manager import WorkList, format_id_list
+from src.utils.audio_utils import split_mp3
+
 
 class APIEngine:
     """TTS API Client sử dụng Edge TTS (miễn phí, chất lượng cao)"""
@@ -37,6 +44,16 @@ class APIEngine:
         ],
     }
 
+    # Dấu kết câu: dòng không có sẽ được thêm "." khi gộp để TTS ngắt câu rõ
+    SENTENCE_ENDINGS = ('.', '!', '?', '…', '。', '！', '？')
+
+    # WordBoundary offset/duration của Edge TTS tính theo đơn vị 100ns
+    TICKS_PER_SECOND = 10_000_000
+
+    # Ước tính khi giọng chưa có tốc độ học được: mỗi request = độ trễ + ký tự / tốc độ stream
+    EST_REQUEST_SECONDS = 0.8
+    EST_STREAM_CHARS_PER_SEC = 80.0
+
     def __init__(self, callbacks=None):
         """
         callbacks: dict với các key:
@@ -50,12 +67,23 @@ class APIEngine:
         self.callbacks = callbacks or {}
         self.is_running = False
         self._stop_event = threading.Event()
+        self.cancel_event = None  # Event bên ngoài (VD job bị hủy ở job server): set → dừng, _begin_batch không xóa
         self.current_voice = "vi-VN-HoaiMyNeural"
         self.output_format = "mp3"
 
         # Enhanced features
         self.retry_attempts = 2
+        self.max_concurrent = 3
+        self.backoff_base = 1.0
+        self.backoff_max = 30.0
         self.auto_backup = False
+
+        # Request coalescing: gộp nhiều dòng ngắn liên tiếp vào 1 request
+        self.coalesce_short_lines = False
+        self.coalesce_max_words = 6
+        self.coalesce_max_chars = 60
+        self.coalesce_max_items = 20
+
         self.failed_items = []
         self.completed_indices = []
         self.success_count = 0
@@ -85,18 +113,34 @@ class APIEngine:
         """Đặt số lần retry"""
         self.retry_attempts = max(0, int(attempts))
 
+    def set_max_concurrent(self, count):
+        """Đặt số request đồng thời tối đa"""
+        self.max_concurrent = max(1, int(count))
+
     def set_auto_backup(self, enabled):
         """Bật/tắt auto backup"""
         self.auto_backup = enabled
 
+    def set_coalescing(self, enabled, max_words=None, max_items=None):
+        """Bật/tắt gộp dòng ngắn vào 1 request"""
+        self.coalesce_short_lines = bool(enabled)
+        if max_words is not None:
+            self.coalesce_max_words = max(1, int(max_words))
+        if max_items is not None:
+            self.coalesce_max_items = max(2, int(max_items))
+
+    async def _synthesize_checked(self, text, output_path, voice=None):
+        """Tổng hợp giọng nói cho 1 đoạn text, raise exception nếu lỗi"""
+        import edge_tts
+
+        voice = voice or self.current_voice
+        communicate = edge_tts.Communicate(text, voice)
+        await communicate.save(output_path)
+
     async def _synthesize_one(self, text, output_path, voice=None):
         """Tổng hợp giọng nói cho 1 đoạn text"""
         try:
-            import edge_tts
-
-            voice = voice or self.current_voice
-            communicate = edge_tts.Communicate(text, voice)
-            await communicate.save(output_path)
+            await self._synthesize_checked(text, output_path, voice)
             return True
         except Exception as e:
             self._log(f"❌ API Error: {e}")
@@ -123,6 +167,11 @@ class APIEngine:
                 pass
         return None
 
+    def _backoff_delay(self, attempt):
+        """Exponential backoff có jitter: ~1s, 2s, 4s... (tối đa backoff_max)"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
     def export_single(self, dialog_id, text, export_dir, voice=None):
         """Export 1 dialog thành file audio"""
         os.makedirs(export_dir, exist_ok=True)
@@ -150,70 +199,322 @@ class APIEngine:
         for attempt in range(self.retry_attempts + 1):
             if attempt > 0:
                 self._log(f"🔄 Retry lần {attempt}/{self.retry_attempts}: {dialog_id}")
-                time.sleep(1)
+                time.sleep(self._backoff_delay(attempt))
 
             success = self.export_single(dialog_id, text, export_dir, voice)
             if success:
                 return True
 
-            if self._stop_event.is_set():
+            if self._stopped():
                 return False
 
         return False
 
-    def export_batch(self, data_rows, key_col, text_col, export_dir,
-                     voice=None, resume_from=None):
+    # ==================== Concurrent Scheduler ====================
+
+    async def _export_item_async(self, item, voice=None):
         """
-        Export batch nhiều dialog.
-        data_rows: list of dicts
-        resume_from: set of indices đã hoàn thành (để resume session)
+        Export 1 item với retry + backoff.
+        item: dict {index, dialog_id, text, export_dir, level}
+        Returns: (success, error_msg)
         """
-        self.is_running = True
-        self._stop_event.clear()
-        self.failed_items = []
-        self.completed_indices = list(resume_from) if resume_from else []
-        self.success_count = 0
-        self.error_count = 0
-        self.skipped_count = 0
+        dialog_id = item['dialog_id']
+        filepath = self._item_path(item)
+        self._backup_file(filepath)
 
-        total = len(data_rows)
+        error = ''
+        for attempt in range(self.retry_attempts + 1):
+            if attempt > 0:
+                if self._stopped():
+                    break
+                self._log(f"🔄 Retry lần {attempt}/{self.retry_attempts}: {dialog_id}")
+                await asyncio.sleep(self._backoff_delay(attempt))
 
-        self._log(f"🚀 Bắt đầu export {total} dialogs qua API...")
+            self._emit('on_start', dialog_id)
+            self._log(f"🔊 Đang tạo: {dialog_id}")
+            try:
+                await self._synthesize_checked(item['text'], filepath, voice)
+                self._emit('on_complete', dialog_id, filepath)
+                self._log(f"✅ Đã lưu: {filepath}")
+                return True, ''
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                self._log(f"❌ API Error: {e}")
+                self._emit('on_error', dialog_id, error)
+
+        return False, error
+
+    def _item_path(self, item):
+        """Đường dẫn output của item: theo ExecutionPlan nếu có, ngược lại <export_dir>/<dialog_id>.<format>"""
+        return item.get('output_path') or os.path.join(item['export_dir'], f"{item['dialog_id']}.{self.output_format}")
+
+    def _run_items(self, items, voice, on_done):
+        """
+        Chạy items qua scheduler đồng thời (tối đa max_concurrent request cùng lúc).
+        items: iterable các item dict, được lấy dần (không tạo task cho toàn bộ batch)
+        on_done(item, success, error_msg): gọi sau mỗi item
+        """
+        iterator = self._coalesce_units(items)
+
+        async def worker():
+            for unit in iterator:
+                if self._stopped():
+                    return
+                if len(unit) > 1 and await self._export_group_async(unit, voice):
+                    for item in unit:
+                        on_done(item, True, '')
+                    continue
+
+                # Item đơn, hoặc nhóm không tách được → export từng dòng
+                for item in unit:
+                    if self._stopped():
+                        return
+                    success, error = await self._export_item_async(item, voice)
+                    on_done(item, success, error)
+
+        async def run_all():
+            await asyncio.gather(*(worker() for _ in range(self.max_concurrent)))
 
-        if resume_from:
-            self._log(f"📂 Tiếp tục từ session trước ({len(resume_from)} đã xong)")
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(run_all())
+        finally:
+            loop.close()
+
+    # ==================== Request Coalescing ====================
 
-        for i, row in enumerate(data_rows):
-            if self._stop_event.is_set():
-                self._log("🛑 Đã dừng bởi người dùng.")
-                break
+    def _is_short(self, text):
+        """Dòng đủ ngắn để gộp (nhiều dòng ngắn tốn chủ yếu thời gian bắt tay request)"""
+        return len(text) <= self.coalesce_max_chars and len(text.split()) <= self.coalesce_max_words
 
-            # Skip nếu đã xử lý (resume mode)
-            if resume_from and i in resume_from:
+    def _coalesce_units(self, items):
+        """
+        Nhóm các item ngắn liên tiếp (cùng thư mục) thành 1 đơn vị request.
+        Yields: list item (1 phần tử nếu không gộp)
+        """
+        enabled = self.coalesce_short_lines and self.output_format == 'mp3'
+        group = []
+        for item in items:
+            if not (enabled and self._is_short(item['text'])):
+                if group:
+                    yield group
+                    group = []
+                yield [item]
                 continue
 
-            dialog_id = str(row[key_col])
-            text = str(row[text_col])
+            if group and group[-1]['export_dir'] != item['export_dir']:
+                yield group
+                group = []
+            group.append(item)
+            if len(group) >= self.coalesce_max_items:
+                yield group
+                group = []
+        if group:
+            yield group
+
+    @staticmethod
+    def _normalize_word(text):
+        return ''.join(ch for ch in text.lower() if ch.isalnum())
 
-            if not text or text.strip() == '' or text == 'nan':
-                self._log(f"⏭️ Bỏ qua (trống): {dialog_id}")
-                self.skipped_count += 1
+    @classmethod
+    def _segment_gaps(cls, texts, boundaries):
+        """
+        Căn WordBoundary với từng dòng để tìm khoảng lặng giữa các dòng.
+        boundaries: list (offset_s, duration_s, word) theo thứ tự phát
+        Returns: list len(texts) - 1 khoảng (hết từ cuối dòng trước, bắt đầu từ đầu dòng sau) tính bằng giây,
+                 hoặc None nếu không căn được
+        """
+        normalized = [cls._normalize_word(t) for t in texts]
+        if not all(normalized):
+            return None
+
+        ends = []
+        position = 0
+        for word in normalized:
+            position += len(word)
+            ends.append(position)
+        joined = ''.join(normalized)
+
+        first_start = [None] * len(texts)
+        last_end = [None] * len(texts)
+        cursor = 0
+        for offset, duration, word in boundaries:
+            word = cls._normalize_word(word)
+            if not word:
                 continue
+            pos = joined.find(word, cursor)
+            if pos < 0:
+                return None
+            segment = bisect.bisect_right(ends, pos)
+            cursor = pos + len(word)
+            if first_start[segment] is None:
+                first_start[segment] = offset
+            last_end[segment] = offset + duration
+
+        if None in first_start:
+            return None
+
+        # Khoảng lặng: sau từ cuối dòng trước, trước từ đầu dòng sau
+        gaps = [tuple(sorted((last_end[i - 1], first_start[i]))) for i in range(1, len(texts))]
+        cuts = [(start + end) / 2 for start, end in gaps]
+        if any(b <= a for a, b in zip(cuts, cuts[1:])):
+            return None
+        return gaps
+
+    async def _stream_with_boundaries(self, text, voice=None):
+        """Tổng hợp text, trả về (mp3_bytes, list WordBoundary (offset_s, duration_s, word))"""
+        import edge_tts
+
+        voice = voice or self.current_voice
+        try:
+            communicate = edge_tts.Communicate(text, voice, boundary="WordBoundary")
+        except TypeError:
+            # edge-tts cũ: WordBoundary được gửi mặc định
+            communicate = edge_tts.Communicate(text, voice)
 
-            self._emit('on_progress', i + 1, total)
+        audio = bytearray()
+        boundaries = []
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio.extend(chunk["data"])
+            elif chunk["type"] == "WordBoundary":
+                boundaries.append((chunk["offset"] / self.TICKS_PER_SECOND,
+                                   chunk["duration"] / self.TICKS_PER_SECOND,
+                                   chunk["text"]))
+        return bytes(audio), boundaries
+
+    async def _export_group_async(self, group, voice=None):
+        """
+        Export nhóm dòng ngắn bằng 1 request rồi tách audio theo WordBoundary.
+        Returns: True nếu đã ghi đủ file cho mọi item; False → caller export từng dòng
+        """
+        texts = [item['text'].strip() for item in group]
+        joined = "\n".join(t if t.endswith(self.SENTENCE_ENDINGS) else t + "." for t in texts)
+        ids = [item['dialog_id'] for item in group]
 
-            if self._export_with_retry(dialog_id, text, export_dir, voice):
+        for dialog_id in ids:
+            self._emit('on_start', dialog_id)
+        self._log(f"⚡ Gộp {len(group)} dòng ngắn vào 1 request: {format_id_list(ids)}")
+
+        try:
+            audio, boundaries = await self._stream_with_boundaries(joined, voice)
+            gaps = self._segment_gaps(texts, boundaries)
+            if gaps is None:
+                raise ValueError("không căn được WordBoundary với từng dòng")
+            # Cắt giữa khoảng lặng; split_mp3 dời mốc trong khoảng lặng để tránh bit reservoir
+            segments = split_mp3(audio, [(start + end) / 2 for start, end in gaps], gaps)
+            if any(not segment for segment in segments):
+                raise ValueError("có đoạn audio rỗng sau khi tách")
+        except Exception as e:
+            self._log(f"⚠️ Không tách được nhóm ({e}) → export từng dòng")
+            return False
+
+        for item, segment in zip(group, segments):
+            filepath = self._item_path(item)
+            self._backup_file(filepath)
+            with open(filepath, 'wb') as f:
+                f.write(segment)
+            self._emit('on_complete', item['dialog_id'], filepath)
+            self._log(f"✅ Đã lưu: {filepath}")
+        return True
+
+    # ==================== Cost Estimate ====================
+
+    def estimate_row_costs(self, text_lengths, synth_rate=None):
+        """
+        Thời gian ước tính (giây thực) cho từng dòng, vectorized theo mảng độ dài text.
+        synth_rate: ký tự / giây thực học được của giọng (đã gồm request song song);
+        None → (độ trễ request + ký tự / tốc độ stream) chia cho số request đồng thời
+        """
+        lengths = np.asarray(text_lengths, dtype=np.float64)
+        if synth_rate:
+            return lengths / synth_rate
+        return (self.EST_REQUEST_SECONDS + lengths / self.EST_STREAM_CHARS_PER_SEC) / self.max_concurrent
+
+    # ==================== Batch Processing ====================
+
+    def export_batch(self, data_rows, key_col=None, text_col=None, export_dir=None,
+                     voice=None, resume_from=None, level=None, reset_failed=True):
+        """
+        Export batch nhiều dialog (đồng thời, tối đa max_concurrent request).
+        data_rows: WorkList (từ DataManager.get_work_list) hoặc list of dicts + key_col/text_col
+        resume_from: set of indices đã hoàn thành (để resume session)
+        level: level của batch (lưu vào failed_items để lọc khi retry)
+        reset_failed: False để giữ failed_items của các batch trước (chạy nhiều level)
+        """
+        work = data_rows if isinstance(data_rows, WorkList) else WorkList.from_records(data_rows, key_col, text_col)
+        self._begin_batch(resume_from, reset_failed)
+        self.skipped_count = work.skipped_count
+
+        self._log(f"🚀 Bắt đầu export {work.total} dialogs qua API...")
+
+        if resume_from:
+            self._log(f"📂 Tiếp tục từ session trước ({len(resume_from)} đã xong)")
+
+        if work.skipped_count:
+            self._log(f"⏭️ Bỏ qua {work.skipped_count} dòng trống: {format_id_list(work.skipped_ids)}")
+
+        # Item được tạo dần khi scheduler cần, không dựng toàn bộ list
+        items = (
+            {'index': index, 'dialog_id': dialog_id, 'text': text,
+             'export_dir': export_dir, 'level': level}
+            for index, dialog_id, text in work
+            if not (resume_from and index in resume_from)
+        )
+
+        os.makedirs(export_dir, exist_ok=True)
+        done_before = work.skipped_count + work.count_resumed(resume_from)
+        return self._run_batch(items, voice, work.total, done_before)
+
+    def export_plan(self, plan, voice=None, reset_failed=True):
+        """
+        Export theo ExecutionPlan (src/core/execution_planner.py): đường dẫn output, dòng trống,
+        đã xong, đã có file, trùng đường dẫn đều được quyết định sẵn — chỉ chạy các dòng 'synthesize'.
+        """
+        counts = plan.counts()
+        self._begin_batch(plan.completed_indices(), reset_failed)
+        self.skipped_count = counts['skip'] + counts['exists'] + counts['duplicate']
+
+        self._log(f"🚀 Bắt đầu export {len(plan)} dialogs qua API "
+                  f"({counts['synthesize']} cần tạo)...")
+        if counts['cached']:
+            self._log(f"📂 Tiếp tục từ session trước ({counts['cached']} đã xong)")
+        for action, label in (('skip', 'dòng trống'), ('exists', 'đã có file'), ('duplicate', 'trùng đường dẫn')):
+            if counts[action]:
+                self._log(f"⏭️ Bỏ qua {counts[action]} {label}")
+
+        for export_dir in plan.export_dirs():
+            os.makedirs(export_dir, exist_ok=True)
+        return self._run_batch(plan.items(), voice, len(plan), len(plan) - counts['synthesize'])
+
+    def _begin_batch(self, completed, reset_failed):
+        """Reset trạng thái trước 1 batch"""
+        self.is_running = True
+        self._stop_event.clear()
+        if reset_failed:
+            self.failed_items = []
+        self.completed_indices = list(completed) if completed else []
+        self.success_count = 0
+        self.error_count = 0
+
+    def _run_batch(self, items, voice, total, done_before):
+        """Chạy items qua scheduler, cập nhật progress / đếm / failed_items"""
+        processed = [0]
+
+        def on_done(item, success, error):
+            processed[0] += 1
+            self._emit('on_progress', done_before + processed[0], total)
+            if success:
                 self.success_count += 1
-                self.completed_indices.append(i)
+                self.completed_indices.append(item['index'])
             else:
                 self.error_count += 1
-                self.failed_items.append({
-                    'index': i,
-                    'dialog_id': dialog_id,
-                    'text': text,
-                })
-                if self._stop_event.is_set():
-                    break
+                self.failed_items.append(dict(item, error=error))
+
+        self._run_items(items, voice, on_done)
+
+        if self._stopped():
+            self._log("🛑 Đã dừng bởi người dùng.")
 
         self.is_running = False
         self._log(f"🎉 Hoàn tất! ✅ {self.success_count} thành công, "
@@ -223,45 +524,60 @@ class APIEngine:
 
         return self.success_count, self.error_count
 
-    def retry_failed(self, export_dir, voice=None):
-        """Retry các items bị lỗi"""
-        if not self.failed_items:
+    def retry_failed(self, export_dir=None, voice=None, items=None):
+        """
+        Retry các items bị lỗi qua cùng scheduler + backoff như export chính.
+        export_dir: thư mục dùng cho item không lưu export_dir
+        items: chỉ retry tập con này (VD: lọc theo loại lỗi/level), mặc định tất cả
+        """
+        items_to_retry = list(self.failed_items if items is None else items)
+        if not items_to_retry:
             self._log("✅ Không có items cần retry")
             return 0, 0
 
         self.is_running = True
         self._stop_event.clear()
 
-        items_to_retry = list(self.failed_items)
-        self.failed_items = []
+        def item_key(item):
+            return item.get('index'), item.get('dialog_id'), item.get('export_dir')
+
+        retry_keys = {item_key(item) for item in items_to_retry}
+        self.failed_items = [item for item in self.failed_items if item_key(item) not in retry_keys]
 
         total = len(items_to_retry)
         self._log(f"🔄 Retry {total} items bị lỗi...")
 
-        retried_success = 0
-        retried_error = 0
-
-        for i, item in enumerate(items_to_retry):
-            if self._stop_event.is_set():
-                self._log("🛑 Đã dừng bởi người dùng.")
-                break
-
-            self._emit('on_progress', i + 1, total)
-            success = self.export_single(item['dialog_id'], item['text'], export_dir, voice)
+        retried = {'success': 0, 'error': 0}
+        processed_keys = set()
 
+        def on_done(item, success, error):
+            processed_keys.add(item_key(item))
+            self._emit('on_progress', len(processed_keys), total)
             if success:
-                retried_success += 1
+                retried['success'] += 1
                 self.success_count += 1
                 self.error_count -= 1
                 self.completed_indices.append(item['index'])
             else:
-                retried_error += 1
-                self.failed_items.append(item)
+                retried['error'] += 1
+                self.failed_items.append(dict(item, error=error))
+
+        prepared = [dict(item, export_dir=item.get('export_dir') or export_dir) for item in items_to_retry]
+        self._run_items(prepared, voice, on_done)
+
+        # Items chưa kịp chạy (do dừng) vẫn giữ trong failed_items
+        self.failed_items.extend(item for item in prepared if item_key(item) not in processed_keys)
+
+        if self._stopped():
+            self._log("🛑 Đã dừng bởi người dùng.")
 
         self.is_running = False
-        self._log(f"🔄 Retry hoàn tất! ✅ {retried_success} thành công, ❌ {retried_error} vẫn lỗi")
+        self._log(f"🔄 Retry hoàn tất! ✅ {retried['success']} thành công, ❌ {retried['error']} vẫn lỗi")
+
+        return retried['success'], retried['error']
 
-        return retried_success, retried_error
+    def _stopped(self):
+        return self._stop_event.is_set() or (self.cancel_event is not None and self.cancel_event.is_set())
 
     def stop(self):
         """Dừng batch export"""
@@ -18,6 +18,14 @@ DEFAULT_SETTINGS = {
     },
     'performance': {
         'max_concurrent_exports': 3,
+        'coalesce_max_words': 6,
+        'coalesce_max_items': 20,
+        'sqlite_store': False,
+    },
+    'server': {
+        'host': '127.0.0.1',
+        'port': 8765,
+        'workers': 2,
     },
     'notifications': {
         'sound_on_complete': True,
@@ -0,0 +1,91 @@
+"""
+CSV Table - Đọc CSV bằng module csv chuẩn (không cần pandas) cho đường chạy headless
+"""
+import csv
+import gc
+
+import numpy as np
+
+from src.core.data_manager import _NA_STRINGS
+
+
+class CsvTable:
+    """
+    Bảng CSV dạng cột: mỗi cột 1 mảng object (str, None = ô trống), dòng theo thứ tự file.
+    Đọc giống pd.read_csv(dtype=str): bỏ dòng trống hoàn toàn, chuỗi NA mặc định → ô trống,
+    dòng thiếu cột được bù ô trống, tên cột trùng → 'a.1', tên cột trống → 'Unnamed: i'.
+    """
+
+    def __init__(self, column_names, columns):
+        self.column_names = column_names
+        self.columns = columns
+
+    @classmethod
+    def read(cls, filepath, skip_rows=0, encoding='utf-8'):
+        if encoding.lower().replace('_', '-') in ('utf-8', 'utf8'):
+            encoding = 'utf-8-sig'  # Bỏ BOM như pandas
+
+        # Đọc tạo hàng trăm nghìn list/str mới → tạm tắt GC vòng (không có tham chiếu vòng nào để dọn)
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(filepath, 'r', encoding=encoding, newline='') as f:
+                header, rows = _read_rows(csv.reader(f), skip_rows, filepath)
+            columns = [np.array(values, dtype=object) for values in zip(*rows)] if rows else \
+                [np.array([], dtype=object) for _ in header]
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return cls(_column_names(header), columns)
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def column(self, col_index):
+        """Mảng object của cột (None = ô trống)"""
+        return self.columns[col_index]
+
+    def keys(self, col_index):
+        """Cột dạng str như astype(str) của pandas (ô trống → 'nan')"""
+        return np.array(['nan' if value is None else value for value in self.columns[col_index]], dtype=object)
+
+    def to_frame(self):
+        """DataFrame tương đương pd.read_csv(dtype=str) (import pandas lúc gọi)"""
+        import pandas as pd
+        df = pd.DataFrame({i: pd.Series(values, dtype=str) for i, values in enumerate(self.columns)})
+        df.columns = self.column_names
+        return df
+
+
+def _read_rows(reader, skip_rows, filepath):
+    """(header, list dòng đã bù đủ cột, ô NA → None)"""
+    for _ in range(skip_rows):
+        if next(reader, None) is None:
+            break
+    header = next((row for row in reader if row), None)
+    if header is None:
+        raise ValueError(f"File CSV không có header: {filepath}")
+
+    width = len(header)
+    rows = []
+    for row in reader:
+        if not row:
+            continue
+        if len(row) > width:
+            raise ValueError(f"Dòng {reader.line_num}: {len(row)} cột, header chỉ có {width} cột")
+        rows.append([None if cell in _NA_STRINGS else cell for cell in row] + [None] * (width - len(row)))
+    return header, rows
+
+
+def _column_names(header):
+    """Tên cột như pandas: trống → 'Unnamed: i', trùng → thêm hậu tố .1, .2..."""
+    names, seen = [], set()
+    for i, name in enumerate(header):
+        name = name or f"Unnamed: {i}"
+        base, suffix = name, 0
+        while name in seen:
+            suffix += 1
+            name = f"{base}.{suffix}"
+        seen.add(name)
+        names.append(name)
+    return names
@@ -1,9 +1,342 @@
 """
 Data Manager - Quản lý dữ liệu từ Excel, CSV, Google Sheets
 """
-import pandas as pd
+import glob
+import io
+import numpy as np
 import os
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from src.utils.language_detect import detect_languages
+from src.utils.sheet_writer import STATUS_SUFFIX, write_result_columns
+
+
+def format_id_list(ids, limit=5):
+    """Rút gọn danh sách ID để log: 'a, b, c, ... (+N)'"""
+    shown = ", ".join(str(i) for i in ids[:limit])
+    if len(ids) > limit:
+        shown += f", ... (+{len(ids) - limit})"
+    return shown
+
+
+def _fill_text(series):
+    """Series text (kể cả category) → str, ô trống (NaN) thành ''"""
+    import pandas as pd
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    return series.fillna('').astype(str)
+
+
+def _arrow_string_dtype():
+    """Dtype string lưu bằng Arrow (NaN cho ô trống như dtype=str), None nếu không có pyarrow"""
+    import pandas as pd
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    try:
+        return pd.StringDtype(storage='pyarrow', na_value=np.nan)  # pandas >= 2.3
+    except TypeError:
+        pass
+    try:
+        return pd.StringDtype(storage='pyarrow_numpy')  # pandas 2.1 - 2.2: cùng ngữ nghĩa NaN
+    except (TypeError, ValueError):
+        return None  # pandas 2.0: chỉ dùng category
+
+
+def compact_frame(df, category_max_ratio=0.5, sample_rows=10000):
+    """
+    Giảm bộ nhớ DataFrame toàn cột text:
+        - Cột ít giá trị khác nhau (tỉ lệ unique <= category_max_ratio) → category
+        - Cột còn lại → string Arrow nếu có pyarrow (1 buffer liền thay vì mỗi ô 1 object Python)
+    Tỉ lệ unique ước lượng trên mẫu sample_rows dòng: hash cả cột str Python sẽ làm mỗi ô
+    có dấu giữ thêm 1 bản UTF-8 cache (~+25% bộ nhớ cột).
+    """
+    import pandas as pd
+    if df is None or df.empty:
+        return df
+    arrow = _arrow_string_dtype()
+    columns = []
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            sample = series if len(series) <= sample_rows else series.sample(sample_rows, random_state=0)
+            if sample.nunique(dropna=True) <= len(sample) * category_max_ratio:
+                series = series.astype('category')
+            elif arrow is not None and series.dtype != arrow:
+                series = series.astype(arrow)
+        columns.append(series)
+    compact = pd.concat(columns, axis=1)
+    compact.columns = df.columns
+    return compact
+
+
+# Chuỗi pd.read_excel/read_csv mặc định coi là ô trống (na_values mặc định của pandas)
+_NA_STRINGS = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+
+def _excel_cell_to_str(value):
+    """Chuyển giá trị ô Excel sang str giống pd.read_excel(dtype=str)"""
+    if value is None or (isinstance(value, str) and value in _NA_STRINGS):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def iter_excel_chunks(filepath, usecols, sheet_name=0, skip_rows=0, chunk_size=5000):
+    """
+    Duyệt .xlsx theo từng khối dòng (openpyxl read_only + iter_rows), dtype=str.
+    Yield: (chunk_df, total_estimate) — index là vị trí dòng toàn cục, cột đặt tên theo vị trí
+           (gồm cả dòng trống ở cuối sheet; total = 0 nếu không rõ)
+    """
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        total = max(0, (sheet.max_row or 0) - skip_rows - 1)
+
+        buffer = []
+        rows_read = 0
+        for row in sheet.iter_rows(min_row=skip_rows + 2, values_only=True):
+            rows_read += 1
+            width = len(row)
+            buffer.append([_excel_cell_to_str(row[i]) if i < width else None for i in usecols])
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=usecols, dtype=str,
+                                   index=pd.RangeIndex(rows_read - len(buffer), rows_read)), total
+                buffer = []
+        if buffer or rows_read == 0:
+            yield pd.DataFrame(buffer, columns=usecols, dtype=str,
+                               index=pd.RangeIndex(rows_read - len(buffer), rows_read)), total
+    finally:
+        workbook.close()
+
+
+def last_filled_row(chunk):
+    """Số dòng tính tới dòng cuối có dữ liệu trong khối (theo vị trí toàn cục), 0 nếu khối trống"""
+    filled = np.flatnonzero(chunk.notna().any(axis=1).to_numpy())
+    return int(chunk.index[filled[-1]]) + 1 if len(filled) else 0
+
+
+def read_excel_streaming(filepath, usecols, sheet_name=0, skip_rows=0,
+                         chunk_size=5000, on_progress=None, on_chunk=None):
+    """
+    Đọc .xlsx theo từng khối dòng (xem iter_excel_chunks), dtype=str.
+    Kết quả khớp pd.read_excel: giữ dòng trống ở giữa, bỏ dòng trống ở cuối sheet.
+    usecols: list vị trí cột cần đọc (cột kết quả đặt tên theo vị trí)
+    on_progress(rows_read, total_estimate): gọi sau mỗi khối (total = 0 nếu không rõ)
+    on_chunk(chunk_df): DataFrame từng khối, index là vị trí dòng toàn cục
+    """
+    import pandas as pd
+    chunks = []
+    last_filled = 0  # Số dòng tính tới dòng cuối cùng có dữ liệu
+    for chunk, total in iter_excel_chunks(filepath, usecols, sheet_name, skip_rows, chunk_size):
+        chunks.append(chunk)
+        last_filled = max(last_filled, last_filled_row(chunk))
+        if on_chunk:
+            on_chunk(chunk)
+        if on_progress:
+            on_progress(chunk.index.stop, total)
+
+    df = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+    return df.iloc[:last_filled]
+
+
+# ==================== Folder Sources ====================
+
+SOURCE_FILE_EXTENSIONS = ('.csv', '.xlsx', '.xlsm', '.xls')
+
+
+def is_google_sheet_source(source):
+    """Nguồn là URL Google Sheet hoặc sheet ID (44 ký tự)"""
+    return 'docs.google.com/spreadsheets' in source or len(source) == 44
+
+
+def is_folder_source(source):
+    """Nguồn là thư mục hoặc glob (VD "vendor/level_*.xlsx"); URL không bao giờ là glob (có '?' của query)"""
+    if '://' in source or is_google_sheet_source(source):
+        return False
+    return os.path.isdir(source) or any(c in source for c in '*?[')
+
+
+def _natural_key(path):
+    """level_2 đứng trước level_10"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', path)]
+
+
+def resolve_source_files(source):
+    """Các file CSV/Excel của thư mục / glob, sắp theo tên (bỏ file lock ~$ và file kết quả .tts_status)"""
+    pattern = os.path.join(source, '*') if os.path.isdir(source) else source
+    files = [
+        path for path in glob.glob(pattern, recursive=True)
+        if os.path.isfile(path)
+        and os.path.splitext(path)[1].lower() in SOURCE_FILE_EXTENSIONS
+        and not os.path.basename(path).startswith('~$')
+        and not os.path.splitext(path)[0].endswith(STATUS_SUFFIX)
+    ]
+    return sorted(files, key=_natural_key)
+
+
+def read_table_file(filepath, skip_rows=0, usecols=None, nrows=None, sheet_name=0, encoding='utf-8'):
+    """Đọc 1 file CSV/Excel (dtype=str). Hàm module-level để chạy được trong process pool"""
+    import pandas as pd
+    if os.path.splitext(filepath)[1].lower() == '.csv':
+        return pd.read_csv(filepath, skiprows=skip_rows, encoding=encoding,
+                           usecols=usecols, nrows=nrows, dtype=str)
+    return pd.read_excel(filepath, sheet_name=sheet_name, skiprows=skip_rows,
+                         usecols=usecols, nrows=nrows, dtype=str)
+
+
+def hash_texts(series):
+    """Hash uint64 của text đã strip (vectorized); 0 = ô trống. Dùng chung cho snapshot và dataset store"""
+    import pandas as pd
+    texts = _fill_text(series).str.strip()
+    hashes = pd.util.hash_pandas_object(texts, index=False).to_numpy().copy()
+    hashes[(texts.eq('') | texts.eq('nan')).to_numpy()] = 0
+    return hashes
+
+
+class WorkList:
+    """
+    Danh sách công việc gọn cho engines: chỉ giữ (index, dialog_id, text).
+    Dòng trống/NaN đã được lọc sẵn và đếm theo lô; duyệt lazily theo từng tuple.
+    """
+
+    def __init__(self, indices, dialog_ids, texts, skipped_ids=None):
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.dialog_ids = np.asarray(dialog_ids, dtype=object)
+        self.texts = np.asarray(texts, dtype=object)
+        self.skipped_ids = list(skipped_ids) if skipped_ids is not None else []
+
+    @classmethod
+    def from_frame(cls, frame, key_col, text_col):
+        """Tạo từ DataFrame (vectorized). index = nhãn dòng trong DataFrame gốc"""
+        keys = frame[key_col].astype(str).to_numpy(dtype=object)
+        raw = frame[text_col]
+        texts = raw.astype(str)
+        empty = (raw.isna() | texts.str.strip().eq('') | texts.eq('nan')).to_numpy()
+        indices = frame.index.to_numpy()
+        return cls(indices[~empty], keys[~empty], texts.to_numpy(dtype=object)[~empty],
+                   skipped_ids=keys[empty].tolist())
+
+    @classmethod
+    def from_columns(cls, indices, keys, texts):
+        """Tạo từ các mảng cột (CsvTable, không cần pandas). keys đã là str; text None = ô trống"""
+        indices = np.asarray(indices, dtype=np.int64)
+        keys = np.asarray(keys, dtype=object)
+        texts = np.asarray(texts, dtype=object)
+        empty = np.fromiter((text is None or text == 'nan' or not text.strip() for text in texts),
+                            dtype=bool, count=len(texts))
+        return cls(indices[~empty], keys[~empty], texts[~empty], skipped_ids=keys[empty].tolist())
+
+    @classmethod
+    def from_records(cls, rows, key_col, text_col):
+        """Tạo từ list of dicts (tương thích cách gọi cũ). index = vị trí trong list"""
+        indices, dialog_ids, texts, skipped = [], [], [], []
+        for i, row in enumerate(rows):
+            dialog_id = str(row[key_col])
+            text = str(row[text_col])
+            if not text or text.strip() == '' or text == 'nan':
+                skipped.append(dialog_id)
+                continue
+            indices.append(i)
+            dialog_ids.append(dialog_id)
+            texts.append(text)
+        return cls(indices, dialog_ids, texts, skipped_ids=skipped)
+
+    @property
+    def skipped_count(self):
+        return len(self.skipped_ids)
+
+    @property
+    def total(self):
+        """Tổng số dòng, tính cả dòng trống đã bỏ qua"""
+        return len(self.indices) + self.skipped_count
+
+    def count_resumed(self, resume_from):
+        """Số item đã hoàn thành trong session trước"""
+        if not resume_from:
+            return 0
+        return int(np.isin(self.indices, list(resume_from)).sum())
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        for i in range(len(self.indices)):
+            yield int(self.indices[i]), self.dialog_ids[i], self.texts[i]
+
+    def text_lengths(self):
+        """Số ký tự text của từng item (int64 array)"""
+        return np.fromiter(map(len, self.texts), dtype=np.int64, count=len(self.texts))
+
+    def levels(self):
+        """Level của từng item theo KEY_PATTERN (int32 array, -1 nếu key không khớp)"""
+        return DataManager.parse_dialog_keys(self.dialog_ids)[1]
+
+
+class DatasetDiff:
+    """
+    Kết quả so sánh dataset hiện tại với snapshot trước, theo key và từng cột ngôn ngữ.
+    Text trống được coi như không có: added = có text mà trước đó chưa có (key mới hoặc ô trống),
+    removed = trước có text mà giờ không còn, changed = text khác, unchanged = text giống.
+    """
+
+    KINDS = ('added', 'removed', 'changed', 'unchanged')
+
+    def __init__(self, languages, snapshot, positions, version):
+        self.languages = languages   # {tên cột: {kind: Index các key}}
+        self.snapshot = snapshot     # Snapshot của dataset hiện tại (dùng cho lần so sánh sau)
+        self.positions = positions   # Series {key: vị trí dòng trong df hiện tại}
+        self.version = version       # DataManager._version lúc so sánh
+
+    def counts(self):
+        """{tên cột: {kind: số key}}"""
+        return {col: {kind: len(keys) for kind, keys in sets.items()}
+                for col, sets in self.languages.items()}
+
+    def keys_to_record(self, column):
+        """Key cần thu âm lại cho cột: added + changed"""
+        sets = self.languages[column]
+        return sets['added'].append(sets['changed'])
+
+    def positions_to_record(self, column):
+        """Vị trí dòng (trong df hiện tại, theo thứ tự file) cần thu âm lại cho cột"""
+        return np.sort(self.positions.reindex(self.keys_to_record(column)).to_numpy(dtype=np.int64))
+
+    @property
+    def has_changes(self):
+        return any(len(sets[kind]) for sets in self.languages.values() for kind in ('added', 'removed', 'changed'))
+
+
+class RunEstimate:
+    """
+    Ước tính chi phí 1 lượt chạy, cộng theo (level, ngôn ngữ).
+    groups: list dict {level (None = key không khớp pattern), language, rows, chars,
+                       seconds, audio_seconds, bytes}
+    """
+
+    FIELDS = ('rows', 'chars', 'seconds', 'audio_seconds', 'bytes')
+
+    def __init__(self, groups):
+        self.groups = groups
+
+    def totals(self, language=None):
+        """Tổng các FIELDS (của 1 ngôn ngữ hoặc tất cả)"""
+        groups = [g for g in self.groups if language is None or g['language'] == language]
+        return {field: sum(g[field] for g in groups) for field in self.FIELDS}
+
+    def seconds_per_row(self, language=None):
+        totals = self.totals(language)
+        return totals['seconds'] / totals['rows'] if totals['rows'] else None
 
 
 class DataManager:
@@ -18,56 +351,444 @@ class DataManager:
         'Chinese': ['zh', 'cn', 'chinese', 'tiếng trung'],
     }
 
-    def __init__(self):
-        self.df = None
+    # URL gốc của Google Sheets (đổi được, VD: trỏ tới server thử nghiệm local)
+    SHEET_BASE_URL = "https://docs.google.com/spreadsheets/d"
+
+    # Cột nguồn gốc (tên sheet) thêm vào cuối khi load nhiều sheet
+    SHEET_COLUMN = 'sheet'
+    MAX_SHEET_WORKERS = 8
+
+    # Load thư mục: cột nguồn gốc + số process parse file song song
+    FILE_COLUMN = 'source_file'
+    MAX_FILE_WORKERS = 4
+
+    # Pattern key dialog: s_dialog_{level}_{seq} hoặc s_re_dialog_{level}_{seq}
+    KEY_PATTERN = re.compile(r's_(re_)?dialog_(\d+)_(\d+)')
+
+    def __init__(self, cache=None, use_cache=True):
+        """
+        cache: DatasetCache dùng chung (mặc định tạo mới khi cần)
+        use_cache: False để luôn parse lại file gốc
+        """
+        self.cache = cache
+        self.use_cache = use_cache
+        self.sheet_cache = None
+        self.sheet_base_url = self.SHEET_BASE_URL
+        self._df = None
         self.source_type = None  # 'excel', 'csv', 'google_sheet'
         self.source_path = ""
-        self.column_names = []
+        self.skip_rows = 0
+        self.sheets = 0              # Sheet đã chọn: tên/index, list nhiều sheet, None = tất cả
+        self.column_names = []       # Toàn bộ header của nguồn
+        self.loaded_columns = []     # Index các cột đã đọc vào df
         self.column_language_map = {}  # {col_index: language_name}
+        self._level_index = None     # Index level theo cột key, tạo lazily (xem _get_level_index)
+        self._version = 0            # Tăng mỗi khi df đổi; cache phân tích gắn với version
+        self._quality_cache = {}
+        self._column_reader = None   # reader(usecols, nrows, on_progress) cho file local
+        self._cache_params = {}
+
+        # .xlsx từ ngưỡng này trở lên được đọc streaming theo khối dòng
+        self.streaming_threshold = 10 * 1024 * 1024
+        self.stream_chunk_size = 5000
+
+        # Lưu df dạng gọn (category / string Arrow), xem compact_frame
+        self.compact_memory = True
+
+        # Backend SQLite (tùy chọn, xem load_into_store): khi có, các truy vấn level/work list/report
+        # chạy bằng SQL trên dataset đã import thay vì df
+        self.use_store = False       # Load dữ liệu vào SQLite store thay vì df (setting performance.sqlite_store)
+        self.store = None
+        self.stored = None
+
+        # CSV đọc bằng module csv (xem CsvTable): level/work list/preview chạy trên các mảng cột,
+        # pandas chỉ được import khi cần df (Excel, Google Sheet, báo cáo chất lượng, snapshot...)
+        self.light_csv = False       # Bật cho đường chạy headless (job server)
+        self.table = None
+
+    @property
+    def df(self):
+        """DataFrame dữ liệu; đang giữ CsvTable thì dựng df từ bảng ở lần truy cập đầu"""
+        table = self.table
+        if self._df is None and table is not None:
+            df = table.to_frame()
+            self._df = compact_frame(df) if self.compact_memory else df
+            self.table = None  # Cùng dữ liệu, cùng vị trí dòng → giữ nguyên index level / version
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        self._df = df
+        self.table = None
 
     # ==================== Data Loading ====================
 
-    def load_excel(self, filepath, skip_rows=2):
-        """Load từ Excel file"""
-        if not os.path.exists(filepath):
+    def _get_cache(self):
+        if not self.use_cache:
+            return None
+        if self.cache is None:
+            from src.utils.data_cache import DatasetCache
+            self.cache = DatasetCache()
+        return self.cache
+
+    def _read_columns(self, usecols, nrows=None, on_progress=None):
+        """Đọc các cột (theo vị trí) của file local qua cache"""
+        # Thư mục: cache theo từng file (xem _read_files)
+        cache = self._get_cache() if self.source_type != 'folder' else None
+        params = dict(self._cache_params, usecols=usecols, nrows=nrows, compact=self.compact_memory)
+        df = cache.load(self.source_path, **params) if cache else None
+        if df is None:
+            df = self._column_reader(usecols, nrows, on_progress)
+            if self.compact_memory:
+                df = compact_frame(df)
+            if cache:
+                cache.store(self.source_path, df, **params)
+        return df
+
+    def _load_local_file(self, filepath, source_type, reader, columns=None, on_progress=None, **params):
+        """
+        Load 2 pha: đọc header trước, rồi chỉ đọc các cột cần dùng (dtype=str).
+        columns: list index cột cần đọc ngay (None = tất cả, [] = chỉ header)
+        """
+        if source_type != 'folder' and not os.path.exists(filepath):
             raise FileNotFoundError(f"File không tồn tại: {filepath}")
 
-        self.df = pd.read_excel(filepath, skiprows=skip_rows)
-        self.df.columns = [str(col).strip() for col in self.df.columns]
-        self.source_type = 'excel'
+        self.stored = None
+        self.source_type = source_type
         self.source_path = filepath
-        self.column_names = list(self.df.columns)
+        self.skip_rows = params['skip_rows']
+        self._column_reader = reader
+        self._cache_params = dict(params, source_type=source_type)
+
+        header = self._read_columns(None, nrows=0)
+        self.column_names = [str(col).strip() for col in header.columns]
+        self.df = None
+        self._on_data_changed()
+        self.loaded_columns = []
+        self.ensure_columns(range(len(self.column_names)) if columns is None else columns,
+                            on_progress=on_progress)
         return True
 
-    def load_csv(self, filepath, skip_rows=0, encoding='utf-8'):
-        """Load từ CSV file"""
+    def _set_full_frame(self, df, source_type, source_path, skip_rows):
+        """Gán DataFrame đã đọc đủ cột (Google Sheet)"""
+        if self.compact_memory:
+            df = compact_frame(df)
+        df.columns = [str(col).strip() for col in df.columns]
+        self.stored = None
+        self.df = df
+        self._on_data_changed()
+        self.source_type = source_type
+        self.source_path = source_path
+        self.skip_rows = skip_rows
+        self.column_names = list(df.columns)
+        self.loaded_columns = list(range(len(self.column_names)))
+        self._column_reader = None
+        return True
+
+    def _on_data_changed(self):
+        """df vừa được thay → bỏ index/cache phân tích của dữ liệu cũ"""
+        self._version += 1
+        self._level_index = None
+        self._quality_cache = {}
+
+    def ensure_columns(self, col_indices, on_progress=None):
+        """
+        Đảm bảo các cột đã được đọc vào df (lazy, khi mapping thay đổi).
+        Đọc lại 1 lần toàn bộ tập cột (cũ + mới) để các cột luôn khớp dòng.
+        on_progress(rows_read, total): tiến độ đọc (chỉ với Excel đọc streaming)
+        Returns: True nếu đã đọc thêm cột
+        """
+        if self.stored is not None:
+            return False  # Dataset store có sẵn mọi cột
+        wanted = sorted({int(i) for i in col_indices if 0 <= int(i) < len(self.column_names)}
+                        | set(self.loaded_columns))
+        if not wanted or wanted == self.loaded_columns or self._column_reader is None:
+            return False
+
+        all_columns = len(wanted) == len(self.column_names)
+        df = self._read_columns(None if all_columns else wanted, on_progress=on_progress)
+        df.columns = [self.column_names[i] for i in wanted]
+        self.df = df
+        self._on_data_changed()
+        self.loaded_columns = wanted
+        return True
+
+    def _should_stream(self, filepath, on_progress):
+        """Đọc streaming cho .xlsx lớn, hoặc khi cần báo tiến độ"""
+        if os.path.splitext(filepath)[1].lower() not in ('.xlsx', '.xlsm'):
+            return False
+        return on_progress is not None or os.path.getsize(filepath) >= self.streaming_threshold
+
+    def _read_excel_sheet(self, filepath, sheet_name, skip_rows, usecols, nrows, progress=None):
+        """Đọc 1 sheet (streaming nếu file lớn / cần tiến độ)"""
+        import pandas as pd
+        if nrows is None and self._should_stream(filepath, progress):
+            return read_excel_streaming(
+                filepath, usecols if usecols is not None else list(range(len(self.column_names))),
+                sheet_name=sheet_name, skip_rows=skip_rows,
+                chunk_size=self.stream_chunk_size, on_progress=progress,
+            )
+        return pd.read_excel(filepath, sheet_name=sheet_name, skiprows=skip_rows,
+                             usecols=usecols, nrows=nrows, dtype=str)
+
+    def load_excel(self, filepath, skip_rows=2, sheet_name=0, columns=None, on_progress=None):
+        """
+        Load từ Excel file.
+        sheet_name: tên/index 1 sheet; list nhiều sheet hoặc None = tất cả sheet
+                    (đọc song song, gộp lại + cột 'sheet' ở cuối)
+        columns: list index cột cần đọc (None = tất cả, [] = chỉ header; cột khác đọc qua ensure_columns)
+        on_progress(rows_read, total): bật đọc streaming theo khối và báo tiến độ
+        """
+        self.sheets = sheet_name
+        if sheet_name is None or isinstance(sheet_name, (list, tuple)):
+            return self._load_excel_sheets(filepath, skip_rows, sheet_name, columns, on_progress)
+
+        def reader(usecols, nrows, progress=None):
+            return self._read_excel_sheet(filepath, sheet_name, skip_rows, usecols, nrows, progress)
+
+        return self._load_local_file(filepath, 'excel', reader, columns, on_progress,
+                                     skip_rows=skip_rows, sheet=sheet_name)
+
+    @staticmethod
+    def list_excel_sheets(filepath):
+        """Tên các sheet trong workbook"""
+        import pandas as pd
+        with pd.ExcelFile(filepath) as workbook:
+            return list(workbook.sheet_names)
+
+    def _load_excel_sheets(self, filepath, skip_rows, sheet_names, columns, on_progress):
+        """Load nhiều sheet cùng cấu trúc cột, đọc song song trong thread pool"""
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"File không tồn tại: {filepath}")
 
-        self.df = pd.read_csv(filepath, skiprows=skip_rows, encoding=encoding)
-        self.df.columns = [str(col).strip() for col in self.df.columns]
+        all_sheets = self.list_excel_sheets(filepath)
+        if sheet_names is None:
+            sheets = all_sheets
+        else:
+            sheets = [all_sheets[s] if isinstance(s, int) else s for s in sheet_names]
+            missing = [s for s in sheets if s not in all_sheets]
+            if missing:
+                raise ValueError(f"Không tìm thấy sheet: {', '.join(map(str, missing))}")
+        if not sheets:
+            raise ValueError("Workbook không có sheet nào")
+
+        def reader(usecols, nrows, progress=None):
+            if nrows == 0:
+                headers = self._run_per_sheet(
+                    sheets, lambda sheet, _: self._read_excel_sheet(filepath, sheet, skip_rows, None, 0))
+                return self._combine_sheets(sheets, headers, None)
+
+            # Cột 'sheet' không có trong file, được thêm sau khi gộp
+            real_count = len(self.column_names) - 1
+            sheet_usecols = None if usecols is None else [i for i in usecols if i < real_count]
+            frames = self._run_per_sheet(
+                sheets,
+                lambda sheet, sheet_progress: self._read_excel_sheet(
+                    filepath, sheet, skip_rows, sheet_usecols, nrows, sheet_progress),
+                progress,
+            )
+            return self._combine_sheets(sheets, frames, usecols)
+
+        return self._load_local_file(filepath, 'excel', reader, columns, on_progress,
+                                     skip_rows=skip_rows, sheet=list(sheets))
+
+    def _run_per_sheet(self, sheets, read_sheet, on_progress=None):
+        """
+        Chạy read_sheet(sheet, progress) cho từng sheet trong thread pool.
+        Tiến độ các sheet được cộng dồn thành 1 on_progress(rows_read, total).
+        """
+        lock = threading.Lock()
+        state = {sheet: (0, 0) for sheet in sheets}
+
+        def make_progress(sheet):
+            if on_progress is None:
+                return None
+
+            def progress(rows_read, total):
+                with lock:
+                    state[sheet] = (rows_read, total)
+                    done = sum(r for r, _ in state.values())
+                    grand_total = sum(t for _, t in state.values())
+                on_progress(done, grand_total)
+            return progress
+
+        workers = max(1, min(self.MAX_SHEET_WORKERS, len(sheets)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(read_sheet, sheet, make_progress(sheet)) for sheet in sheets]
+            return [future.result() for future in futures]
+
+    def _combine_sheets(self, sheets, frames, usecols):
+        """
+        Gộp frame của các sheet (cùng header) + cột nguồn gốc 'sheet' ở cuối.
+        usecols: vị trí cột yêu cầu (None = tất cả); vị trí cuối cùng là cột 'sheet'
+        """
+        return self._combine_parts(sheets, frames, usecols, self.SHEET_COLUMN, 'Sheet')
+
+    def _combine_parts(self, names, frames, usecols, provenance_column, part_label):
+        """Gộp frame các phần (sheet / file) cùng header + cột nguồn gốc (tên phần) ở cuối"""
+        import pandas as pd
+        first = [str(c).strip() for c in frames[0].columns]
+        for name, frame in zip(names[1:], frames[1:]):
+            if [str(c).strip() for c in frame.columns] != first:
+                raise ValueError(f"{part_label} '{name}' có header khác {part_label.lower()} '{names[0]}'")
+
+        column = provenance_column if provenance_column not in first else f"_{provenance_column}"
+        combined = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+        if usecols is None or (len(self.column_names) - 1) in usecols:
+            labels = np.repeat(np.array([str(n) for n in names], dtype=object), [len(f) for f in frames])
+            combined[column] = pd.array(labels, dtype=str)
+        return combined
+
+    def load_folder(self, source, skip_rows=2, sheet_name=0, columns=None, on_progress=None):
+        """
+        Load nhiều file CSV/Excel cùng header từ thư mục hoặc glob (VD "vendor/level_*.xlsx").
+        File được parse song song trong process pool, gộp theo tên file (level_2 trước level_10)
+        + cột nguồn gốc 'source_file' ở cuối. Mỗi file được cache riêng → lần load sau chỉ đọc lại file đã đổi.
+        sheet_name: sheet đọc trong mỗi file Excel (1 sheet)
+        on_progress(rows_read, 0): sau mỗi file đọc xong
+        """
+        if sheet_name is None or isinstance(sheet_name, (list, tuple)):
+            raise ValueError("Load thư mục chỉ hỗ trợ 1 sheet cho mỗi file Excel")
+        files = resolve_source_files(source)
+        if not files:
+            raise FileNotFoundError(f"Không có file CSV/Excel nào trong: {source}")
+
+        self.sheets = sheet_name
+        base = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in files])
+        names = [os.path.relpath(os.path.abspath(f), base) for f in files]
+        read_params = {'skip_rows': skip_rows, 'sheet_name': sheet_name}
+
+        def reader(usecols, nrows, progress=None):
+            if nrows == 0:
+                headers = self._read_files(files, None, 0, read_params)
+                return self._combine_parts(names, headers, None, self.FILE_COLUMN, 'File')
+
+            # Cột 'source_file' không có trong file, được thêm sau khi gộp
+            real_count = len(self.column_names) - 1
+            file_usecols = None if usecols is None else [i for i in usecols if i < real_count]
+            frames = self._read_files(files, file_usecols, nrows, read_params, progress)
+            return self._combine_parts(names, frames, usecols, self.FILE_COLUMN, 'File')
+
+        return self._load_local_file(source, 'folder', reader, columns, on_progress,
+                                     skip_rows=skip_rows, sheet=sheet_name)
+
+    def _read_files(self, files, usecols, nrows, read_params, on_progress=None):
+        """
+        Đọc nhiều file qua cache từng file (khóa = path + size + mtime + tham số đọc).
+        File chưa có trong cache / đã đổi được parse song song trong process pool.
+        """
+        cache = self._get_cache()
+        params = dict(read_params, usecols=usecols, nrows=nrows)
+        if cache:
+            cache.ensure_capacity(2 * len(files))  # Header + dữ liệu của mỗi file
+        frames = [cache.load(path, **params) if cache else None for path in files]
+        pending = [i for i, frame in enumerate(frames) if frame is None]
+        rows_read = sum(len(frame) for frame in frames if frame is not None)
+
+        def finish(i, frame):
+            nonlocal rows_read
+            frames[i] = frame
+            if cache:
+                cache.store(files[i], frame, **params)
+            rows_read += len(frame)
+            if on_progress:
+                on_progress(rows_read, 0)
+
+        # Đọc header / chỉ 1 worker: không đáng khởi động process
+        workers = max(1, min(self.MAX_FILE_WORKERS, os.cpu_count() or 1, len(pending)))
+        if nrows == 0 or workers == 1:
+            for i in pending:
+                finish(i, read_table_file(files[i], usecols=usecols, nrows=nrows, **read_params))
+            return frames
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(read_table_file, files[i], usecols=usecols, nrows=nrows, **read_params): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+        return frames
+
+    def load_csv(self, filepath, skip_rows=0, encoding='utf-8', columns=None):
+        """
+        Load từ CSV file.
+        columns: list index cột cần đọc (None = tất cả, [] = chỉ header)
+        """
+        self.sheets = 0
+        if self.light_csv:
+            return self._load_csv_table(filepath, skip_rows, encoding)
+
+        def reader(usecols, nrows, progress=None):
+            import pandas as pd
+            return pd.read_csv(filepath, skiprows=skip_rows, encoding=encoding,
+                               usecols=usecols, nrows=nrows, dtype=str)
+
+        return self._load_local_file(filepath, 'csv', reader, columns,
+                                     skip_rows=skip_rows, encoding=encoding)
+
+    def _load_csv_table(self, filepath, skip_rows, encoding):
+        """Đọc CSV 1 lượt bằng module csv vào CsvTable (mọi cột, không qua DatasetCache)"""
+        from src.core.csv_table import CsvTable
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"File không tồn tại: {filepath}")
+
+        table = CsvTable.read(filepath, skip_rows=skip_rows, encoding=encoding)
+        self.stored = None
+        self.df = None
+        self.table = table
+        self._on_data_changed()
         self.source_type = 'csv'
         self.source_path = filepath
-        self.column_names = list(self.df.columns)
+        self.skip_rows = skip_rows
+        self.column_names = table.column_names = [name.strip() for name in table.column_names]
+        self.loaded_columns = list(range(len(self.column_names)))
+        self._column_reader = None
+        self._cache_params = {}
         return True
 
     def load_google_sheet(self, url_or_id, worksheet_index=0, skip_rows=2):
-        """Load từ Google Sheet (public hoặc private)"""
+        """
+        Load từ Google Sheet (public hoặc private).
+        worksheet_index: index/tên 1 worksheet; list nhiều worksheet hoặc None = tất cả
+                         (nhiều worksheet cần OAuth, tải song song + cột 'sheet')
+        """
         try:
             sheet_id = self._extract_sheet_id(url_or_id)
-
-            # Thử public access trước
-            try:
-                return self._load_public_sheet(sheet_id, skip_rows)
-            except Exception:
-                pass
-
-            # Private access với OAuth
-            return self._load_private_sheet(sheet_id, worksheet_index, skip_rows)
+            sheet_cache = self._get_sheet_cache()
+            loaders = {
+                'public': lambda: self._load_public_sheet(sheet_id, skip_rows),
+                'private': lambda: self._load_private_sheet(sheet_id, worksheet_index, skip_rows),  # OAuth
+            }
+
+            # Thử public trước; nếu lần trước sheet chỉ mở được qua OAuth thì thử private trước.
+            # Export CSV public chỉ lấy được worksheet đầu → chọn worksheet khác / nhiều worksheet đi thẳng OAuth
+            if worksheet_index != 0:
+                order = ['private']
+            elif sheet_cache.get_access(sheet_id) == 'private':
+                order = ['private', 'public']
+            else:
+                order = ['public', 'private']
+            errors = {}
+            for access in order:
+                try:
+                    loaders[access]()
+                    sheet_cache.set_access(sheet_id, access)
+                    self.sheets = worksheet_index
+                    return True
+                except Exception as e:
+                    errors[access] = e
+            raise errors['private']
 
         except Exception as e:
             raise ConnectionError(f"Không thể load Google Sheet: {e}")
 
+    def _get_sheet_cache(self):
+        if self.sheet_cache is None:
+            from src.utils.data_cache import SheetFetchCache
+            self.sheet_cache = SheetFetchCache()
+        return self.sheet_cache
+
     def _extract_sheet_id(self, url_or_id):
         """Trích xuất Sheet ID từ URL hoặc trả về ID trực tiếp"""
         match = re.search(r'/spreadsheets/d/([a-zA-Z0-9-_]+)', url_or_id)
@@ -77,13 +798,11 @@ class DataManager:
 
     def _load_public_sheet(self, sheet_id, skip_rows):
         """Load public Google Sheet qua CSV export URL"""
-        csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-        self.df = pd.read_csv(csv_url, skiprows=skip_rows)
-        self.df.columns = [str(col).strip() for col in self.df.columns]
-        self.source_type = 'google_sheet'
-        self.source_path = sheet_id
-        self.column_names = list(self.df.columns)
-        return True
+        import pandas as pd
+        csv_url = f"{self.sheet_base_url.rstrip('/')}/{sheet_id}/export?format=csv"
+        body, _ = self._get_sheet_cache().fetch(csv_url, sheet_id)
+        df = pd.read_csv(io.BytesIO(body), skiprows=skip_rows, dtype=str)
+        return self._set_full_frame(df, 'google_sheet', sheet_id, skip_rows)
 
     def _load_private_sheet(self, sheet_id, worksheet_index, skip_rows):
         """Load private Google Sheet qua gspread + OAuth"""
@@ -120,26 +839,94 @@ class DataManager:
 
             gc = gspread.authorize(creds)
             spreadsheet = gc.open_by_key(sheet_id)
-            worksheet = spreadsheet.get_worksheet(worksheet_index)
-            data = worksheet.get_all_values()
-
-            if skip_rows > 0:
-                data = data[skip_rows:]
 
-            if len(data) > 1:
-                self.df = pd.DataFrame(data[1:], columns=data[0])
-            else:
-                self.df = pd.DataFrame(data)
-
-            self.df.columns = [str(col).strip() for col in self.df.columns]
-            self.source_type = 'google_sheet'
-            self.source_path = sheet_id
-            self.column_names = list(self.df.columns)
-            return True
+            if worksheet_index is None or isinstance(worksheet_index, (list, tuple)):
+                if worksheet_index is None:
+                    worksheets = spreadsheet.worksheets()
+                else:
+                    worksheets = [spreadsheet.get_worksheet(w) if isinstance(w, int) else spreadsheet.worksheet(w)
+                                  for w in worksheet_index]
+                # Tải các worksheet song song (I/O mạng)
+                values = self._run_per_sheet(list(range(len(worksheets))),
+                                             lambda i, _: worksheets[i].get_all_values())
+                frames = [self._values_to_frame(data, skip_rows) for data in values]
+                df = self._combine_sheets([ws.title for ws in worksheets], frames, None)
+                return self._set_full_frame(df, 'google_sheet', sheet_id, skip_rows)
+
+            worksheet = (spreadsheet.get_worksheet(worksheet_index) if isinstance(worksheet_index, int)
+                         else spreadsheet.worksheet(worksheet_index))
+            data = worksheet.get_all_values()
+            df = self._values_to_frame(data, skip_rows)
+            return self._set_full_frame(df, 'google_sheet', sheet_id, skip_rows)
 
         except ImportError:
             raise ImportError("Cần cài gspread và google-auth: pip install gspread google-auth google-auth-oauthlib")
 
+    @staticmethod
+    def _values_to_frame(data, skip_rows):
+        """Chuyển list giá trị của worksheet (dòng đầu sau skip_rows là header) thành DataFrame"""
+        import pandas as pd
+        if skip_rows > 0:
+            data = data[skip_rows:]
+        if len(data) > 1:
+            return pd.DataFrame(data[1:], columns=data[0])
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def parse_sheet_selection(selection_string):
+        """
+        Parse chuỗi chọn sheet.
+            - "" → 0 (sheet đầu)
+            - "all" hoặc "*" → None (tất cả)
+            - "Chapter1" / "2" → 1 sheet (tên / index)
+            - "Chapter1, Chapter2, 3" → list nhiều sheet
+        """
+        text = (selection_string or '').strip()
+        if not text:
+            return 0
+        if text.lower() in ('all', '*'):
+            return None
+        parts = [p.strip() for p in text.split(',') if p.strip()]
+        parsed = [int(p) if p.isdigit() else p for p in parts]
+        return parsed[0] if len(parsed) == 1 else parsed
+
+    def reload(self):
+        """Load lại từ nguồn gần nhất với cùng tham số"""
+        if not self.source_path:
+            raise ValueError("Chưa load nguồn dữ liệu nào")
+        if self.stored is not None:
+            return self.load_into_store(self.stored.source, skip_rows=self.skip_rows, sheets=self.sheets,
+                                        key_col_index=self.stored.key_col_index)
+        columns = self.loaded_columns if self._column_reader is not None else None
+        return self.auto_detect_source(self.source_path, skip_rows=self.skip_rows, columns=columns,
+                                       sheets=self.sheets)
+
+    def detached_copy(self):
+        """
+        DataManager mới cùng nguồn + tham số đọc, chưa load (reload() để đọc).
+        Thread nền (watch mode) reload trên bản này, không đổi df mà GUI / batch đang dùng.
+        """
+        copy = DataManager(cache=self.cache, use_cache=self.use_cache)
+        for name in ('sheet_base_url', 'source_type', 'source_path', 'skip_rows', 'sheets',
+                     'streaming_threshold', 'stream_chunk_size', 'compact_memory',
+                     'use_store', 'store', 'stored', 'light_csv', '_column_reader'):
+            setattr(copy, name, getattr(self, name))
+        copy.column_names = list(self.column_names)
+        copy.loaded_columns = list(self.loaded_columns)
+        copy.column_language_map = dict(self.column_language_map)
+        return copy
+
+    def get_source_mtime(self):
+        """(mtime, size) của file nguồn, None nếu không phải file local"""
+        if self.source_type == 'folder':
+            # Thư mục: file mới nhất + kích thước từng file (thêm/xóa file cũng được tính là đổi)
+            stats = [os.stat(path) for path in resolve_source_files(self.source_path)]
+            return max((st.st_mtime for st in stats), default=0), tuple(st.st_size for st in stats)
+        if self.source_type not in ('excel', 'csv') or not os.path.exists(self.source_path):
+            return None
+        stat = os.stat(self.source_path)
+        return stat.st_mtime, stat.st_size
+
     # ==================== Column & Language ====================
 
     def set_column_language(self, col_index, language_name):
@@ -152,12 +939,17 @@ class DataManager:
 
     def get_key_column(self, col_index=0):
         """Lấy tên cột key"""
-        if self.df is not None and col_index < len(self.column_names):
+        if self.has_data() and col_index < len(self.column_names):
             return self.column_names[col_index]
         return None
 
-    def detect_column_language(self, col_index):
-        """Tự động detect ngôn ngữ của cột dựa trên tên cột"""
+    # Số dòng mẫu để đoán ngôn ngữ theo nội dung
+    LANGUAGE_SAMPLE_ROWS = 500
+    # Cột ít giá trị khác nhau (tên nhân vật, trạng thái...) không phải cột thoại
+    LANGUAGE_MIN_UNIQUE_RATIO = 0.3
+
+    def detect_column_language(self, col_index, use_content=True):
+        """Tự động detect ngôn ngữ của cột dựa trên tên cột, không ra thì theo nội dung"""
         if col_index >= len(self.column_names):
             return None
         col_name = self.column_names[col_index].lower().strip()
@@ -165,16 +957,81 @@ class DataManager:
             for kw in keywords:
                 if kw in col_name:
                     return lang
+        if use_content:
+            return self.detect_languages_by_content([col_index]).get(col_index)
         return None
 
-    def auto_detect_all_languages(self):
-        """Tự động detect ngôn ngữ cho tất cả cột"""
+    def auto_detect_all_languages(self, use_content=True):
+        """
+        Tự động detect ngôn ngữ cho tất cả cột.
+        Tên cột trước; cột còn lại đoán theo nội dung trong 1 lượt (use_content=False để tắt)
+        """
         detected = {}
         for i, col_name in enumerate(self.column_names):
-            lang = self.detect_column_language(i)
+            lang = self.detect_column_language(i, use_content=False)
             if lang:
                 detected[i] = lang
-        return detected
+        if use_content:
+            rest = [i for i in range(len(self.column_names)) if i not in detected]
+            detected.update(self.detect_languages_by_content(rest))
+        return dict(sorted(detected.items()))
+
+    def sample_column_texts(self, col_indices, max_rows=None):
+        """
+        Lấy mẫu text (bỏ ô trống) của các cột.
+        Cột đã đọc: các dòng rải đều cả file; chưa đọc: max_rows dòng đầu (đọc riêng, không qua cache)
+        Returns: {col_index: list of str}
+        """
+        max_rows = max_rows or self.LANGUAGE_SAMPLE_ROWS
+        col_indices = sorted({i for i in col_indices if 0 <= i < len(self.column_names)})
+        if not col_indices:
+            return {}
+
+        if self.table is not None:
+            total = len(self.table)
+            positions = np.unique(np.linspace(0, total - 1, min(max_rows, total)).astype(np.int64))
+            samples = {}
+            for col_index in col_indices:
+                texts = (value.strip() for value in self.table.column(col_index)[positions] if value is not None)
+                samples[col_index] = [text for text in texts if text and text != 'nan']
+            return samples
+
+        if self.stored is not None:
+            frame = self.stored.sample(col_indices, max_rows)
+        elif self.df is not None and set(col_indices) <= set(self.loaded_columns):
+            positions = np.unique(np.linspace(0, len(self.df) - 1, min(max_rows, len(self.df))).astype(np.int64))
+            frame = self.df[[self.column_names[i] for i in col_indices]].iloc[positions]
+        elif self._column_reader is not None:
+            frame = self._column_reader(col_indices, max_rows, None)
+        else:
+            return {}
+
+        samples = {}
+        for pos, col_index in enumerate(col_indices):
+            texts = _fill_text(frame.iloc[:, pos]).str.strip()
+            samples[col_index] = texts[texts.ne('') & texts.ne('nan')].tolist()
+        return samples
+
+    def detect_languages_by_content(self, col_indices):
+        """
+        Đoán ngôn ngữ theo nội dung (histogram Unicode script của mẫu, xem language_detect).
+        Bỏ qua cột key (s_dialog_...) và cột ít giá trị khác nhau.
+        Returns: {col_index: language}
+        """
+        samples = self.sample_column_texts(col_indices)
+        candidates = []
+        for col_index, texts in samples.items():
+            if not texts:
+                continue
+            keys = sum(1 for t in texts if self.KEY_PATTERN.search(t))
+            if keys * 2 >= len(texts):
+                continue
+            if len(set(texts)) < len(texts) * self.LANGUAGE_MIN_UNIQUE_RATIO:
+                continue
+            candidates.append(col_index)
+
+        languages = detect_languages([samples[i] for i in candidates])
+        return {i: lang for i, lang in zip(candidates, languages) if lang}
 
     # ==================== Level Selection (Enhanced) ====================
 
@@ -216,30 +1073,140 @@ class DataManager:
 
         return sorted(levels) if levels else None
 
+    @classmethod
+    def extract_level(cls, dialog_id):
+        """Lấy level từ dialog ID (s_dialog_8_12 → 8), None nếu không khớp pattern"""
+        match = cls.KEY_PATTERN.match(str(dialog_id))
+        return int(match.group(2)) if match else None
+
+    @classmethod
+    def parse_dialog_keys(cls, keys):
+        """
+        Parse cột key theo KEY_PATTERN (tìm trong chuỗi như str.extract, không cần pandas).
+        keys: Series / array / list (ô trống NaN → 'nan', không khớp)
+        Returns: (is_re bool array, level int32 array, seq int32 array); -1 nếu key không khớp
+        """
+        search = cls.KEY_PATTERN.search
+        matches = [search(key) for key in map(str, keys)]
+        hits = [(i, m.group(1) is not None, int(m.group(2)), int(m.group(3)))
+                for i, m in enumerate(matches) if m is not None]
+
+        is_re = np.zeros(len(matches), dtype=bool)
+        level = np.full(len(matches), -1, dtype=np.int32)
+        seq = np.full(len(matches), -1, dtype=np.int32)
+        if hits:
+            rows, re_flags, levels, seqs = zip(*hits)
+            rows = np.array(rows, dtype=np.int64)
+            is_re[rows] = re_flags
+            level[rows] = levels
+            seq[rows] = seqs
+        return is_re, level, seq
+
+    def _get_level_index(self, key_col_index):
+        """
+        Parse key 1 lần thành các cột cấu trúc + index level → vị trí dòng.
+        Returns dict:
+            - is_re: bool array (key dạng s_re_dialog_)
+            - level, seq: int32 array (-1 nếu key không khớp pattern)
+            - positions: {level: np.ndarray vị trí dòng (tăng dần)}
+            - counts: {level: số dòng} (histogram cho đếm nhanh)
+        """
+        index = self._level_index
+        if index is not None and index['key_col_index'] == key_col_index:
+            return index
+
+        if self.table is not None:
+            keys = self.table.keys(key_col_index)
+        else:
+            keys = self.df[self.column_names[key_col_index]]
+        is_re, level, seq = self.parse_dialog_keys(keys)
+        matched = level >= 0
+
+        # Sort ổn định theo level → mỗi level là 1 đoạn liên tiếp, giữ thứ tự dòng
+        rows = np.flatnonzero(matched)
+        order = rows[np.argsort(level[rows], kind='stable')]
+        levels, starts = np.unique(level[order], return_index=True)
+        positions = dict(zip(levels.tolist(), np.split(order, starts[1:])))
+        counts = dict(zip(levels.tolist(), np.diff(np.append(starts, len(order))).tolist()))
+
+        self._level_index = {
+            'key_col_index': key_col_index,
+            'is_re': is_re,
+            'level': level,
+            'seq': seq,
+            'positions': positions,
+            'counts': counts,
+        }
+        return self._level_index
+
+    def has_level_index(self, key_col_index=0):
+        """Index level đã sẵn sàng (đếm/preview không cần parse lại key)"""
+        if self.stored is not None:
+            return self.stored.key_col_index == key_col_index
+        index = self._level_index
+        return index is not None and index['key_col_index'] == key_col_index
+
+    def get_level_counts(self, key_col_index=0):
+        """Histogram {level: số dòng}"""
+        if self._stored_for(key_col_index):
+            return self.stored.level_counts()
+        self.ensure_columns([key_col_index])
+        if not self.has_data():
+            return {}
+        return dict(self._get_level_index(key_col_index)['counts'])
+
+    def count_level_rows(self, key_col_index=0, levels=None):
+        """Số dòng thuộc các levels (O(số level), không tạo frame)"""
+        if self._stored_for(key_col_index):
+            return self.stored.count_rows(levels)
+        self.ensure_columns([key_col_index])
+        if not self.has_data():
+            return 0
+        if levels is None:
+            return self.get_total_rows()
+        counts = self._get_level_index(key_col_index)['counts']
+        return sum(counts.get(level, 0) for level in set(levels))
+
+    def get_level_positions(self, key_col_index=0, levels=None):
+        """
+        Vị trí dòng (tăng dần) thuộc các levels đã chọn.
+        levels: list of int, hoặc None cho tất cả dòng
+        """
+        if self._stored_for(key_col_index):
+            return self.stored.positions(levels)
+        self.ensure_columns([key_col_index])
+        if not self.has_data():
+            return np.array([], dtype=np.int64)
+        if levels is None:
+            return np.arange(self.get_total_rows())
+
+        positions = self._get_level_index(key_col_index)['positions']
+        selected = [positions[lv] for lv in set(levels) if lv in positions]
+        if not selected:
+            return np.array([], dtype=np.int64)
+        return selected[0] if len(selected) == 1 else np.sort(np.concatenate(selected))
+
     def filter_by_levels(self, key_col_index=0, levels=None):
         """
-        Lọc dữ liệu theo danh sách levels.
+        Lọc dữ liệu theo danh sách levels (tra index, không quét regex lại).
         levels: list of int, hoặc None cho tất cả
         """
+        import pandas as pd
+        if self._stored_for(key_col_index):
+            return self.stored.rows(levels)
+        self.ensure_columns([key_col_index])
         if self.df is None:
             return pd.DataFrame()
-
         if levels is None:
-            return self.df.copy()
-
-        key_col = self.column_names[key_col_index]
-        masks = []
-        for level in levels:
-            mask = self.df[key_col].astype(str).str.match(rf's_(re_)?dialog_{level}_\d+')
-            masks.append(mask)
-
-        if masks:
-            combined_mask = masks[0]
-            for m in masks[1:]:
-                combined_mask = combined_mask | m
-            return self.df[combined_mask].copy()
+            return self.df
+        return self._take_rows(self.df, self.get_level_positions(key_col_index, levels))
 
-        return pd.DataFrame()
+    @staticmethod
+    def _take_rows(frame, positions):
+        """iloc theo vị trí (tăng dần); dải liên tục → slice, là view không copy dữ liệu"""
+        if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+            return frame.iloc[positions[0]:positions[-1] + 1]
+        return frame.iloc[positions]
 
     def filter_by_level(self, key_col_index=0, level=None):
         """Lọc dữ liệu theo Level (backward compatible)"""
@@ -249,19 +1216,325 @@ class DataManager:
 
     def get_level_preview(self, key_col_index=0, levels=None, max_items=20):
         """Lấy preview danh sách dialog IDs sẽ được xử lý"""
-        filtered = self.filter_by_levels(key_col_index, levels)
-        key_col = self.column_names[key_col_index]
-        all_ids = filtered[key_col].astype(str).tolist()
+        if self._stored_for(key_col_index):
+            total = self.stored.count_rows(levels)
+            return {
+                'total_count': total,
+                'preview_ids': self.stored.preview_keys(levels, max_items),
+                'has_more': total > max_items,
+            }
+        positions = self.get_level_positions(key_col_index, levels)
+        if not self.has_data():
+            return {'total_count': 0, 'preview_ids': [], 'has_more': False}
+        if self.table is not None:
+            preview_ids = self.table.keys(key_col_index)[positions[:max_items]].tolist()
+        else:
+            keys = self.df[self.column_names[key_col_index]]
+            preview_ids = keys.iloc[positions[:max_items]].astype(str).tolist()
         return {
-            'total_count': len(all_ids),
-            'preview_ids': all_ids[:max_items],
-            'has_more': len(all_ids) > max_items,
+            'total_count': len(positions),
+            'preview_ids': preview_ids,
+            'has_more': len(positions) > max_items,
         }
 
+    def get_work_list(self, key_col_index, text_col_index, levels=None):
+        """
+        Tạo WorkList gọn (chỉ cột key + text) cho các level đã chọn.
+        levels: list of int, hoặc None cho tất cả
+        """
+        if self._stored_for(key_col_index):
+            return self.stored.work_list(text_col_index, levels)
+        self.ensure_columns([key_col_index, text_col_index])
+        if self.table is not None:
+            positions = self.get_level_positions(key_col_index, levels)
+            return WorkList.from_columns(positions, self.table.keys(key_col_index)[positions],
+                                         self.table.column(text_col_index)[positions])
+        if self.df is None:
+            return WorkList([], [], [])
+        key_col = self.column_names[key_col_index]
+        text_col = self.column_names[text_col_index]
+        frame = self.df[[key_col, text_col]]
+        if levels is not None:
+            frame = self._take_rows(frame, self.get_level_positions(key_col_index, levels))
+        if frame.empty:
+            return WorkList([], [], [])
+        return WorkList.from_frame(frame, key_col, text_col)
+
+    # ==================== SQLite Store ====================
+
+    def _get_store(self):
+        if self.store is None:
+            from src.core.dataset_store import DatasetStore
+            self.store = DatasetStore()
+        return self.store
+
+    def _stored_for(self, key_col_index):
+        """Đang dùng dataset store (key đã parse lúc import phải là cột key_col_index)"""
+        if self.stored is None:
+            return False
+        if self.stored.key_col_index != key_col_index:
+            raise ValueError(f"Dataset đã import với cột key C{self.stored.key_col_index}, "
+                             f"hãy import lại với cột C{key_col_index}")
+        return True
+
+    def load_into_store(self, source_string, skip_rows=2, sheets=0, key_col_index=0, on_progress=None):
+        """
+        Import nguồn vào SQLite (cache/datasets.db), sau đó level/preview/report/work list chạy bằng SQL
+        và df không được giữ trong RAM. File local chưa đổi (size + mtime + tham số) → mở lại ngay.
+        .csv và .xlsx 1 sheet được import theo khối dòng; nguồn khác load bình thường rồi import.
+        on_progress(rows_read, total): tiến độ import
+        """
+        store = self._get_store()
+        source = source_string.strip()
+        params = {'skip_rows': skip_rows, 'sheets': sheets, 'key_col_index': key_col_index}
+
+        fingerprint = None
+        if is_google_sheet_source(source):
+            fingerprint = None  # Không biết Sheet đã sửa hay chưa → luôn import lại
+        elif is_folder_source(source):
+            stats = [(path, os.stat(path)) for path in resolve_source_files(source)]
+            fingerprint = {'files': [[path, st.st_size, st.st_mtime_ns] for path, st in stats]}
+        elif os.path.exists(source):
+            source = os.path.abspath(source)
+            stat = os.stat(source)
+            fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+        stored = store.find(source, params, fingerprint)
+        if stored is None:
+            source_type, column_names, chunks = self._source_chunks(source, skip_rows, sheets)
+            stored = store.import_chunks(source, params, fingerprint, column_names, key_col_index,
+                                         chunks, on_progress)
+        else:
+            source_type = self._source_type_of(source)
+
+        self.df = None
+        self.stored = stored
+        self._column_reader = None
+        self.source_type = source_type
+        self.source_path = source if fingerprint else self.source_path
+        self.skip_rows = skip_rows
+        self.sheets = sheets
+        self.column_names = list(stored.column_names)
+        self.loaded_columns = list(range(len(self.column_names)))
+        self._on_data_changed()
+        return True
+
+    @staticmethod
+    def _source_type_of(source):
+        ext = os.path.splitext(source)[1].lower()
+        if is_google_sheet_source(source):
+            return 'google_sheet'
+        if is_folder_source(source):
+            return 'folder'
+        if not os.path.exists(source):
+            return 'google_sheet'
+        return 'csv' if ext == '.csv' else 'excel'
+
+    def _source_chunks(self, source, skip_rows, sheets):
+        """
+        Nguồn → (source_type, column_names, iterable (chunk_df, total)) để import.
+        Chunk có cột theo vị trí, index = vị trí dòng toàn cục.
+        """
+        import pandas as pd
+        source_type = self._source_type_of(source)
+        chunk_size = self.stream_chunk_size
+        ext = os.path.splitext(source)[1].lower()
+
+        if source_type == 'csv':
+            header = pd.read_csv(source, skiprows=skip_rows, nrows=0, dtype=str)
+
+            def csv_chunks():
+                for chunk in pd.read_csv(source, skiprows=skip_rows, dtype=str, chunksize=chunk_size):
+                    chunk.columns = range(chunk.shape[1])
+                    yield chunk, 0
+            return source_type, [str(c).strip() for c in header.columns], csv_chunks()
+
+        if ext in ('.xlsx', '.xlsm') and not (sheets is None or isinstance(sheets, (list, tuple))):
+            header = pd.read_excel(source, sheet_name=sheets, skiprows=skip_rows, nrows=0)
+            column_names = [str(c).strip() for c in header.columns]
+            chunks = iter_excel_chunks(source, list(range(len(column_names))), sheets, skip_rows, chunk_size)
+            return source_type, column_names, chunks
+
+        # Google Sheet / .xls / nhiều sheet: load cả bảng rồi import theo khối
+        self.auto_detect_source(source, skip_rows=skip_rows, sheets=sheets)
+        df = self.df.set_axis(range(self.df.shape[1]), axis=1)
+        chunks = ((df.iloc[start:start + chunk_size], len(df)) for start in range(0, max(len(df), 1), chunk_size))
+        return self.source_type, list(self.column_names), chunks
+
+    # ==================== Change Detection ====================
+
+    def compute_row_hashes(self, key_col_index, text_col_index):
+        """
+        Hash (vectorized) text của từng dòng theo key.
+        Returns: Series {dialog_id: uint64 hash}, 0 = text trống
+        """
+        return self.take_snapshot(key_col_index, [text_col_index]).iloc[:, 0]
+
+    def _hash_columns(self, key_col_index, text_col_indices):
+        """
+        Hash text các cột theo key (key trùng → giữ dòng cuối).
+        Returns: (DataFrame index=key, mỗi cột text 1 cột uint64; positions: vị trí dòng trong df)
+        """
+        import pandas as pd
+        if self._stored_for(key_col_index):
+            return self.stored.hashes(text_col_indices)
+        self.ensure_columns([key_col_index, *text_col_indices])
+        columns = [self.column_names[i] for i in text_col_indices]
+        if self.df is None:
+            empty = pd.DataFrame({col: pd.Series(dtype='uint64') for col in columns},
+                                 index=pd.Index([], dtype=object, name='key'))
+            return empty, np.array([], dtype=np.int64)
+
+        keys = self.df[self.column_names[key_col_index]].astype(str).to_numpy(dtype=object)
+        data = {col: hash_texts(self.df[col]) for col in columns}
+
+        snapshot = pd.DataFrame(data, index=pd.Index(keys, name='key'))
+        keep = ~snapshot.index.duplicated(keep='last')
+        positions = np.flatnonzero(keep)
+        return snapshot[keep], positions
+
+    def take_snapshot(self, key_col_index, text_col_indices):
+        """
+        Snapshot hash text theo key để so sánh với phiên bản sau (xem diff_snapshot).
+        Returns: DataFrame index=dialog_id, cột = tên cột text, giá trị uint64 (0 = trống).
+                 Lưu/đọc lại được bằng to_pickle/read_pickle.
+        """
+        return self._hash_columns(key_col_index, list(text_col_indices))[0]
+
+    def diff_snapshot(self, previous, key_col_index, text_col_indices=None):
+        """
+        So sánh dataset hiện tại với snapshot trước (vectorized, 1 lượt cho mọi cột).
+        text_col_indices: cột cần so sánh (None = các cột có trong snapshot).
+                          Cột không có trong snapshot → mọi dòng có text đều là 'added'.
+        Returns: DatasetDiff
+        """
+        import pandas as pd
+        if text_col_indices is None:
+            text_col_indices = [i for i, name in enumerate(self.column_names) if name in previous.columns]
+        current, positions = self._hash_columns(key_col_index, list(text_col_indices))
+
+        previous = previous[~previous.index.duplicated(keep='last')]
+        all_keys = current.index.union(previous.index, sort=False)
+        cur = current.reindex(all_keys, fill_value=0)
+        prev = previous.reindex(index=all_keys, columns=current.columns, fill_value=0)
+
+        languages = {}
+        for col in current.columns:
+            c = cur[col].to_numpy(dtype=np.uint64)
+            p = prev[col].to_numpy(dtype=np.uint64)
+            has_cur, has_prev = c != 0, p != 0
+            same = c == p
+            languages[col] = {
+                'added': all_keys[has_cur & ~has_prev],
+                'removed': all_keys[~has_cur & has_prev],
+                'changed': all_keys[has_cur & has_prev & ~same],
+                'unchanged': all_keys[has_cur & same],
+            }
+
+        return DatasetDiff(languages, current, pd.Series(positions, index=current.index), self._version)
+
+    def get_diff_work_list(self, diff, key_col_index, text_col_index):
+        """
+        WorkList chỉ gồm các dòng cần thu âm lại (added + changed) của cột text, theo thứ tự file.
+        Dùng trực tiếp cho cả 2 engine.
+        """
+        if diff.version != self._version:
+            raise ValueError("Dữ liệu đã thay đổi sau khi so sánh, hãy chạy diff_snapshot lại")
+        text_col = self.column_names[text_col_index]
+        key_col = self.column_names[key_col_index]
+        positions = diff.positions_to_record(text_col)
+        if len(positions) == 0:
+            return WorkList([], [], [])
+        return WorkList.from_frame(self.get_rows(positions)[[key_col, text_col]], key_col, text_col)
+
+    def get_rows(self, positions):
+        """Các dòng theo vị trí (tăng dần), từ df hoặc dataset store"""
+        if self.stored is not None:
+            return self.stored.rows_at(positions)
+        return self.df.iloc[positions]
+
+    # ==================== Cost Estimate ====================
+
+    def estimate_run_cost(self, key_col_index, text_columns, row_costs, levels=None):
+        """
+        Ước tính chi phí chạy trên toàn bộ work list (vectorized, không duyệt từng dòng).
+        text_columns: {col_index: tên ngôn ngữ}
+        row_costs: callable(language, text_lengths) → {'seconds', 'audio_seconds', 'bytes'}: mảng theo dòng
+                   (xem SequenceEngine/APIEngine.estimate_row_costs)
+        levels: list of int, hoặc None cho tất cả
+        Returns: RunEstimate
+        """
+        groups = []
+        for col_index, language in text_columns.items():
+            work = self.get_work_list(key_col_index, col_index, levels)
+            if not len(work):
+                continue
+            lengths = work.text_lengths()
+            costs = row_costs(language, lengths)
+            level_values, inverse = np.unique(self.get_work_levels(key_col_index, work), return_inverse=True)
+            sums = {
+                'rows': np.bincount(inverse, minlength=len(level_values)),
+                'chars': np.bincount(inverse, weights=lengths, minlength=len(level_values)),
+            }
+            for field in ('seconds', 'audio_seconds', 'bytes'):
+                sums[field] = np.bincount(inverse, weights=costs[field], minlength=len(level_values))
+            for i, level in enumerate(level_values):
+                group = {'level': int(level) if level >= 0 else None, 'language': language}
+                group.update({field: sums[field][i].item() for field in RunEstimate.FIELDS})
+                group['chars'] = int(group['chars'])
+                groups.append(group)
+        return RunEstimate(groups)
+
+    def get_work_levels(self, key_col_index, work):
+        """Level từng item của WorkList: tra index level đã cache (df / CsvTable), hoặc parse key (store)"""
+        if self._stored_for(key_col_index) or not self.has_data():
+            return work.levels()
+        if self.table is not None:
+            positions = work.indices  # Index của CsvTable là vị trí dòng
+        else:
+            positions = self.df.index.get_indexer(work.indices)
+        return self._get_level_index(key_col_index)['level'][positions]
+
+    # ==================== Write Back ====================
+
+    RESULT_COLUMNS = ('status', 'output', 'duration')
+
+    def write_back_results(self, results, key_col_index=0, in_place=False, prefix='tts_', backup=True):
+        """
+        Ghi trạng thái / file output / độ dài audio (giây) của từng dòng vào file nguồn theo key,
+        1 lượt đọc-ghi streaming mỗi file (không giữ workbook trong RAM). Chạy lại → cập nhật cột cũ.
+        results: {dialog_id: entry} (ExportReporter.get_row_results())
+        in_place: True = ghi đè file nguồn (backup → .bak); False = file cạnh nguồn (<tên>.tts_status.<ext>)
+        Returns: list (đường dẫn file đã ghi, số dòng có kết quả)
+        """
+        if self.source_type not in ('excel', 'csv', 'folder'):
+            raise ValueError("Ghi kết quả chỉ hỗ trợ file Excel/CSV local")
+
+        column_names = [f"{prefix}{name}" for name in self.RESULT_COLUMNS]
+        values_by_key = {}
+        for dialog_id, entry in results.items():
+            status = entry['status'] if not entry.get('error') else f"{entry['status']}: {entry['error']}"
+            duration = entry.get('duration_seconds')
+            values_by_key[dialog_id] = (status, entry.get('filepath') or None,
+                                        round(duration, 2) if duration else None)
+
+        files = resolve_source_files(self.source_path) if self.source_type == 'folder' else [self.source_path]
+        return [
+            write_result_columns(
+                path, column_names, values_by_key,
+                output_path=path if in_place else None,
+                key_col_index=key_col_index, skip_rows=self.skip_rows, sheets=self.sheets,
+                encoding=self._cache_params.get('encoding', 'utf-8'),
+                key_of=_excel_cell_to_str, backup=backup,
+            )
+            for path in files
+        ]
+
     # ==================== Data Quality ====================
 
     def get_text_for_row(self, row, language_col_index):
         """Lấy text từ row theo cột ngôn ngữ"""
+        import pandas as pd
         col_name = self.column_names[language_col_index]
         text = row[col_name]
         if pd.isna(text) or str(text).strip() == "":
@@ -270,43 +1543,166 @@ class DataManager:
 
     def get_preview_data(self, max_rows=100):
         """Lấy preview data để hiển thị trên GUI"""
-        if self.df is None:
+        if self.stored is not None:
+            head = self.stored.rows(limit=max_rows)
+        elif self.df is None:
             return [], []
-        headers = list(self.df.columns)
-        rows = self.df.head(max_rows).values.tolist()
-        return headers, rows
+        else:
+            head = self.df.head(max_rows)
+        return list(head.columns), head.values.tolist()
 
     def get_total_rows(self):
         """Tổng số dòng dữ liệu"""
-        return len(self.df) if self.df is not None else 0
+        if self.stored is not None:
+            return self.stored.row_count
+        if self.table is not None:
+            return len(self.table)
+        return len(self._df) if self._df is not None else 0
+
+    def has_data(self):
+        """Đã có dữ liệu (df, CsvTable hoặc dataset store)"""
+        return self._df is not None or self.table is not None or self.stored is not None
+
+    # Text dài hơn ngưỡng này có thể gây lỗi TTS
+    LONG_TEXT_LIMIT = 500
+
+    def _column_quality_stats(self, col_index):
+        """
+        Thống kê 1 cột text trong 1 lượt (memoize theo version dữ liệu).
+        Returns dict: empty, whitespace, long (bool arrays), duplicate_texts,
+                      length (dict p50/p90/p99/max trên dòng có text)
+        """
+        cache_key = ('text', col_index)
+        if cache_key in self._quality_cache:
+            return self._quality_cache[cache_key]
+
+        raw = self.df[self.column_names[col_index]]
+        texts = _fill_text(raw)
+        lengths = texts.str.len().to_numpy()
+        stripped = texts.str.strip()
+        stripped_lengths = stripped.str.len().to_numpy()
+
+        missing = raw.isna().to_numpy() | (lengths == 0)
+        whitespace = ~missing & (stripped_lengths == 0)
+        has_text = stripped_lengths > 0
+        filled_lengths = lengths[has_text]
+
+        stats = {
+            'empty': missing | whitespace,
+            'whitespace': whitespace,
+            'long': lengths > self.LONG_TEXT_LIMIT,
+            'duplicate_texts': int(stripped[has_text].duplicated().sum()),
+            'length': {
+                'p50': int(np.percentile(filled_lengths, 50)) if len(filled_lengths) else 0,
+                'p90': int(np.percentile(filled_lengths, 90)) if len(filled_lengths) else 0,
+                'p99': int(np.percentile(filled_lengths, 99)) if len(filled_lengths) else 0,
+                'max': int(filled_lengths.max()) if len(filled_lengths) else 0,
+            },
+        }
+        self._quality_cache[cache_key] = stats
+        return stats
+
+    def _key_quality_stats(self, key_col_index):
+        """Key trùng lặp (bool array, memoize theo version dữ liệu)"""
+        cache_key = ('key', key_col_index)
+        if cache_key not in self._quality_cache:
+            keys = self.df[self.column_names[key_col_index]]
+            self._quality_cache[cache_key] = keys.duplicated().to_numpy()
+        return self._quality_cache[cache_key]
 
     def get_data_quality_report(self, key_col_index=0, text_col_indices=None):
         """
-        Phân tích chất lượng dữ liệu.
+        Phân tích chất lượng dữ liệu (mỗi cột 1 lượt, kết quả cache tới khi dữ liệu đổi).
         Returns dict:
             - total_rows: tổng số dòng
-            - empty_rows: dict {col_index: count}
+            - empty_rows: dict {col_index: count} (NaN, rỗng hoặc chỉ khoảng trắng)
+            - whitespace_rows: dict {col_index: count} (chỉ khoảng trắng)
             - duplicate_keys: count
+            - duplicate_texts: dict {col_index: count}
             - long_texts: dict {col_index: count} (>500 chars)
+            - text_lengths: dict {col_index: {p50, p90, p99, max}}
+            - unmatched_keys: số key không đúng pattern s_dialog_{level}_{seq}
+            - levels: dict {level: {rows, duplicate_keys, empty: {col: n}, long: {col: n}}}
             - issues: list of dicts {type, message, severity}
         """
-        if self.df is None:
-            return {'total_rows': 0, 'issues': []}
+        text_col_indices = [i for i in (text_col_indices or []) if i < len(self.column_names)]
+        if self.stored is None:
+            self.ensure_columns([key_col_index] + text_col_indices)
+            if self.df is None:
+                return {'total_rows': 0, 'issues': []}
+
+        cache_key = ('report', key_col_index, tuple(text_col_indices))
+        if cache_key in self._quality_cache:
+            return self._quality_cache[cache_key]
+
+        has_key = key_col_index < len(self.column_names)
+        if self.stored is not None:
+            stats = self.stored.quality_stats(key_col_index if has_key else None, text_col_indices,
+                                              self.LONG_TEXT_LIMIT)
+        else:
+            stats = self._frame_quality_stats(key_col_index if has_key else None, text_col_indices)
 
-        text_col_indices = text_col_indices or []
-        report = {
+        report = self._build_quality_report(stats)
+        self._quality_cache[cache_key] = report
+        return report
+
+    def _frame_quality_stats(self, key_col_index, text_col_indices):
+        """Số liệu chất lượng từ df (xem _build_quality_report); key_col_index None = không có cột key"""
+        column_stats = {col_idx: self._column_quality_stats(col_idx) for col_idx in text_col_indices}
+        stats = {
             'total_rows': len(self.df),
+            'duplicate_keys': None,
+            'unmatched_keys': None,
+            'levels': {},
+            'columns': {
+                col_idx: {
+                    'empty': int(st['empty'].sum()),
+                    'whitespace': int(st['whitespace'].sum()),
+                    'long': int(st['long'].sum()),
+                    'duplicate_texts': st['duplicate_texts'],
+                    'length': dict(st['length']),
+                }
+                for col_idx, st in column_stats.items()
+            },
+        }
+        if key_col_index is None:
+            return stats
+
+        duplicated_keys = self._key_quality_stats(key_col_index)
+        stats['duplicate_keys'] = int(duplicated_keys.sum())
+
+        # Breakdown theo level (dùng level index, đếm bằng bincount)
+        level_of_row = self._get_level_index(key_col_index)['level']
+        matched = level_of_row >= 0
+        stats['unmatched_keys'] = int((~matched).sum())
+        stats['levels'] = self._level_breakdown(level_of_row[matched], duplicated_keys[matched],
+                                                {i: {k: st[k][matched] for k in ('empty', 'long')}
+                                                 for i, st in column_stats.items()})
+        return stats
+
+    def _build_quality_report(self, stats):
+        """
+        Dựng report + danh sách issue từ số liệu (chung cho df và dataset store).
+        stats: {total_rows, duplicate_keys, unmatched_keys (None nếu không có cột key), levels,
+                columns: {col_index: {empty, whitespace, long, duplicate_texts, length}}}
+        """
+        report = {
+            'total_rows': stats['total_rows'],
             'empty_rows': {},
+            'whitespace_rows': {},
             'duplicate_keys': 0,
+            'duplicate_texts': {},
             'long_texts': {},
+            'text_lengths': {},
+            'unmatched_keys': 0,
+            'levels': stats['levels'],
             'issues': [],
         }
 
         # Kiểm tra duplicate keys
-        if key_col_index < len(self.column_names):
-            key_col = self.column_names[key_col_index]
-            dup_count = self.df[key_col].duplicated().sum()
-            report['duplicate_keys'] = int(dup_count)
+        if stats['duplicate_keys'] is not None:
+            dup_count = stats['duplicate_keys']
+            report['duplicate_keys'] = dup_count
             if dup_count > 0:
                 report['issues'].append({
                     'type': 'duplicate',
@@ -315,40 +1711,72 @@ class DataManager:
                 })
 
         # Kiểm tra từng cột text
-        for col_idx in text_col_indices:
-            if col_idx >= len(self.column_names):
-                continue
+        for col_idx, col_stats in stats['columns'].items():
             col_name = self.column_names[col_idx]
+            empty_count = col_stats['empty']
+            long_count = col_stats['long']
+            report['empty_rows'][col_idx] = empty_count
+            report['whitespace_rows'][col_idx] = col_stats['whitespace']
+            report['long_texts'][col_idx] = long_count
+            report['duplicate_texts'][col_idx] = col_stats['duplicate_texts']
+            report['text_lengths'][col_idx] = col_stats['length']
 
-            # Empty rows
-            empty_count = self.df[col_name].isna().sum() + (self.df[col_name].astype(str).str.strip() == '').sum()
-            report['empty_rows'][col_idx] = int(empty_count)
             if empty_count > 0:
                 report['issues'].append({
                     'type': 'empty',
                     'message': f"⚠️ Cột '{col_name}': {empty_count} dòng trống",
                     'severity': 'warning'
                 })
-
             # Long texts (>500 chars - có thể gây lỗi TTS)
-            long_count = (self.df[col_name].astype(str).str.len() > 500).sum()
-            report['long_texts'][col_idx] = int(long_count)
             if long_count > 0:
                 report['issues'].append({
                     'type': 'long_text',
-                    'message': f"⚠️ Cột '{col_name}': {long_count} dòng text quá dài (>500 ký tự)",
+                    'message': f"⚠️ Cột '{col_name}': {long_count} dòng text quá dài (>{self.LONG_TEXT_LIMIT} ký tự)",
                     'severity': 'info'
                 })
 
+        if stats['unmatched_keys']:
+            report['unmatched_keys'] = stats['unmatched_keys']
+            report['issues'].append({
+                'type': 'unmatched_key',
+                'message': f"ℹ️ {report['unmatched_keys']} key không đúng dạng s_dialog_{{level}}_{{seq}} (không thuộc level nào)",
+                'severity': 'info'
+            })
+
         if not report['issues']:
             report['issues'].append({
                 'type': 'ok',
                 'message': '✅ Dữ liệu hợp lệ, không có vấn đề',
                 'severity': 'success'
             })
-
         return report
 
+    @staticmethod
+    def _level_breakdown(levels, duplicated_keys, column_masks):
+        """Gom số liệu theo level: {level: {rows, duplicate_keys, empty, long}}"""
+        if len(levels) == 0:
+            return {}
+        unique_levels, inverse = np.unique(levels, return_inverse=True)
+        size = len(unique_levels)
+
+        def per_level(mask):
+            return np.bincount(inverse, weights=mask, minlength=size).astype(np.int64)
+
+        rows = np.bincount(inverse, minlength=size)
+        dup = per_level(duplicated_keys)
+        empty = {col: per_level(masks['empty']) for col, masks in column_masks.items()}
+        long = {col: per_level(masks['long']) for col, masks in column_masks.items()}
+
+        breakdown = {}
+        for i, level in enumerate(unique_levels.tolist()):
+            breakdown[level] = {
+                'rows': int(rows[i]),
+                'duplicate_keys': int(dup[i]),
+                'empty': {col: int(counts[i]) for col, counts in empty.items()},
+                'long': {col: int(counts[i]) for col, counts in long.items()},
+            }
+        return breakdown
+
     # ==================== Validation ====================
 
     @staticmethod
@@ -363,9 +1791,15 @@ class DataManager:
         filepath = filepath.strip()
 
         # Check Google Sheet URL
-        if 'docs.google.com/spreadsheets' in filepath or len(filepath) == 44:
+        if is_google_sheet_source(filepath):
             return True, "Google Sheet URL"
 
+        if is_folder_source(filepath):
+            files = resolve_source_files(filepath)
+            if not files:
+                return False, "Không có file CSV/Excel nào"
+            return True, f"✅ {len(files)} file"
+
         if not os.path.exists(filepath):
             return False, "File không tồn tại"
 
@@ -378,23 +1812,33 @@ class DataManager:
 
     # ==================== Auto Detect ====================
 
-    def auto_detect_source(self, source_string, skip_rows=2):
-        """Tự động detect và load từ đúng nguồn"""
+    def auto_detect_source(self, source_string, skip_rows=2, columns=None, on_progress=None, sheets=0):
+        """
+        Tự động detect và load từ đúng nguồn (file, thư mục / glob nhiều file, Google Sheet).
+        columns: projection cho file local (xem load_excel); Google Sheet luôn đọc đủ cột
+        on_progress: tiến độ đọc Excel streaming (xem load_excel)
+        sheets: sheet cần đọc (xem parse_sheet_selection); CSV bỏ qua
+        """
         source_string = source_string.strip()
 
-        if 'docs.google.com/spreadsheets' in source_string or len(source_string) == 44:
-            return self.load_google_sheet(source_string, skip_rows=skip_rows)
+        if is_google_sheet_source(source_string):
+            return self.load_google_sheet(source_string, worksheet_index=sheets, skip_rows=skip_rows)
+        elif is_folder_source(source_string):
+            return self.load_folder(source_string, skip_rows=skip_rows, sheet_name=sheets,
+                                    columns=columns, on_progress=on_progress)
         elif source_string.endswith('.csv'):
-            return self.load_csv(source_string, skip_rows=skip_rows)
+            return self.load_csv(source_string, skip_rows=skip_rows, columns=columns)
         elif source_string.endswith(('.xlsx', '.xls')):
-            return self.load_excel(source_string, skip_rows=skip_rows)
+            return self.load_excel(source_string, skip_rows=skip_rows, sheet_name=sheets,
+                                       columns=columns, on_progress=on_progress)
         else:
             # Thử detect
             if os.path.exists(source_string):
                 ext = os.path.splitext(source_string)[1].lower()
                 if ext == '.csv':
-                    return self.load_csv(source_string, skip_rows=skip_rows)
+                    return self.load_csv(source_string, skip_rows=skip_rows, columns=columns)
                 else:
-                    return self.load_excel(source_string, skip_rows=skip_rows)
+                    return self.load_excel(source_string, skip_rows=skip_rows, sheet_name=sheets,
+                                       columns=columns, on_progress=on_progress)
             else:
-                return self.load_google_sheet(source_string, skip_rows=skip_rows)
+                return self.load_google_sheet(source_string, worksheet_index=sheets, skip_rows=skip_rows)
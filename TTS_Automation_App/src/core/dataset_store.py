@@ -0,0 +1,359 @@
+"""
+Dataset Store - Lưu dataset vào SQLite, truy vấn level/key/work list bằng SQL (không giữ DataFrame trong RAM)
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.core.data_manager import DataManager, WorkList, hash_texts, last_filled_row
+from src.utils.data_cache import CACHE_DIR
+
+STORE_PATH = os.path.join(CACHE_DIR, "datasets.db")
+
+# Khoảng trắng bị bỏ khi xét ô "chỉ có khoảng trắng"
+_WHITESPACE = " \t\r\n\f\v\u00a0\u3000"
+
+
+def _percentile_from_counts(values, counts, q):
+    """np.percentile (nội suy tuyến tính) tính từ histogram giá trị → số lần xuất hiện"""
+    total = int(counts.sum())
+    if total == 0:
+        return 0
+    rank = (total - 1) * q / 100
+    low, high = int(np.floor(rank)), int(np.ceil(rank))
+    cumulative = np.cumsum(counts)
+    v_low = values[np.searchsorted(cumulative, low, side='right')]
+    v_high = values[np.searchsorted(cumulative, high, side='right')]
+    return v_low + (v_high - v_low) * (rank - low)
+
+
+class StoredDataset:
+    """
+    1 dataset đã import: bảng rows_{id} với
+        pos (vị trí dòng), key, level, seq, is_re, c{i} (text từng cột), h{i} (hash text, 0 = trống)
+    Index: key, (level, seq); index hash h{i} tạo khi cần.
+    """
+
+    def __init__(self, store, meta):
+        self.store = store
+        self.id = meta['id']
+        self.table = f"rows_{self.id}"
+        self.source = meta['source']
+        self.params = json.loads(meta['params'])
+        self.column_names = json.loads(meta['columns'])
+        self.key_col_index = meta['key_col']
+        self.row_count = meta['row_count']
+
+    def _level_filter(self, levels):
+        """Điều kiện WHERE theo levels (None = tất cả)"""
+        if levels is None:
+            return "1"
+        return f"level IN ({', '.join(str(int(lv)) for lv in set(levels)) or 'NULL'})"
+
+    def _frame(self, sql, params=()):
+        """Kết quả truy vấn c{i} → DataFrame cột gốc, index = vị trí dòng"""
+        df = self.store.read_frame(sql, params).set_index('pos')
+        df.index.name = None
+        df.columns = [self.column_names[int(c[1:])] for c in df.columns]
+        return df
+
+    def _all_columns(self):
+        return ", ".join(f"c{i}" for i in range(len(self.column_names)))
+
+    # ==================== Levels ====================
+
+    def level_counts(self):
+        rows = self.store.query(f"SELECT level, COUNT(*) FROM {self.table} "
+                                f"WHERE level >= 0 GROUP BY level ORDER BY level")
+        return {level: count for level, count in rows}
+
+    def count_rows(self, levels=None):
+        if levels is None:
+            return self.row_count
+        return self.store.query(f"SELECT COUNT(*) FROM {self.table} WHERE {self._level_filter(levels)}")[0][0]
+
+    def positions(self, levels=None):
+        rows = self.store.query(f"SELECT pos FROM {self.table} WHERE {self._level_filter(levels)} ORDER BY pos")
+        return np.array([r[0] for r in rows], dtype=np.int64)
+
+    def preview_keys(self, levels=None, limit=20):
+        rows = self.store.query(f"SELECT key FROM {self.table} WHERE {self._level_filter(levels)} "
+                                f"ORDER BY pos LIMIT ?", (limit,))
+        return [r[0] for r in rows]
+
+    # ==================== Rows ====================
+
+    def rows(self, levels=None, limit=None):
+        """DataFrame các dòng thuộc levels (index = vị trí dòng)"""
+        sql = (f"SELECT pos, {self._all_columns()} FROM {self.table} "
+               f"WHERE {self._level_filter(levels)} ORDER BY pos")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._frame(sql)
+
+    def rows_at(self, positions):
+        """DataFrame các dòng theo vị trí"""
+        positions = [int(p) for p in positions]
+        frames = []
+        for start in range(0, len(positions), 500):
+            batch = ", ".join(str(p) for p in positions[start:start + 500])
+            frames.append(self._frame(f"SELECT pos, {self._all_columns()} FROM {self.table} "
+                                      f"WHERE pos IN ({batch}) ORDER BY pos"))
+        if not frames:
+            return pd.DataFrame(columns=self.column_names)
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+    def sample(self, col_indices, max_rows):
+        """Các dòng rải đều cả dataset (cho đoán ngôn ngữ)"""
+        step = max(1, self.row_count // max(1, max_rows))
+        columns = ", ".join(f"c{i}" for i in col_indices)
+        return self._frame(f"SELECT pos, {columns} FROM {self.table} WHERE pos % {step} = 0 "
+                           f"ORDER BY pos LIMIT {int(max_rows)}")
+
+    def work_list(self, text_col_index, levels=None):
+        frame = self.store.read_frame(
+            f"SELECT pos, key, c{text_col_index} AS text FROM {self.table} "
+            f"WHERE {self._level_filter(levels)} ORDER BY pos").set_index('pos')
+        if frame.empty:
+            return WorkList([], [], [])
+        return WorkList.from_frame(frame, 'key', 'text')
+
+    def hashes(self, text_col_indices):
+        """
+        Hash text theo key (key trùng → dòng cuối), dạng DataManager._hash_columns.
+        Returns: (DataFrame index=key, cột = tên cột text, uint64; positions)
+        """
+        columns = ", ".join(f"h{i}" for i in text_col_indices)
+        frame = self.store.read_frame(
+            f"SELECT pos, key{', ' + columns if columns else ''} FROM {self.table} "
+            f"WHERE pos IN (SELECT MAX(pos) FROM {self.table} GROUP BY key) ORDER BY pos")
+        snapshot = pd.DataFrame(
+            {self.column_names[i]: frame[f"h{i}"].to_numpy(dtype=np.int64).view(np.uint64)
+             for i in text_col_indices},
+            index=pd.Index(frame['key'].to_numpy(dtype=object), name='key'),
+        )
+        return snapshot, frame['pos'].to_numpy(dtype=np.int64)
+
+    # ==================== Quality ====================
+
+    def _ensure_hash_index(self, col_index):
+        self.store.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_h{col_index} "
+                           f"ON {self.table}(h{col_index})")
+
+    def quality_stats(self, key_col_index, text_col_indices, long_limit):
+        """Số liệu chất lượng dạng DataManager._build_quality_report, tính bằng SQL"""
+        ws = _WHITESPACE.replace("'", "''")
+        missing = {i: f"(c{i} IS NULL OR c{i} = '')" for i in text_col_indices}
+        blank = {i: f"(NOT {missing[i]} AND trim(c{i}, '{ws}') = '')" for i in text_col_indices}
+        long = {i: f"(COALESCE(length(c{i}), 0) > {int(long_limit)})" for i in text_col_indices}
+
+        parts = ["COUNT(*)", "SUM(level < 0)"]
+        for i in text_col_indices:
+            parts += [f"SUM({missing[i]} OR {blank[i]})", f"SUM({blank[i]})", f"SUM({long[i]})"]
+        totals = self.store.query(f"SELECT {', '.join(parts)} FROM {self.table}")[0]
+
+        stats = {
+            'total_rows': totals[0],
+            'duplicate_keys': None,
+            'unmatched_keys': None,
+            'levels': {},
+            'columns': {},
+        }
+        for n, i in enumerate(text_col_indices):
+            empty, whitespace, long_count = (int(v or 0) for v in totals[2 + 3 * n:5 + 3 * n])
+            self._ensure_hash_index(i)
+            duplicates = self.store.query(
+                f"SELECT COUNT(*) - COUNT(DISTINCT h{i}) FROM {self.table} WHERE h{i} != 0")[0][0]
+            lengths = self.store.query(
+                f"SELECT length(c{i}) AS n, COUNT(*) FROM {self.table} "
+                f"WHERE NOT {missing[i]} AND NOT {blank[i]} GROUP BY n ORDER BY n")
+            values = np.array([r[0] for r in lengths], dtype=np.int64)
+            counts = np.array([r[1] for r in lengths], dtype=np.int64)
+            stats['columns'][i] = {
+                'empty': empty,
+                'whitespace': whitespace,
+                'long': long_count,
+                'duplicate_texts': int(duplicates),
+                'length': {
+                    'p50': int(_percentile_from_counts(values, counts, 50)),
+                    'p90': int(_percentile_from_counts(values, counts, 90)),
+                    'p99': int(_percentile_from_counts(values, counts, 99)),
+                    'max': int(values[-1]) if len(values) else 0,
+                },
+            }
+        if key_col_index is None:
+            return stats
+
+        # Key trùng: mọi dòng sau lần xuất hiện đầu tiên của key (giống Series.duplicated)
+        duplicated = self.store.query(
+            f"SELECT r.level, COUNT(*) FROM {self.table} r JOIN "
+            f"(SELECT key, MIN(pos) AS first FROM {self.table} GROUP BY key HAVING COUNT(*) > 1) d "
+            f"ON r.key = d.key WHERE r.pos > d.first GROUP BY r.level")
+        duplicated_by_level = dict(duplicated)
+        stats['duplicate_keys'] = int(sum(duplicated_by_level.values()))
+        stats['unmatched_keys'] = int(totals[1] or 0)
+
+        level_parts = ["level", "COUNT(*)"]
+        for i in text_col_indices:
+            level_parts += [f"SUM({missing[i]} OR {blank[i]})", f"SUM({long[i]})"]
+        for row in self.store.query(f"SELECT {', '.join(level_parts)} FROM {self.table} "
+                                    f"WHERE level >= 0 GROUP BY level ORDER BY level"):
+            stats['levels'][row[0]] = {
+                'rows': row[1],
+                'duplicate_keys': int(duplicated_by_level.get(row[0], 0)),
+                'empty': {i: int(row[2 + 2 * n]) for n, i in enumerate(text_col_indices)},
+                'long': {i: int(row[3 + 2 * n]) for n, i in enumerate(text_col_indices)},
+            }
+        return stats
+
+
+class DatasetStore:
+    """
+    File SQLite chứa nhiều dataset (cache/datasets.db).
+    Mỗi lần import tạo 1 bảng rows_{id}; dataset cũ của cùng nguồn + tham số bị xóa khi import xong.
+    """
+
+    INSERT_BATCH = 5000
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or STORE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS datasets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                params TEXT NOT NULL,
+                fingerprint TEXT,
+                columns TEXT NOT NULL,
+                key_col INTEGER NOT NULL,
+                row_count INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                imported_at TEXT
+            )""")
+        self._conn.commit()
+
+    # ==================== Low-level ====================
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def execute(self, sql, params=()):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def read_frame(self, sql, params=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ==================== Datasets ====================
+
+    @staticmethod
+    def _dumps(value):
+        return json.dumps(value, sort_keys=True, default=str)
+
+    def _load(self, where, params):
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT id, source, params, columns, key_col, row_count FROM datasets WHERE {where}", params)
+            names = [d[0] for d in cursor.description]
+            row = cursor.fetchone()
+        return StoredDataset(self, dict(zip(names, row))) if row else None
+
+    def find(self, source, params, fingerprint):
+        """Dataset đã import của nguồn + tham số + fingerprint (file chưa đổi), None nếu chưa có"""
+        if fingerprint is None:
+            return None
+        return self._load("source = ? AND params = ? AND fingerprint = ? AND status = 'ready' "
+                          "ORDER BY id DESC LIMIT 1",
+                          (source, self._dumps(params), self._dumps(fingerprint)))
+
+    def list_datasets(self):
+        rows = self.query("SELECT id, source, row_count, imported_at FROM datasets "
+                          "WHERE status = 'ready' ORDER BY id")
+        return [dict(zip(('id', 'source', 'row_count', 'imported_at'), r)) for r in rows]
+
+    def drop(self, dataset_id):
+        with self._lock:
+            self._conn.execute(f"DROP TABLE IF EXISTS rows_{int(dataset_id)}")
+            self._conn.execute("DELETE FROM datasets WHERE id = ?", (dataset_id,))
+            self._conn.commit()
+
+    def import_chunks(self, source, params, fingerprint, column_names, key_col_index, chunks, on_progress=None):
+        """
+        Import dataset từ các khối DataFrame (cột theo vị trí, index = vị trí dòng toàn cục).
+        chunks: iterable (chunk_df, total_estimate); dòng trống ở cuối bị bỏ.
+        on_progress(rows_read, total): sau mỗi khối
+        Returns: StoredDataset
+        """
+        n_cols = len(column_names)
+        hash_cols = [i for i in range(n_cols) if i != key_col_index]
+        definitions = ["pos INTEGER PRIMARY KEY", "key TEXT", "level INTEGER", "seq INTEGER", "is_re INTEGER"]
+        definitions += [f"c{i} TEXT" for i in range(n_cols)] + [f"h{i} INTEGER" for i in hash_cols]
+        placeholders = ", ".join("?" * len(definitions))
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO datasets (source, params, fingerprint, columns, key_col, status) "
+                "VALUES (?, ?, ?, ?, ?, 'importing')",
+                (source, self._dumps(params), self._dumps(fingerprint) if fingerprint else None,
+                 json.dumps(column_names, ensure_ascii=False), key_col_index))
+            dataset_id = cursor.lastrowid
+            table = f"rows_{dataset_id}"
+            try:
+                self._conn.execute(f"CREATE TABLE {table} ({', '.join(definitions)})")
+                last_filled = 0
+                for chunk, total in chunks:
+                    self._insert_chunk(table, placeholders, chunk, key_col_index, hash_cols)
+                    last_filled = max(last_filled, last_filled_row(chunk))
+                    if on_progress:
+                        on_progress(int(chunk.index[-1]) + 1 if len(chunk) else 0, total)
+
+                self._conn.execute(f"DELETE FROM {table} WHERE pos >= ?", (last_filled,))
+                self._conn.execute(f"CREATE INDEX idx_{table}_key ON {table}(key)")
+                self._conn.execute(f"CREATE INDEX idx_{table}_level ON {table}(level, seq)")
+                self._conn.execute(
+                    "UPDATE datasets SET row_count = ?, status = 'ready', imported_at = ? WHERE id = ?",
+                    (last_filled, datetime.now().isoformat(), dataset_id))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                self.drop(dataset_id)
+                raise
+
+            # Bản import cũ của cùng nguồn + tham số (kể cả bản import dở) không dùng nữa
+            stale = self._conn.execute("SELECT id FROM datasets WHERE source = ? AND params = ? AND id != ?",
+                                       (source, self._dumps(params), dataset_id)).fetchall()
+            for (old_id,) in stale:
+                self.drop(old_id)
+
+        return self._load("id = ?", (dataset_id,))
+
+    def _insert_chunk(self, table, placeholders, chunk, key_col_index, hash_cols):
+        if chunk.empty:
+            return
+        keys = chunk.iloc[:, key_col_index]
+        is_re, level, seq = DataManager.parse_dialog_keys(keys)
+        hashes = [hash_texts(chunk.iloc[:, i]).view(np.int64).tolist() for i in hash_cols]
+        texts = [chunk.iloc[:, i].astype(object).where(chunk.iloc[:, i].notna(), None).tolist()
+                 for i in range(chunk.shape[1])]
+        key_values = keys.astype(object).where(keys.notna(), None).astype(object)
+        key_values = [None if k is None else str(k) for k in key_values.tolist()]
+
+        records = zip(chunk.index.tolist(), key_values, level.tolist(), seq.tolist(),
+                      is_re.astype(np.int64).tolist(), *texts, *hashes)
+        self._conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", records)
@@ -0,0 +1,247 @@
+"""
+Execution Planner - Dựng trước toàn bộ kế hoạch chạy (ngôn ngữ × level × dòng) dạng bảng cột
+"""
+import csv
+import os
+
+import numpy as np
+
+from src.core.data_manager import DataManager
+
+# Hành động cho từng dòng (lưu dạng mã uint8 theo thứ tự này)
+SYNTHESIZE, SKIP, CACHED, EXISTS, DUPLICATE = range(5)
+ACTIONS = ('synthesize', 'skip', 'cached', 'exists', 'duplicate')
+
+# Lý do ghi vào báo cáo cho các dòng không tổng hợp
+ACTION_REASONS = {
+    SKIP: 'dòng trống',
+    CACHED: 'đã xong ở session trước',
+    EXISTS: 'file output đã có',
+    DUPLICATE: 'trùng đường dẫn output với dòng trước',
+}
+
+
+class ExecutionPlan:
+    """
+    Kế hoạch chạy dạng cột (mỗi cột 1 mảng NumPy cùng độ dài, 1 phần tử / dòng):
+        language, level (-1 = key không khớp pattern), index (vị trí dòng, -1 với dòng trống),
+        dialog_id, text_length, export_dir, output_path, file_exists, action (mã trong ACTIONS), est_seconds
+    texts giữ riêng (không xuất CSV). Engines chỉ đọc bảng, không tự quyết định theo từng dòng.
+    """
+
+    COLUMNS = ('language', 'level', 'index', 'dialog_id', 'text_length', 'export_dir',
+               'output_path', 'file_exists', 'action', 'est_seconds')
+
+    def __init__(self, columns, texts):
+        self.columns = columns
+        self.texts = texts
+
+    @classmethod
+    def concat(cls, plans):
+        if not plans:
+            return cls(_empty_columns(), np.array([], dtype=object))
+        columns = {name: np.concatenate([p.columns[name] for p in plans]) for name in cls.COLUMNS}
+        return cls(columns, np.concatenate([p.texts for p in plans]))
+
+    def __len__(self):
+        return len(self.columns['action'])
+
+    def subset(self, mask):
+        return ExecutionPlan({name: values[mask] for name, values in self.columns.items()}, self.texts[mask])
+
+    def for_language(self, language):
+        return self.subset(self.columns['language'] == language)
+
+    def for_rows(self, indices_by_language):
+        """Chỉ giữ các dòng {ngôn ngữ: index dòng} (VD dòng mới/sửa của watch mode)"""
+        mask = np.zeros(len(self), dtype=bool)
+        for language, indices in indices_by_language.items():
+            mask |= (self.columns['language'] == language) & np.isin(self.columns['index'], indices)
+        return self.subset(mask)
+
+    @property
+    def languages(self):
+        return list(dict.fromkeys(self.columns['language'].tolist()))
+
+    def mask(self, action):
+        return self.columns['action'] == action
+
+    def counts(self):
+        """{tên action: số dòng}"""
+        hist = np.bincount(self.columns['action'], minlength=len(ACTIONS))
+        return {name: int(hist[code]) for code, name in enumerate(ACTIONS)}
+
+    @property
+    def synthesize_count(self):
+        return int(self.mask(SYNTHESIZE).sum())
+
+    def total_seconds(self):
+        return float(self.columns['est_seconds'].sum())
+
+    def export_dirs(self):
+        """Các thư mục có dòng cần tổng hợp (theo thứ tự xuất hiện)"""
+        return list(dict.fromkeys(self.columns['export_dir'][self.mask(SYNTHESIZE)].tolist()))
+
+    def completed_indices(self):
+        """Index các dòng đã xong ở session trước"""
+        return self.columns['index'][self.mask(CACHED)].tolist()
+
+    def text_lengths(self):
+        """{dialog_id: số ký tự} của các dòng cần tổng hợp"""
+        mask = self.mask(SYNTHESIZE)
+        return dict(zip(self.columns['dialog_id'][mask].tolist(), self.columns['text_length'][mask].tolist()))
+
+    def items(self):
+        """Yields item dict {index, dialog_id, text, export_dir, output_path, level, language} của dòng cần tổng hợp"""
+        cols = self.columns
+        for i in np.flatnonzero(self.mask(SYNTHESIZE)):
+            level = int(cols['level'][i])
+            yield {
+                'index': int(cols['index'][i]),
+                'dialog_id': cols['dialog_id'][i],
+                'text': self.texts[i],
+                'export_dir': cols['export_dir'][i],
+                'output_path': cols['output_path'][i],
+                'level': level if level >= 0 else None,
+                'language': cols['language'][i],
+            }
+
+    def not_synthesized(self):
+        """Yields (dialog_id, tên action, lý do) của các dòng không tổng hợp (trừ dòng đã xong ở session trước)"""
+        cols = self.columns
+        mask = ~(self.mask(SYNTHESIZE) | self.mask(CACHED))
+        for i in np.flatnonzero(mask):
+            code = int(cols['action'][i])
+            yield cols['dialog_id'][i], ACTIONS[code], ACTION_REASONS[code]
+
+    def rows(self, mask=None, limit=None):
+        """Yields tuple theo COLUMNS (action là tên) để hiển thị / xuất"""
+        cols = self.columns
+        positions = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        for i in positions[:limit]:
+            level = int(cols['level'][i])
+            yield (
+                cols['language'][i], level if level >= 0 else '', int(cols['index'][i]), cols['dialog_id'][i],
+                int(cols['text_length'][i]), cols['export_dir'][i], cols['output_path'][i],
+                bool(cols['file_exists'][i]), ACTIONS[int(cols['action'][i])], round(float(cols['est_seconds'][i]), 2),
+            )
+
+    def to_csv(self, path):
+        """Xuất toàn bộ kế hoạch ra CSV (UTF-8 BOM để Excel đọc đúng)"""
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.COLUMNS)
+            writer.writerows(self.rows())
+        return path
+
+
+def _empty_columns():
+    return {
+        'language': np.array([], dtype=object), 'level': np.array([], dtype=np.int32),
+        'index': np.array([], dtype=np.int64), 'dialog_id': np.array([], dtype=object),
+        'text_length': np.array([], dtype=np.int64), 'export_dir': np.array([], dtype=object),
+        'output_path': np.array([], dtype=object), 'file_exists': np.array([], dtype=bool),
+        'action': np.array([], dtype=np.uint8), 'est_seconds': np.array([], dtype=np.float64),
+    }
+
+
+def _existing_names(directories):
+    """{thư mục: set tên file} — 1 lần scandir mỗi thư mục"""
+    names = {}
+    for directory in directories:
+        try:
+            with os.scandir(directory) as entries:
+                names[directory] = {entry.name for entry in entries if entry.is_file()}
+        except OSError:
+            names[directory] = set()
+    return names
+
+
+def _language_plan(data_manager, key_col_index, col_index, language, output_dir, pattern, ext, levels,
+                   resume_from, skip_existing, row_costs):
+    """Kế hoạch cho 1 cột ngôn ngữ (chưa xét trùng đường dẫn giữa các ngôn ngữ)"""
+    work = data_manager.get_work_list(key_col_index, col_index, levels)
+    lang_code = language.lower()[:2]
+
+    skipped_ids = np.asarray(work.skipped_ids, dtype=object)
+    skipped_levels = [DataManager.extract_level(k) for k in work.skipped_ids]
+    level = np.concatenate([
+        np.asarray(data_manager.get_work_levels(key_col_index, work), dtype=np.int32),
+        np.array([-1 if lv is None else lv for lv in skipped_levels], dtype=np.int32),
+    ])
+    n_work, n = len(work), len(work) + len(skipped_ids)
+
+    # Thư mục output: format pattern 1 lần mỗi level, rồi trải ra theo inverse index
+    level_values, inverse = np.unique(level, return_inverse=True)
+    try:
+        dirs = np.array([os.path.join(output_dir, pattern.format(level='' if lv < 0 else int(lv), lang=lang_code))
+                         for lv in level_values], dtype=object)
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"subfolder_pattern không hợp lệ ({pattern!r}): {e}") from e
+    export_dir = dirs[inverse] if n else np.array([], dtype=object)
+
+    dialog_ids = np.concatenate([work.dialog_ids, skipped_ids]) if n else np.array([], dtype=object)
+    file_names = dialog_ids + f".{ext}"
+    output_path = export_dir + os.sep + file_names
+
+    # File đã có: so tên file với danh sách thư mục (không stat từng file)
+    file_exists = np.zeros(n, dtype=bool)
+    existing = _existing_names(dirs.tolist())
+    for code, directory in enumerate(dirs.tolist()):
+        rows = inverse == code
+        if existing[directory] and rows.any():
+            file_exists[rows] = np.isin(file_names[rows], list(existing[directory]))
+
+    lengths = np.concatenate([work.text_lengths(), np.zeros(len(skipped_ids), dtype=np.int64)])
+    indices = np.concatenate([work.indices, np.full(len(skipped_ids), -1, dtype=np.int64)])
+
+    action = np.full(n, SYNTHESIZE, dtype=np.uint8)
+    action[n_work:] = SKIP
+    if skip_existing:
+        action[file_exists & (action == SYNTHESIZE)] = EXISTS
+    if resume_from:
+        action[np.isin(indices, list(resume_from)) & (indices >= 0)] = CACHED
+
+    est_seconds = np.zeros(n, dtype=np.float64)
+    if row_costs is not None and n_work:
+        est_seconds[:n_work] = row_costs(language, lengths[:n_work])['seconds']
+        est_seconds[action != SYNTHESIZE] = 0.0
+
+    columns = {
+        'language': np.full(n, language, dtype=object), 'level': level, 'index': indices,
+        'dialog_id': dialog_ids, 'text_length': lengths, 'export_dir': export_dir,
+        'output_path': output_path, 'file_exists': file_exists, 'action': action, 'est_seconds': est_seconds,
+    }
+    texts = np.concatenate([work.texts, np.full(len(skipped_ids), '', dtype=object)])
+    return ExecutionPlan(columns, texts)
+
+
+def build_plan(data_manager, key_col_index, text_columns, output_dir, levels=None, subfolder_pattern='{lang}',
+               ext='mp3', resume_from=None, skip_existing=False, row_costs=None):
+    """
+    Dựng kế hoạch chạy cho mọi cột ngôn ngữ trong 1 lượt vectorized.
+    text_columns: {col_index: tên ngôn ngữ}
+    subfolder_pattern: thư mục con theo {level} / {lang} (mã 2 ký tự), VD "Level_{level}/{lang}"
+    resume_from: {tên ngôn ngữ: index đã xong ở session trước} → 'cached' (chỉ trong đúng ngôn ngữ đó)
+    skip_existing: True = dòng đã có file output → 'exists' (không tổng hợp lại)
+    row_costs: callable(language, text_lengths) → {'seconds': ...} (xem estimate_row_costs) để điền est_seconds
+    Dòng trùng đường dẫn output với dòng trước (key lặp, pattern thiếu {lang}...) → 'duplicate'
+    Returns: ExecutionPlan
+    """
+    plan = ExecutionPlan.concat([
+        _language_plan(data_manager, key_col_index, col_index, language, output_dir, subfolder_pattern, ext,
+                       levels, (resume_from or {}).get(language), skip_existing, row_costs)
+        for col_index, language in text_columns.items()
+    ])
+
+    # Trùng đường dẫn: giữ dòng đầu tiên, các dòng sau không tổng hợp
+    action = plan.columns['action']
+    active = np.flatnonzero(action != SKIP)
+    if len(active):
+        _, first = np.unique(plan.columns['output_path'][active], return_index=True)
+        repeated = np.ones(len(active), dtype=bool)
+        repeated[first] = False
+        duplicate_rows = active[repeated]
+        action[duplicate_rows] = DUPLICATE
+        plan.columns['est_seconds'][duplicate_rows] = 0.0
+    return plan
@@ -0,0 +1,486 @@
+"""
+Job Server - Dịch vụ export chạy nền, nhận job qua HTTP/JSON
+"""
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.core.api_engine import APIEngine
+from src.core.data_manager import DataManager
+from src.core.execution_planner import build_plan
+from src.utils.export_reporter import ExportReporter
+
+JOBS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "jobs")
+
+
+class JobStore:
+    """Hàng đợi job bền vững: mỗi job là 1 file JSON trong thư mục jobs/"""
+
+    # Trạng thái job
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+    def __init__(self, jobs_dir=None):
+        self.jobs_dir = jobs_dir or JOBS_DIR
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self._cond = threading.Condition()
+        self.jobs = {}
+        self._load_existing()
+
+    def _job_path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        """Ghi job ra file (ghi file tạm rồi replace để không hỏng khi crash)"""
+        path = self._job_path(job['id'])
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _load_existing(self):
+        """Load lại các job từ lần chạy trước. Job đang chạy dở → đưa về hàng đợi"""
+        for filename in os.listdir(self.jobs_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, filename), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except Exception:
+                continue
+            if job.get('status') == self.RUNNING:
+                job['status'] = self.QUEUED
+                self._save(job)
+            self.jobs[job['id']] = job
+
+    @staticmethod
+    def validate_spec(spec):
+        """
+        Kiểm tra job spec.
+        Bắt buộc: source, output_dir
+        Tùy chọn: skip_rows, key_column, levels, languages, columns, voices,
+                  format, subfolder_pattern, coalesce, skip_existing
+        """
+        if not isinstance(spec, dict):
+            raise ValueError("Job spec phải là JSON object")
+        for field in ('source', 'output_dir'):
+            if not spec.get(field):
+                raise ValueError(f"Thiếu trường bắt buộc: {field}")
+        if spec.get('format', 'mp3') not in ('mp3', 'wav'):
+            raise ValueError(f"Định dạng không hỗ trợ: {spec.get('format')}")
+
+    def submit(self, spec):
+        """Thêm job mới vào hàng đợi"""
+        self.validate_spec(spec)
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'status': self.QUEUED,
+            'spec': spec,
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'progress': {},
+            'success': 0,
+            'errors': 0,
+            'skipped': 0,
+            'manifest': None,
+            'message': '',
+        }
+        with self._cond:
+            self.jobs[job['id']] = job
+            self._save(job)
+            self._cond.notify()
+        return dict(job)
+
+    def next_job(self, timeout=None):
+        """Lấy job cũ nhất đang chờ và đánh dấu running. Block tới khi có job."""
+        with self._cond:
+            while True:
+                queued = [j for j in self.jobs.values() if j['status'] == self.QUEUED]
+                if queued:
+                    job = min(queued, key=lambda j: j['created_at'])
+                    job['status'] = self.RUNNING
+                    job['started_at'] = datetime.now().isoformat()
+                    self._save(job)
+                    return job
+                if not self._cond.wait(timeout):
+                    return None
+
+    def update(self, job_id, persist=True, **fields):
+        """Cập nhật các trường của job"""
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if not job:
+                return None
+            job.update(fields)
+            if persist:
+                self._save(job)
+            return dict(job)
+
+    def get(self, job_id):
+        with self._cond:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self):
+        with self._cond:
+            return sorted((dict(j) for j in self.jobs.values()), key=lambda j: j['created_at'])
+
+    def cancel(self, job_id):
+        """
+        Hủy job. Job đang chờ → cancelled ngay.
+        Returns: trạng thái trước khi hủy, hoặc None nếu không tìm thấy
+        """
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if not job:
+                return None
+            previous = job['status']
+            if previous == self.QUEUED:
+                job['status'] = self.CANCELLED
+                job['finished_at'] = datetime.now().isoformat()
+                self._save(job)
+            return previous
+
+    def wake_all(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class ExportJobServer:
+    """
+    Dịch vụ export chạy nền:
+    - Nhận job qua HTTP/JSON, lưu vào hàng đợi bền vững (JobStore)
+    - Worker pool dùng chung, mỗi worker có 1 APIEngine riêng
+    - Dữ liệu nguồn đã load được cache dùng chung giữa các job
+    - Mỗi job có manifest riêng
+    """
+
+    DATASET_CACHE_SIZE = 4  # Số nguồn đã load giữ lại (LRU)
+
+    def __init__(self, config_manager=None, host='127.0.0.1', port=8765, workers=2,
+                 jobs_dir=None, logger=None):
+        self.config = config_manager
+        self.host = host
+        self.port = port
+        self.worker_count = max(1, int(workers))
+        self.store = JobStore(jobs_dir)
+        self.logger = logger
+
+        self._stop_event = threading.Event()
+        self._workers = []
+        self._active_engines = {}  # {job_id: APIEngine}
+        self._cancel_events = {}   # {job_id: Event} — cờ hủy riêng của job, engine không tự xóa
+        self._active_lock = threading.Lock()
+        self._dataset_cache = OrderedDict()  # {(source, skip_rows): {'stamp': (mtime_ns, size), 'data_manager', 'lock'}}
+        self._dataset_lock = threading.Lock()
+        self._httpd = None
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.info(msg)
+
+    # ==================== Lifecycle ====================
+
+    def start(self):
+        """Khởi động worker pool + HTTP server (không block)"""
+        self._stop_event.clear()
+        for i in range(self.worker_count):
+            t = threading.Thread(target=self._worker_loop, args=(i,), daemon=True)
+            t.start()
+            self._workers.append(t)
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _JobRequestHandler)
+        self._httpd.job_server = self
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self._log(f"🚀 Job server: http://{self.host}:{self.port} ({self.worker_count} workers)")
+
+    def serve_forever(self):
+        """Khởi động và block cho tới khi shutdown()"""
+        self.start()
+        try:
+            while not self._stop_event.wait(0.5):
+                pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Dừng server, dừng các job đang chạy (job sẽ được chạy lại lần sau)"""
+        if self._stop_event.is_set() and self._httpd is None:
+            return
+        self._stop_event.set()
+        self.store.wake_all()
+        with self._active_lock:
+            for engine in self._active_engines.values():
+                engine.stop()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        self._log("🛑 Job server đã dừng")
+
+    # ==================== Job Control ====================
+
+    def submit_job(self, spec):
+        job = self.store.submit(spec)
+        self._log(f"📥 Nhận job {job['id']}: {spec.get('source')}")
+        return job
+
+    def cancel_job(self, job_id):
+        """Hủy job đang chờ hoặc đang chạy"""
+        previous = self.store.cancel(job_id)
+        if previous == JobStore.RUNNING:
+            with self._active_lock:
+                engine = self._active_engines.get(job_id)
+                cancel_event = self._cancel_events.get(job_id)
+            if cancel_event:
+                cancel_event.set()
+            if engine:
+                engine.stop()
+            self.store.update(job_id, status=JobStore.CANCELLED,
+                              finished_at=datetime.now().isoformat())
+        return self.store.get(job_id)
+
+    # ==================== Workers ====================
+
+    def _worker_loop(self, worker_index):
+        engine = APIEngine()
+        while not self._stop_event.is_set():
+            job = self.store.next_job(timeout=1.0)
+            if job is None:
+                continue
+
+            job_id = job['id']
+            cancel_event = threading.Event()
+            engine.cancel_event = cancel_event
+            with self._active_lock:
+                self._active_engines[job_id] = engine
+                self._cancel_events[job_id] = cancel_event
+            self._log(f"▶️ Worker {worker_index} chạy job {job_id}")
+
+            try:
+                self._run_job(job, engine)
+                status = JobStore.DONE
+                message = ''
+            except Exception as e:
+                status = JobStore.FAILED
+                message = str(e)
+                self._log(f"❌ Job {job_id} lỗi: {e}")
+            finally:
+                engine.cancel_event = None
+                with self._active_lock:
+                    self._active_engines.pop(job_id, None)
+                    self._cancel_events.pop(job_id, None)
+
+            current = self.store.get(job_id)
+            if self._stop_event.is_set() and current['status'] == JobStore.RUNNING:
+                # Server tắt giữa chừng → job sẽ được chạy lại lần sau
+                self.store.update(job_id, status=JobStore.QUEUED)
+                continue
+            if current['status'] == JobStore.CANCELLED:
+                status = JobStore.CANCELLED
+            self.store.update(job_id, status=status, message=message,
+                              finished_at=datetime.now().isoformat())
+            self._log(f"🏁 Job {job_id}: {status}")
+
+    def _get_dataset(self, source, skip_rows):
+        """
+        Load dữ liệu nguồn, dùng lại bản đã load nếu file chưa thay đổi (cùng mtime + size).
+        Returns: (DataManager, Lock) — DataManager dùng chung giữa các worker và tạo index / cột lazily,
+        mọi truy cập phải giữ Lock đi kèm
+        """
+        key = (source, skip_rows)
+        stamp = None
+        if os.path.exists(source):
+            stat = os.stat(source)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        # Lock chung chỉ giữ lúc lấy / tạo entry; load file giữ lock riêng của entry
+        # → job khác nguồn không phải chờ, job cùng nguồn chờ 1 lần load rồi dùng lại
+        with self._dataset_lock:
+            entry = self._dataset_cache.get(key)
+            if entry is None:
+                entry = self._dataset_cache[key] = {'stamp': None, 'data_manager': None, 'lock': threading.Lock()}
+            self._dataset_cache.move_to_end(key)
+            while len(self._dataset_cache) > self.DATASET_CACHE_SIZE:
+                self._dataset_cache.popitem(last=False)
+
+        with entry['lock']:
+            if entry['data_manager'] is None or stamp is None or entry['stamp'] != stamp:
+                data_manager = DataManager()
+                data_manager.light_csv = True  # CSV không cần pandas (xem CsvTable)
+                data_manager.auto_detect_source(source, skip_rows=skip_rows)
+                entry['data_manager'], entry['stamp'] = data_manager, stamp
+            return entry['data_manager'], entry['lock']
+
+    def _resolve_language_columns(self, data_manager, spec):
+        """
+        Xác định {col_index: language} cho job.
+        Ưu tiên: spec['columns'] → auto-detect theo tên cột → theo nội dung → config columns.language_map
+        """
+        if spec.get('columns'):
+            lang_cols = {int(k): v for k, v in spec['columns'].items()}
+        else:
+            lang_cols = data_manager.auto_detect_all_languages(use_content=False)
+            if not lang_cols:
+                lang_cols = data_manager.detect_languages_by_content(range(len(data_manager.column_names)))
+            if not lang_cols and self.config:
+                language_map = self.config.get('columns.language_map', {}) or {}
+                lang_cols = {int(k): v for k, v in language_map.items()}
+
+        wanted = spec.get('languages')
+        if wanted:
+            lang_cols = {idx: lang for idx, lang in lang_cols.items() if lang in wanted}
+
+        if not lang_cols:
+            raise ValueError("Không xác định được cột ngôn ngữ cho job")
+        return lang_cols
+
+    def _resolve_voice(self, spec, language):
+        voice = (spec.get('voices') or {}).get(language)
+        if not voice and self.config:
+            voice = (self.config.get('api.voices', {}) or {}).get(language)
+        if not voice:
+            presets = APIEngine.get_voices_for_language(language)
+            voice = presets[0][0] if presets else None
+        if not voice:
+            raise ValueError(f"Không có giọng đọc cho ngôn ngữ: {language}")
+        return voice
+
+    def _run_job(self, job, engine):
+        """Chạy 1 job: mọi ngôn ngữ × mọi level đã chọn"""
+        job_id = job['id']
+        spec = job['spec']
+        skip_rows = int(spec.get('skip_rows', 2))
+        data_manager, dataset_lock = self._get_dataset(spec['source'], skip_rows)
+        key_col_idx = int(spec.get('key_column', 0))
+
+        levels = spec.get('levels')
+        if isinstance(levels, str):
+            levels = DataManager.parse_level_selection(levels)
+
+        output_dir = spec['output_dir']
+        pattern = spec.get('subfolder_pattern', "Level_{level}/{lang}") if levels is not None else "{lang}"
+
+        reporter = ExportReporter()
+        reporter.start_tracking()
+        totals = {'success': 0, 'errors': 0, 'skipped': 0}
+
+        def on_progress(current, total):
+            self.store.update(job_id, persist=False, progress=dict(
+                self.store.get(job_id)['progress'], current=current, total=total))
+
+        engine.callbacks = {
+            'on_complete': lambda dialog_id, filepath: reporter.record_export(dialog_id, filepath),
+            'on_progress': on_progress,
+        }
+        engine.set_format(spec.get('format', 'mp3'))
+        if self.config:
+            engine.set_retry_attempts(self.config.get_setting('advanced.retry_attempts', 2))
+            engine.set_max_concurrent(self.config.get_setting('performance.max_concurrent_exports', 3))
+            engine.set_coalescing(spec.get('coalesce', False),
+                                  self.config.get_setting('performance.coalesce_max_words', 6),
+                                  self.config.get_setting('performance.coalesce_max_items', 20))
+        else:
+            engine.set_coalescing(spec.get('coalesce', False))
+
+        # Kế hoạch cho mọi ngôn ngữ × level dựng 1 lần; engine chỉ chạy các dòng cần tổng hợp.
+        # Sau bước này job không đọc DataManager nữa → chỉ giữ lock của dataset lúc dựng kế hoạch
+        with dataset_lock:
+            lang_cols = self._resolve_language_columns(data_manager, spec)
+            plan = build_plan(data_manager, key_col_idx, lang_cols, output_dir, levels=levels,
+                              subfolder_pattern=pattern, ext=spec.get('format', 'mp3'),
+                              skip_existing=bool(spec.get('skip_existing', False)))
+        for dialog_id, _action, reason in plan.not_synthesized():
+            reporter.record_export(dialog_id, status='skipped', error=reason)
+
+        for language in plan.languages:
+            cancelled = engine.cancel_event is not None and engine.cancel_event.is_set()
+            if cancelled or self.store.get(job_id)['status'] != JobStore.RUNNING or self._stop_event.is_set():
+                break
+
+            lang_plan = plan.for_language(language)
+            self.store.update(job_id, progress={'language': language, 'levels': levels,
+                                                'current': 0, 'total': len(lang_plan)})
+            engine.export_plan(lang_plan, voice=self._resolve_voice(spec, language))
+
+            for item in engine.failed_items:
+                reporter.record_export(item['dialog_id'], status='error', error=item.get('error'))
+            totals['success'] += engine.success_count
+            totals['errors'] += engine.error_count
+            totals['skipped'] += engine.skipped_count
+            self.store.update(job_id, **totals)
+
+        reporter.stop_tracking()
+        manifest_path = os.path.join(output_dir, f"manifest_{job_id}.json")
+        reporter.generate_manifest(manifest_path)
+        self.store.update(job_id, manifest=manifest_path, **totals)
+
+
+class _JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP API:
+        POST /jobs               → tạo job (body: job spec JSON)
+        GET  /jobs               → danh sách job
+        GET  /jobs/<id>          → trạng thái job
+        GET  /jobs/<id>/manifest → manifest của job đã xong
+        POST /jobs/<id>/cancel   → hủy job
+    """
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parts(self):
+        return [p for p in self.path.split('?', 1)[0].split('/') if p]
+
+    def do_GET(self):
+        server = self.server.job_server
+        parts = self._parts()
+        if parts == ['jobs']:
+            return self._send_json(200, server.store.list_jobs())
+        if len(parts) >= 2 and parts[0] == 'jobs':
+            job = server.store.get(parts[1])
+            if not job:
+                return self._send_json(404, {'error': 'Job không tồn tại'})
+            if len(parts) == 2:
+                return self._send_json(200, job)
+            if parts[2:] == ['manifest']:
+                if not job.get('manifest') or not os.path.exists(job['manifest']):
+                    return self._send_json(404, {'error': 'Job chưa có manifest'})
+                with open(job['manifest'], 'r', encoding='utf-8') as f:
+                    return self._send_json(200, json.load(f))
+        self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        server = self.server.job_server
+        parts = self._parts()
+        if parts == ['jobs']:
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                spec = json.loads(self.rfile.read(length) or b'{}')
+                job = server.submit_job(spec)
+            except (ValueError, json.JSONDecodeError) as e:
+                return self._send_json(400, {'error': str(e)})
+            return self._send_json(201, job)
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            job = server.cancel_job(parts[1])
+            if not job:
+                return self._send_json(404, {'error': 'Job không tồn tại'})
+            return self._send_json(200, job)
+        self._send_json(404, {'error': 'Not found'})
+
+    def log_message(self, format, *args):
+        pass  # Không in access log ra console
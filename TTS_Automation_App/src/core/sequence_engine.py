@@ -9,6 +9,14 @@ import threading
 import copy
 import os
 import glob
+from collections import deque
+
+import numpy as np
+
+from src.core.data_manager import WorkList, format_id_list
+from src.utils.file_watcher import WatcherPool
+from src.utils.screen_region import BLOCK, changed_cells, grab_region, grab_screen, region_signature, wait_for_region
+from src.utils.step_calibration import StepCalibration
 
 
 class SequenceEngine:
@@ -23,6 +31,19 @@ class SequenceEngine:
         'fast': 0.5,
     }
 
+    # Delay cố định của action nhập text
+    PASTE_DELAY = 0.3       # Chờ clipboard trước Ctrl+V
+    TYPE_INTERVAL = 0.05    # Giây mỗi ký tự khi type_text
+
+    # Tự hiệu chỉnh thời gian chờ (xem StepCalibration)
+    PROBE_INTERVAL = 0.1         # Giây giữa 2 lần chụp màn hình khi đo thời gian sẵn sàng
+    PROBE_BLOCK = 16             # Lưới xám khối 16×16 pixel cho ảnh toàn màn hình
+    PROBE_MIN_CELLS = 3          # Đổi ít ô hơn (con trỏ nhấp nháy...) không tính là UI thay đổi
+    PROBE_MIN_WAIT = 0.3         # Bước chờ ngắn hơn: không đo, không hiệu chỉnh (lợi không đáng 1 lần chụp)
+    RECHECK_EVERY = 20           # Cứ N dialog chạy lại 1 lần với wait đầy đủ để cập nhật mẫu
+    RETRY_WINDOW = 10            # Xét retry trong N dialog gần nhất
+    RETRY_SPIKE = 3              # Số dialog phải retry trong cửa sổ → quay về wait đầy đủ
+
     def __init__(self, callbacks=None):
         """
         callbacks: dict với các key:
@@ -48,6 +69,15 @@ class SequenceEngine:
         self.timing_preset = 'normal'
         self.retry_attempts = 2
         self.dry_run = False
+        self.region_waits = True     # Step có wait_until: chờ theo vùng màn hình, wait_after là timeout
+        self._region_wait_failed = False
+        self.calibration = None      # StepCalibration khi bật tự hiệu chỉnh (set_calibration)
+        self._calibration_suspended = False
+        self._full_wait_dialog = False
+        self._dialog_trouble = False  # Dialog hiện tại có lần chờ nào timeout
+        self._dialogs_run = 0
+        self._recent_retries = deque(maxlen=self.RETRY_WINDOW)
+        self._watchers = WatcherPool()  # 1 watcher mỗi thư mục export, dùng chung cả batch
         self.failed_items = []
         self.completed_indices = []
         self.success_count = 0
@@ -80,6 +110,20 @@ class SequenceEngine:
         """Bật/tắt dry-run mode"""
         self.dry_run = enabled
 
+    def set_calibration(self, enabled, template_name=None):
+        """
+        Bật/tắt tự hiệu chỉnh thời gian chờ cho template đang load.
+        Step chưa đủ mẫu: chờ đủ wait_after và đo lúc màn hình ngừng đổi; đủ mẫu: chờ p99 + margin.
+        """
+        if not enabled:
+            self.calibration = None
+            return
+        name = template_name or (self.template or {}).get('name') or 'current'
+        self.calibration = StepCalibration(name)
+        steps = (self.template or {}).get('steps', [])
+        self._log(f"🧠 Tự hiệu chỉnh wait: {self.calibration.calibrated_steps(steps)}/{len(steps)} bước đã đủ mẫu "
+                  f"({self.calibration.environment})")
+
     def _emit(self, event_name, *args):
         """Gọi callback nếu có"""
         cb = self.callbacks.get(event_name)
@@ -101,55 +145,47 @@ class SequenceEngine:
 
     # ==================== Smart Wait (File/Process Detection) ====================
 
-    def _wait_for_file_export(self, export_dir, dialog_id, max_wait=15, check_interval=0.5):
+    def _export_names(self, dialog_id):
+        return (f"{dialog_id}.mp3", f"{dialog_id}.wav")
+
+    def _expect_export(self, export_dir, dialog_id):
+        """Báo watcher của thư mục export trước khi chạy các step (file tới sớm vẫn không bị lỡ)"""
+        if export_dir:
+            watcher = self._watchers.get(export_dir)
+            if watcher is not None:
+                watcher.expect(self._export_names(dialog_id))
+
+    def _wait_for_file_export(self, export_dir, dialog_id, max_wait=15):
         """
         Chờ cho đến khi file audio được export.
-        Thay vì delay cứng, detect file thực tế được tạo.
+        Thay vì delay cứng, chờ sự kiện file ghi xong từ watcher của thư mục
+        (inotify trên Linux, quét thư mục ở nơi khác — xem src/utils/file_watcher.py).
         
         Args:
             export_dir: Thư mục chứa file export
             dialog_id: ID của dialog (tên file)
             max_wait: Thời gian chờ tối đa (giây)
-            check_interval: Khoảng time check file (giây)
         
         Returns:
             True nếu file được tạo, False nếu timeout
         """
-        expected_file = os.path.join(export_dir, f"{dialog_id}.mp3")
-        expected_file_wav = os.path.join(export_dir, f"{dialog_id}.wav")
-        
+        watcher = self._watchers.get(export_dir)
+        if watcher is None:
+            return False
+
         start_time = time.time()
-        last_size = 0
-        stable_count = 0  # Đếm bao nhiêu lần file size không thay đổi
-        
         self._log(f"  ⏳ Chờ file export: {dialog_id}...")
-        
-        while time.time() - start_time < max_wait:
-            if not self._check_controls():
-                return False
-            
-            # Kiểm tra file MP3 hoặc WAV
-            for filepath in [expected_file, expected_file_wav]:
-                if os.path.exists(filepath):
-                    file_size = os.path.getsize(filepath)
-                    
-                    # File size phải > 0 và ổn định (không thay đổi 2 lần liên tiếp)
-                    if file_size > 0:
-                        if file_size == last_size:
-                            stable_count += 1
-                        else:
-                            stable_count = 0
-                            last_size = file_size
-                        
-                        if stable_count >= 2:  # File size ổn định
-                            elapsed = time.time() - start_time
-                            self._log(f"  ✅ File đã export trong {elapsed:.1f}s")
-                            return True
-            
-            time.sleep(check_interval)
-        
-        # Timeout
+
+        path = watcher.wait_for(self._export_names(dialog_id), max_wait, should_continue=self._check_controls)
         elapsed = time.time() - start_time
+        if path is not None:
+            self._log(f"  ✅ File đã export trong {elapsed:.1f}s")
+            return True
+        if self._stop_event.is_set():
+            return False
+
+        # Timeout
+        self._dialog_trouble = True
         self._log(f"  ⚠️ Timeout chờ file (>{max_wait}s)")
         return False
 
@@ -163,7 +199,7 @@ class SequenceEngine:
         if export_dir and dialog_id and os.path.isdir(export_dir):
             # Giảm max_wait xuống (vì nó có fallback delay)
             max_wait_file = min(wait_after * 1.5, 20)
-            success = self._wait_for_file_export(export_dir, dialog_id, max_wait=max_wait_file, check_interval=0.3)
+            success = self._wait_for_file_export(export_dir, dialog_id, max_wait=max_wait_file)
             
             if success:
                 return  # File đã được export, không cần chờ thêm
@@ -177,6 +213,129 @@ class SequenceEngine:
             time.sleep(chunk)
             elapsed += chunk
 
+    # ==================== Region Wait (Screen Change Detection) ====================
+
+    def _region_spec(self, step):
+        """wait_until của step nếu đang dùng chờ theo vùng màn hình"""
+        wait_until = step.get('wait_until')
+        if not wait_until or not self.region_waits or self._region_wait_failed:
+            return None
+        return wait_until
+
+    def _disable_region_waits(self, error):
+        """Không chụp được màn hình → cả batch quay về chờ đủ wait_after"""
+        self._region_wait_failed = True
+        self._log(f"  ⚠️ Không chụp được vùng màn hình ({error}), dùng wait_after cố định")
+
+    def _region_baseline(self, wait_until):
+        """Chụp vùng trước action (điều kiện 'changed' / 'stable')"""
+        if wait_until.get('condition', 'stable') == 'matches':
+            return None
+        try:
+            return region_signature(grab_region(wait_until['region']))
+        except Exception as e:
+            self._disable_region_waits(e)
+            return None
+
+    def _wait_for_region(self, wait_until, timeout, baseline=None):
+        """
+        Chờ tới khi vùng màn hình đạt điều kiện (xem screen_region.wait_for_region), tối đa timeout giây.
+        Returns: True nếu UI sẵn sàng trước timeout
+        """
+        if wait_until.get('condition') == 'changed' and baseline is None:
+            return False
+        try:
+            elapsed = wait_for_region(wait_until, timeout, baseline, should_continue=self._check_controls)
+        except Exception as e:
+            self._disable_region_waits(e)
+            return False
+        if elapsed is None:
+            if not self._stop_event.is_set():
+                self._dialog_trouble = True
+                self._log(f"  ⚠️ Vùng màn hình chưa sẵn sàng sau {timeout:.1f}s")
+            return False
+        self._log(f"  ⚡ Sẵn sàng sau {elapsed:.2f}s (tối đa {timeout:.1f}s)")
+        return True
+
+    # ==================== Step Calibration ====================
+
+    def _calibrated_wait(self, step, wait_after):
+        """
+        Chờ theo mẫu đã học. Chỉ chụp màn hình để đo khi step đang được hiệu chỉnh:
+        chưa đủ mẫu hoặc dialog kiểm tra lại. Đang tạm ngưng / bước quá ngắn → chờ đủ, không đo.
+        """
+        key = str(step.get('id', 0))
+        if (self._calibration_suspended or wait_after < self.PROBE_MIN_WAIT
+                or not self.calibration.is_observable(key, step)):
+            return self._sleep(wait_after)
+        if not self._full_wait_dialog:
+            wait = self.calibration.calibrated_wait(key, step, wait_after)
+            if wait is not None:
+                return self._sleep(wait)
+
+        ready, grabs = self._observe_wait(wait_after, (step.get('wait_until') or {}).get('region'))
+        if ready is not None:
+            self.calibration.record(key, step, ready)
+        elif grabs >= 2 and not self._stop_event.is_set():
+            # Chụp được nhưng màn hình không đổi (paste / hotkey / cửa sổ nền...): không có mốc sẵn sàng
+            # để học, ghi 0s sẽ cắt wait của step về gần 0 → chỉ đếm, đủ lần thì thôi hiệu chỉnh step này
+            if self.calibration.mark_unobserved(key, step):
+                self._log(f"  🧠 Bước {step.get('label', key)}: màn hình không đổi → giữ wait đầy đủ")
+        return not self._stop_event.is_set()
+
+    def _observe_wait(self, duration, region=None):
+        """
+        Chờ đủ duration, đồng thời chụp màn hình (lưới thu nhỏ) để đo lúc UI ngừng thay đổi.
+        region: chỉ chụp vùng [x, y, w, h] (wait_until của step) thay vì toàn màn hình
+        Returns: (giây tới lần thay đổi cuối — None nếu không thấy thay đổi nào sau lần chụp đầu /
+                  không chụp được / bị dừng, số lần chụp được)
+        """
+        if region:
+            grab, block = (lambda: grab_region(region)), BLOCK
+        else:
+            grab, block = grab_screen, self.PROBE_BLOCK
+        start = time.perf_counter()
+        previous, settled, grabs = None, None, 0
+        while True:
+            elapsed = time.perf_counter() - start
+            if elapsed >= duration:
+                return settled, grabs
+            if not self._check_controls():
+                return None, grabs
+            if not self._region_wait_failed:
+                try:
+                    signature = region_signature(grab(), block=block)
+                except Exception as e:
+                    self._disable_region_waits(e)
+                else:
+                    # Lần chụp đầu chỉ là mốc so sánh, không phải thay đổi
+                    if previous is not None and changed_cells(signature, previous) >= self.PROBE_MIN_CELLS:
+                        settled = elapsed
+                    previous = signature
+                    grabs += 1
+            time.sleep(max(0.0, min(self.PROBE_INTERVAL, duration - (time.perf_counter() - start))))
+
+    def _note_dialog_attempts(self, retried):
+        """
+        Theo dõi dialog gặp sự cố (retry, hoặc chờ file / vùng màn hình bị timeout).
+        Tăng vọt khi đang dùng wait đã hiệu chỉnh → quay về wait đầy đủ cho phần còn lại của batch
+        """
+        self._recent_retries.append(retried)
+        if self.calibration is None or self._calibration_suspended:
+            return
+        if sum(self._recent_retries) >= self.RETRY_SPIKE:
+            self._calibration_suspended = True
+            self.calibration.widen_margin()
+            self._log(f"⚠️ {sum(self._recent_retries)}/{len(self._recent_retries)} dialog gần nhất phải retry "
+                      f"→ dùng wait đầy đủ cho phần còn lại, nới margin lên {self.calibration.margin:.0%}")
+
+    def _finish_calibration(self):
+        """Cuối batch: batch êm thì thu margin, lưu mẫu"""
+        if self.calibration is None:
+            return
+        if not self._calibration_suspended and not any(self._recent_retries):
+            self.calibration.relax_margin()
+        self.calibration.save()
 
     # ==================== Template Editing (Undo/Redo) ====================
 
@@ -250,6 +409,9 @@ class SequenceEngine:
 
         self._log(f"  → {label}")
 
+        wait_until = self._region_spec(step) if wait_after > 0 else None
+        baseline = self._region_baseline(wait_until) if wait_until else None
+
         try:
             if action == 'click':
                 if target and isinstance(target, (list, tuple)) and len(target) == 2:
@@ -273,13 +435,13 @@ class SequenceEngine:
                 text = self._resolve_variable(source, context)
                 if text:
                     pyperclip.copy(str(text))
-                    time.sleep(0.3)
+                    time.sleep(self.PASTE_DELAY)
                     pyautogui.hotkey('ctrl', 'v')
 
             elif action == 'type_text':
                 text = self._resolve_variable(str(target), context)
                 if text:
-                    pyautogui.typewrite(text, interval=0.05)
+                    pyautogui.typewrite(text, interval=self.TYPE_INTERVAL)
 
             elif action == 'wait':
                 pass  # wait_after xử lý bên dưới
@@ -292,6 +454,15 @@ class SequenceEngine:
             self._log(f"  ❌ Lỗi: {e}")
             return False
 
+        if wait_until:
+            # Chờ theo vùng màn hình: sẵn sàng là đi tiếp; timeout / lỗi chụp → chờ nốt phần còn lại
+            started = time.time()
+            if self._wait_for_region(wait_until, wait_after, baseline):
+                return True
+            if self._stop_event.is_set():
+                return False
+            wait_after -= time.time() - started
+
         if wait_after > 0:
             # Kiểm tra nếu đây là step export → dùng smart wait
             is_export_step = 'export' in label.lower() or step_id in [11, 23]  # Step 11: Start Reading, Step 23: Confirm Export
@@ -301,18 +472,25 @@ class SequenceEngine:
                 dialog_id = context.get('DIALOG_ID', 'unknown')
                 export_dir = context.get('EXPORT_DIR', '')
                 self._smart_wait(wait_after, export_dir, dialog_id)
+            elif self.calibration is not None:
+                return self._calibrated_wait(step, wait_after)
             else:
                 # Regular wait: delay cứng
-                elapsed = 0
-                while elapsed < wait_after:
-                    if not self._check_controls():
-                        return False
-                    chunk = min(0.2, wait_after - elapsed)
-                    time.sleep(chunk)
-                    elapsed += chunk
+                return self._sleep(wait_after)
 
         return True
 
+    def _sleep(self, seconds):
+        """Delay cứng, vẫn phản hồi pause/stop. Returns: False nếu bị dừng"""
+        elapsed = 0
+        while elapsed < seconds:
+            if not self._check_controls():
+                return False
+            chunk = min(0.2, seconds - elapsed)
+            time.sleep(chunk)
+            elapsed += chunk
+        return True
+
     def _resolve_variable(self, template_str, context):
         """Thay thế biến template {{VAR}} bằng giá trị thực"""
         if not template_str:
@@ -322,6 +500,43 @@ class SequenceEngine:
             result = result.replace(f"{{{{{key}}}}}", str(value))
         return result
 
+    # ==================== Cost Estimate ====================
+
+    def template_cost_terms(self, template=None, preset=None):
+        """
+        Chi phí 1 dialog theo template: (giây cố định, giây mỗi ký tự của CURRENT_TEXT).
+        Cố định = Σ wait_after × timing preset + pyautogui.PAUSE mỗi action + delay paste
+        + type_text với text cố định. Bước export / có wait_until tính đủ wait_after (cận trên, là timeout);
+        bước đã tự hiệu chỉnh tính theo wait đã học.
+        """
+        template = template or self.template or {}
+        multiplier = self.TIMING_PRESETS.get(preset or self.timing_preset, 1.0)
+        action_pause = getattr(pyautogui, 'PAUSE', 0.1)
+        fixed = per_char = 0.0
+        for step in template.get('steps', []):
+            action = step.get('action', '')
+            wait = step.get('wait_after', 0.5) * multiplier
+            if self.calibration is not None:
+                wait = self.calibration.calibrated_wait(str(step.get('id', 0)), step, wait) or wait
+            fixed += wait
+            if action == 'wait':
+                continue
+            fixed += action_pause
+            if action == 'paste_text':
+                fixed += self.PASTE_DELAY
+            elif action == 'type_text':
+                target = str(step.get('target') or '')
+                if '{{CURRENT_TEXT}}' in target:
+                    per_char += self.TYPE_INTERVAL * target.count('{{CURRENT_TEXT}}')
+                    target = target.replace('{{CURRENT_TEXT}}', '')
+                fixed += len(target) * self.TYPE_INTERVAL
+        return fixed, per_char
+
+    def estimate_row_costs(self, text_lengths, template=None, preset=None):
+        """Thời gian ước tính (giây) cho từng dòng, vectorized theo mảng độ dài text"""
+        fixed, per_char = self.template_cost_terms(template, preset)
+        return fixed + per_char * np.asarray(text_lengths, dtype=np.float64)
+
     # ==================== Dialog Execution ====================
 
     def run_for_dialog(self, dialog_id, text, export_dir, dialog_index=0):
@@ -339,6 +554,11 @@ class SequenceEngine:
         self._emit('on_dialog_start', dialog_index, dialog_id)
         self._log(f"📝 Xử lý: {dialog_id}")
 
+        # Cứ RECHECK_EVERY dialog chạy 1 lần với wait đầy đủ để mẫu hiệu chỉnh luôn mới
+        self._full_wait_dialog = self._dialogs_run % self.RECHECK_EVERY == 0
+        self._dialogs_run += 1
+        self._expect_export(export_dir, dialog_id)
+
         steps = self.template['steps']
         for i, step in enumerate(steps):
             if not self._check_controls():
@@ -357,6 +577,8 @@ class SequenceEngine:
 
     def _run_with_retry(self, dialog_id, text, export_dir, dialog_index):
         """Chạy dialog với retry logic"""
+        self._dialog_trouble = False
+        success = False
         for attempt in range(self.retry_attempts + 1):
             if attempt > 0:
                 self._emit('on_retry', dialog_id, attempt)
@@ -364,55 +586,95 @@ class SequenceEngine:
                 time.sleep(1)  # Wait before retry
 
             success = self.run_for_dialog(dialog_id, text, export_dir, dialog_index)
-            if success:
-                return True
-
-            if self._stop_event.is_set():
-                return False
+            if success or self._stop_event.is_set():
+                break
 
-        return False
+        if not self._stop_event.is_set():
+            self._note_dialog_attempts(attempt > 0 or self._dialog_trouble)
+        return success
 
     # ==================== Batch Processing ====================
 
-    def run_batch(self, data_rows, key_col, text_col, export_dir, resume_from=None):
+    def run_batch(self, data_rows, key_col=None, text_col=None, export_dir=None, resume_from=None):
         """
         Chạy batch cho nhiều dialog.
-        data_rows: list of dicts hoặc DataFrame rows
+        data_rows: WorkList (từ DataManager.get_work_list) hoặc list of dicts + key_col/text_col
         resume_from: set of indices đã hoàn thành (để resume session)
         """
+        work = data_rows if isinstance(data_rows, WorkList) else WorkList.from_records(data_rows, key_col, text_col)
+        self._begin_batch(resume_from)
+        self.skipped_count = work.skipped_count
+        self._log(f"🚀 Bắt đầu batch: {work.total} dialogs")
+
+        if resume_from:
+            self._log(f"📂 Tiếp tục từ session trước ({len(resume_from)} đã xong)")
+
+        if work.skipped_count:
+            self._log(f"⏭️ Bỏ qua {work.skipped_count} dòng trống: {format_id_list(work.skipped_ids)}")
+
+        items = (
+            {'index': i, 'dialog_id': dialog_id, 'text': text, 'export_dir': export_dir}
+            for i, dialog_id, text in work
+        )
+        # Item đã xong (resume) vẫn tính vào vị trí progress nhưng không chạy
+        self._run_items(items, work.total, work.skipped_count, resume_from)
+
+    def run_plan(self, plan):
+        """
+        Chạy theo ExecutionPlan (src/core/execution_planner.py): thư mục export, dòng trống, đã xong,
+        đã có file, trùng đường dẫn đều được quyết định sẵn — chỉ chạy các dòng 'synthesize'.
+        """
+        counts = plan.counts()
+        self._begin_batch(plan.completed_indices())
+        self.skipped_count = counts['skip'] + counts['exists'] + counts['duplicate']
+        self._log(f"🚀 Bắt đầu batch: {len(plan)} dialogs ({counts['synthesize']} cần chạy)")
+        if counts['cached']:
+            self._log(f"📂 Tiếp tục từ session trước ({counts['cached']} đã xong)")
+        for action, label in (('skip', 'dòng trống'), ('exists', 'đã có file'), ('duplicate', 'trùng đường dẫn')):
+            if counts[action]:
+                self._log(f"⏭️ Bỏ qua {counts[action]} {label}")
+
+        for export_dir in plan.export_dirs():
+            os.makedirs(export_dir, exist_ok=True)
+        self._run_items(plan.items(), len(plan), len(plan) - counts['synthesize'], log_levels=True)
+
+    def _begin_batch(self, completed):
+        """Reset trạng thái trước 1 batch"""
         self.is_running = True
         self._stop_event.clear()
         self._pause_event.set()
+        self._region_wait_failed = False
+        self._calibration_suspended = False
+        self._recent_retries.clear()
+        self._dialogs_run = 0
         self.failed_items = []
-        self.completed_indices = list(resume_from) if resume_from else []
+        self.completed_indices = list(completed) if completed else []
         self.success_count = 0
         self.error_count = 0
-        self.skipped_count = 0
-
-        total = len(data_rows)
-        self._log(f"🚀 Bắt đầu batch: {total} dialogs")
-
-        if resume_from:
-            self._log(f"📂 Tiếp tục từ session trước ({len(resume_from)} đã xong)")
 
-        for i, row in enumerate(data_rows):
+    def _run_items(self, items, total, position, resume_from=None, log_levels=False):
+        """
+        Chạy tuần tự các item {index, dialog_id, text, export_dir, level?}.
+        position: số dòng đã tính là xong trước item đầu tiên (cho progress)
+        """
+        current_level = None
+        for item in items:
             if not self._check_controls():
                 break
 
+            position += 1
+            i = item['index']
+
             # Skip nếu đã xử lý (resume mode)
             if resume_from and i in resume_from:
                 continue
 
-            dialog_id = str(row[key_col])
-            text = str(row[text_col])
+            if log_levels and item.get('level') is not None and item['level'] != current_level:
+                current_level = item['level']
+                self._log(f"\n{'='*40}\n🏁 LEVEL {current_level}\n{'='*40}")
 
-            if not text or text.strip() == '' or text == 'nan':
-                self._log(f"⏭️ Bỏ qua (trống): {dialog_id}")
-                self.skipped_count += 1
-                continue
-
-            self._emit('on_progress', i + 1, total)
-            success = self._run_with_retry(dialog_id, text, export_dir, i)
+            self._emit('on_progress', position, total)
+            success = self._run_with_retry(item['dialog_id'], item['text'], item['export_dir'], i)
 
             if success:
                 self.success_count += 1
@@ -423,11 +685,15 @@ class SequenceEngine:
                 self.error_count += 1
                 self.failed_items.append({
                     'index': i,
-                    'dialog_id': dialog_id,
-                    'text': text,
+                    'dialog_id': item['dialog_id'],
+                    'text': item['text'],
+                    'export_dir': item['export_dir'],
+                    'level': item.get('level'),
                 })
 
         self.is_running = False
+        self._watchers.close()
+        self._finish_calibration()
         self._log(f"🎉 Batch hoàn tất! ✅ {self.success_count} thành công, "
                    f"❌ {self.error_count} lỗi, ⏭️ {self.skipped_count} bỏ qua")
         self._emit('on_progress', total, total)
@@ -458,7 +724,7 @@ class SequenceEngine:
 
             self._emit('on_progress', i + 1, total)
             success = self.run_for_dialog(
-                item['dialog_id'], item['text'], export_dir, item['index']
+                item['dialog_id'], item['text'], item.get('export_dir') or export_dir, item['index']
             )
 
             if success:
@@ -473,6 +739,8 @@ class SequenceEngine:
                     break
 
         self.is_running = False
+        self._watchers.close()
+        self._finish_calibration()
         self._log(f"🔄 Retry hoàn tất! ✅ {retried_success} thành công, ❌ {retried_error} vẫn lỗi")
 
     # ==================== Controls ====================
@@ -0,0 +1,122 @@
+"""
+Source Watcher - Theo dõi file nguồn, phát hiện dòng mới/sửa để export ngay
+"""
+import threading
+import time
+
+
+class SourceWatcher:
+    """
+    Watch mode: poll mtime/size của file mà DataManager đã load.
+    Khi file thay đổi → reload vào DataManager riêng (detached_copy, không đổi df mà GUI / batch đang dùng),
+    so sánh với snapshot trước (DataManager.diff_snapshot) cho mọi cột text,
+    gọi on_change(data_manager, {col_index: vị trí dòng mới/sửa}).
+    """
+
+    def __init__(self, data_manager, key_col_index, text_col_indices,
+                 on_change=None, on_log=None, poll_interval=1.0, settle_time=0.5):
+        """
+        text_col_indices: các cột text (ngôn ngữ) cần theo dõi
+        poll_interval: chu kỳ kiểm tra mtime (giây)
+        settle_time: chờ file ổn định sau khi thay đổi (Excel ghi file nhiều lần khi save)
+        """
+        self.source_data_manager = data_manager
+        self.data_manager = None     # Bản riêng của watcher, tạo lúc start
+        self.key_col_index = key_col_index
+        self.text_col_indices = list(text_col_indices)
+        self.on_change = on_change
+        self.on_log = on_log
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_stat = None
+        self._snapshot = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _log(self, msg):
+        if self.on_log:
+            try:
+                self.on_log(msg)
+            except Exception:
+                pass
+
+    def start(self):
+        """Bắt đầu theo dõi (thread nền)"""
+        if self.is_running:
+            return
+        source = self.source_data_manager
+        self._last_stat = source.get_source_mtime()
+        if self._last_stat is None:
+            raise ValueError("Watch mode chỉ hỗ trợ file Excel/CSV local")
+
+        self._snapshot = source.take_snapshot(self.key_col_index, self.text_col_indices)
+        self.data_manager = source.detached_copy()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._log(f"👁 Watch mode: theo dõi {source.source_path}")
+
+    def stop(self):
+        """Dừng theo dõi"""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.poll_interval * 2)
+        self._thread = None
+        self._log("👁 Watch mode: đã tắt")
+
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                stat = self.data_manager.get_source_mtime()
+            except OSError:
+                continue  # File đang được ghi/thay thế
+            if stat is None or stat == self._last_stat:
+                continue
+
+            # Chờ file ổn định trước khi đọc
+            time.sleep(self.settle_time)
+            try:
+                settled = self.data_manager.get_source_mtime()
+            except OSError:
+                continue
+            if settled != stat:
+                continue
+
+            self._last_stat = stat
+            try:
+                self.check_now()
+            except Exception as e:
+                self._log(f"❌ Watch mode: không thể đọc lại file: {e}")
+
+    def check_now(self):
+        """Reload file và xử lý các dòng thay đổi. Returns: số dòng thay đổi (cộng mọi cột text)"""
+        dm = self.data_manager
+        dm.reload()
+        diff = dm.diff_snapshot(self._snapshot, self.key_col_index, self.text_col_indices)
+        self._snapshot = diff.snapshot
+
+        changed, total = {}, 0
+        counts = diff.counts()
+        for col_index in self.text_col_indices:
+            text_col = dm.column_names[col_index]
+            positions = diff.positions_to_record(text_col)
+            if len(positions) == 0:
+                continue
+            changed[col_index] = positions
+            total += len(positions)
+            c = counts[text_col]
+            self._log(f"🔄 {text_col}: {len(positions)} dòng mới/sửa "
+                      f"(+{c['added']} mới, ~{c['changed']} sửa, -{c['removed']} xóa)")
+
+        if not changed:
+            self._log("👁 File đã lưu, không có dòng nào thay đổi")
+            return 0
+
+        if self.on_change:
+            self.on_change(dm, changed)
+        return total
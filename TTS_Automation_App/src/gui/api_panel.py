@@ -12,11 +12,12 @@ from src.gui.level_selector import LevelSelector
 class APIPanel(ttk.Frame):
     """Panel cấu hình và chạy TTS API export — enhanced UX"""
 
-    def __init__(self, parent, config_manager, api_engine, data_manager=None):
+    def __init__(self, parent, config_manager, api_engine, data_manager=None, on_watch_toggled=None):
         super().__init__(parent, padding=10)
         self.config_manager = config_manager
         self.engine = api_engine
         self.data_manager = data_manager
+        self.on_watch_toggled = on_watch_toggled
         self._build_ui()
 
     def _build_ui(self):
@@ -89,6 +90,11 @@ class APIPanel(ttk.Frame):
         ttk.Checkbutton(fmt_row, text="💾 Backup trước khi ghi đè",
                         variable=self.backup_var, bootstyle="round-toggle").pack(side=tk.LEFT, padx=20)
 
+        # Request coalescing toggle (chỉ áp dụng cho MP3)
+        self.coalesce_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(fmt_row, text="⚡ Gộp câu ngắn (MP3)",
+                        variable=self.coalesce_var, bootstyle="round-toggle").pack(side=tk.LEFT)
+
         # Level selector widget
         self.level_selector = LevelSelector(output_frame, config_manager=self.config_manager,
                                              data_manager=self.data_manager)
@@ -103,6 +109,28 @@ class APIPanel(ttk.Frame):
         ttk.Entry(subfolder_row, textvariable=self.subfolder_var, width=25).pack(side=tk.LEFT, padx=5)
         ttk.Label(subfolder_row, text="(Dùng {level} và {lang})", foreground="gray").pack(side=tk.LEFT)
 
+        # Dòng đã có file output → không tạo lại (kế hoạch đánh dấu 'exists')
+        self.skip_existing_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(subfolder_row, text="⏭️ Bỏ qua file đã có",
+                        variable=self.skip_existing_var, bootstyle="round-toggle").pack(side=tk.LEFT, padx=15)
+
+        # Watch mode
+        watch_row = ttk.Frame(output_frame)
+        watch_row.pack(fill=tk.X, pady=(5, 0))
+
+        self.watch_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(watch_row, text="👁 Watch mode (tự export dòng mới/sửa khi file nguồn được lưu)",
+                        variable=self.watch_var, command=self._on_watch_changed,
+                        bootstyle="round-toggle-info").pack(side=tk.LEFT)
+
+        # Ghi trạng thái / file output / độ dài audio vào file nguồn sau khi chạy
+        writeback_row = ttk.Frame(output_frame)
+        writeback_row.pack(fill=tk.X, pady=(5, 0))
+
+        self.write_back_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(writeback_row, text="📝 Ghi kết quả vào file nguồn (<tên>.tts_status.xlsx/.csv)",
+                        variable=self.write_back_var, bootstyle="round-toggle").pack(side=tk.LEFT)
+
         # === Info ===
         info_frame = ttk.Labelframe(self, text="ℹ️ Thông tin", bootstyle="light")
         info_frame.pack(fill=tk.X)
@@ -159,6 +187,10 @@ class APIPanel(ttk.Frame):
 
         threading.Thread(target=do_test, daemon=True).start()
 
+    def _on_watch_changed(self):
+        if self.on_watch_toggled:
+            self.on_watch_toggled(self.watch_var.get())
+
     def _browse_output(self):
         path = filedialog.askdirectory()
         if path:
@@ -179,4 +211,7 @@ class APIPanel(ttk.Frame):
             'levels': self.level_selector.get_levels(),
             'subfolder_pattern': self.subfolder_var.get(),
             'auto_backup': self.backup_var.get(),
+            'coalesce': self.coalesce_var.get(),
+            'write_back': self.write_back_var.get(),
+            'skip_existing': self.skip_existing_var.get(),
         }
@@ -7,9 +7,11 @@ import ttkbootstrap as ttk
 import json
 import os
 import threading
+from datetime import datetime
 
 from src.gui.coordinate_tool import CoordinateTool
 from src.gui.level_selector import LevelSelector
+from src.utils.screen_region import CONDITIONS, save_thumbnail, validate_wait_until
 
 
 class CapCutPanel(ttk.Frame):
@@ -75,6 +77,12 @@ class CapCutPanel(ttk.Frame):
                         variable=self.dry_run_var, command=self._on_dry_run_changed,
                         bootstyle="round-toggle-warning").pack(side=tk.LEFT)
 
+        # Tự hiệu chỉnh wait theo thời gian sẵn sàng đo được (templates/calibration/)
+        self.calibrate_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="🧠 Tự hiệu chỉnh wait",
+                        variable=self.calibrate_var, command=self._on_calibrate_changed,
+                        bootstyle="round-toggle").pack(side=tk.LEFT, padx=(10, 0))
+
         # === Middle: Step Editor ===
         editor_frame = ttk.Labelframe(self, text="🔧 Chuỗi tương tác", bootstyle="primary")
         editor_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 5))
@@ -161,6 +169,12 @@ class CapCutPanel(ttk.Frame):
     def _on_dry_run_changed(self):
         self.engine.set_dry_run(self.dry_run_var.get())
 
+    def _on_calibrate_changed(self):
+        self.engine.set_calibration(self.calibrate_var.get(), self._template_name())
+
+    def _template_name(self):
+        return (self.current_template or {}).get('name') or 'current'
+
     # --- Undo/Redo ---
 
     def _undo(self):
@@ -197,6 +211,7 @@ class CapCutPanel(ttk.Frame):
                 self.current_template = data
                 self.steps = data.get('steps', [])
                 self._refresh_steps_tree()
+                self._on_calibrate_changed()
 
     def _load_template_file(self):
         path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
@@ -207,6 +222,7 @@ class CapCutPanel(ttk.Frame):
                 self.current_template = data
                 self.steps = data.get('steps', [])
                 self._refresh_steps_tree()
+                self._on_calibrate_changed()
             except Exception as e:
                 messagebox.showerror("Lỗi", f"Không thể load template:\n{e}")
 
@@ -254,7 +270,7 @@ class CapCutPanel(ttk.Frame):
                 step.get('action', ''),
                 target,
                 step.get('label', ''),
-                step.get('wait_after', 0.5)
+                f"≤{step.get('wait_after', 0.5)}" if step.get('wait_until') else step.get('wait_after', 0.5)
             ))
 
     def _add_step(self):
@@ -346,12 +362,13 @@ class CapCutPanel(ttk.Frame):
     def get_run_config(self):
         """Lấy config để chạy automation"""
         return {
-            'template': {"name": "current", "steps": self.steps},
+            'template': {"name": self._template_name(), "steps": self.steps},
             'output_dir': self.output_dir_var.get(),
             'levels': self.level_selector.get_levels(),
             'countdown': self.countdown_var.get(),
             'timing_preset': self.timing_var.get(),
             'dry_run': self.dry_run_var.get(),
+            'auto_calibrate': self.calibrate_var.get(),
             'language': self.language_var.get(),
         }
 
@@ -364,13 +381,14 @@ class StepEditorDialog(tk.Toplevel):
     def __init__(self, parent, title="Step Editor", step_data=None):
         super().__init__(parent)
         self.title(title)
-        self.geometry("420x380")
+        self.geometry("420x460")
         self.resizable(False, False)
         self.transient(parent)
         self.grab_set()
 
         self.result = None
         self.step_data = step_data or {}
+        self.wait_until = dict(self.step_data.get('wait_until') or {})
         self._build_ui()
 
     def _build_ui(self):
@@ -424,14 +442,36 @@ class StepEditorDialog(tk.Toplevel):
         self.wait_var = tk.DoubleVar(value=self.step_data.get('wait_after', 0.5))
         ttk.Entry(main, textvariable=self.wait_var, width=8).grid(row=5, column=1, sticky=tk.W, pady=3)
 
+        # Wait until: chờ theo vùng màn hình, "Chờ sau" thành thời gian chờ tối đa
+        ttk.Label(main, text="Chờ tới khi:").grid(row=6, column=0, sticky=tk.W, pady=3)
+        until_frame = ttk.Frame(main)
+        until_frame.grid(row=6, column=1, sticky=tk.W, pady=3)
+        self.condition_var = tk.StringVar(value=self.wait_until.get('condition', '') if self.wait_until else '')
+        ttk.Combobox(until_frame, textvariable=self.condition_var, values=('',) + CONDITIONS,
+                     state="readonly", width=9).pack(side=tk.LEFT)
+        ttk.Label(until_frame, text="Frames:").pack(side=tk.LEFT, padx=(6, 0))
+        self.frames_var = tk.StringVar(value=str(self.wait_until.get('frames', '')))
+        ttk.Entry(until_frame, textvariable=self.frames_var, width=4).pack(side=tk.LEFT, padx=2)
+
+        ttk.Label(main, text="Vùng (x,y,w,h):").grid(row=7, column=0, sticky=tk.W, pady=3)
+        region_frame = ttk.Frame(main)
+        region_frame.grid(row=7, column=1, sticky=tk.W, pady=3)
+        region = self.wait_until.get('region')
+        self.region_var = tk.StringVar(value=",".join(str(v) for v in region) if region else '')
+        ttk.Entry(region_frame, textvariable=self.region_var, width=18).pack(side=tk.LEFT)
+        ttk.Button(region_frame, text="📸", command=self._capture_thumbnail, width=3,
+                   bootstyle="info-outline").pack(side=tk.LEFT, padx=3)
+        self.thumb_label = ttk.Label(main, text=self.wait_until.get('thumbnail', ''), foreground="gray")
+        self.thumb_label.grid(row=8, column=1, sticky=tk.W)
+
         # Description
-        ttk.Label(main, text="Ghi chú:").grid(row=6, column=0, sticky=tk.NW, pady=3)
+        ttk.Label(main, text="Ghi chú:").grid(row=9, column=0, sticky=tk.NW, pady=3)
         self.desc_var = tk.StringVar(value=self.step_data.get('description', ''))
-        ttk.Entry(main, textvariable=self.desc_var, width=30).grid(row=6, column=1, sticky=tk.W, pady=3)
+        ttk.Entry(main, textvariable=self.desc_var, width=30).grid(row=9, column=1, sticky=tk.W, pady=3)
 
         # Buttons
         btn_frame = ttk.Frame(main)
-        btn_frame.grid(row=7, column=0, columnspan=2, pady=15)
+        btn_frame.grid(row=10, column=0, columnspan=2, pady=15)
         ttk.Button(btn_frame, text="✅ Lưu", command=self._save, bootstyle="success", width=10).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="❌ Hủy", command=self.destroy, bootstyle="danger-outline", width=10).pack(side=tk.LEFT, padx=5)
 
@@ -448,6 +488,50 @@ class StepEditorDialog(tk.Toplevel):
             self.target_y_var.set(str(coord[1]))
         CoordinateTool(self, on_coordinate_picked=on_picked)
 
+    def _parse_region(self):
+        """"x,y,w,h" → list 4 số nguyên, None nếu trống / sai"""
+        try:
+            region = [int(v) for v in self.region_var.get().replace(' ', '').split(',')]
+        except ValueError:
+            return None
+        return region if len(region) == 4 else None
+
+    def _capture_thumbnail(self):
+        """Chụp vùng hiện tại làm ảnh mẫu (điều kiện 'matches'), ẩn dialog trong lúc chụp"""
+        region = self._parse_region()
+        if region is None:
+            messagebox.showwarning("Lỗi", "Nhập vùng dạng x,y,w,h trước khi chụp!", parent=self)
+            return
+        name = self.wait_until.get('thumbnail') or f"step_{datetime.now():%Y%m%d_%H%M%S}.png"
+        self.withdraw()
+        self.after(300, lambda: self._grab_thumbnail(region, name))
+
+    def _grab_thumbnail(self, region, name):
+        try:
+            save_thumbnail(region, name)
+            self.wait_until['thumbnail'] = name
+            self.thumb_label.config(text=name)
+            if not self.condition_var.get():
+                self.condition_var.set('matches')
+        except Exception as e:
+            messagebox.showerror("Lỗi", f"Không chụp được màn hình:\n{e}", parent=self)
+        finally:
+            self.deiconify()
+
+    def _build_wait_until(self):
+        """wait_until từ form (giữ các trường nâng cao đã có), None nếu không dùng; sai → ValueError"""
+        condition = self.condition_var.get()
+        if not condition:
+            return None
+        wait_until = dict(self.wait_until, condition=condition, region=self._parse_region())
+        frames = self.frames_var.get().strip()
+        if frames:
+            wait_until['frames'] = int(frames)
+        else:
+            wait_until.pop('frames', None)
+        validate_wait_until(wait_until)
+        return wait_until
+
     def _save(self):
         action = self.action_var.get()
         target = None
@@ -475,4 +559,13 @@ class StepEditorDialog(tk.Toplevel):
         if source:
             self.result['source'] = source
 
+        try:
+            wait_until = self._build_wait_until()
+        except (TypeError, ValueError) as e:
+            self.result = None
+            messagebox.showwarning("Lỗi", f"Chờ tới khi: {e}", parent=self)
+            return
+        if wait_until:
+            self.result['wait_until'] = wait_until
+
         self.destroy()
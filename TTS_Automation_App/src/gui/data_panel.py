@@ -1,6 +1,7 @@
 """
 Data Panel - Panel nhập liệu, validation và preview data
 """
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import ttkbootstrap as ttk
@@ -15,6 +16,8 @@ class DataPanel(ttk.Frame):
         self.data_manager = data_manager
         self.on_data_loaded = on_data_loaded
         self.column_combos = {}
+        self._loading = False
+        self._pending_columns = set()
         self._build_ui()
 
     def _build_ui(self):
@@ -26,7 +29,7 @@ class DataPanel(ttk.Frame):
         input_row.pack(fill=tk.X, padx=5, pady=3)
 
         self.source_var = tk.StringVar()
-        ttk.Label(input_row, text="File / URL:").pack(side=tk.LEFT)
+        ttk.Label(input_row, text="File / Thư mục / URL:").pack(side=tk.LEFT)
         self.source_entry = ttk.Entry(input_row, textvariable=self.source_var, width=50)
         self.source_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 5))
 
@@ -35,6 +38,8 @@ class DataPanel(ttk.Frame):
         self.valid_label.pack(side=tk.LEFT)
 
         ttk.Button(input_row, text="📁", command=self._browse_file, width=3, bootstyle="outline").pack(side=tk.LEFT, padx=2)
+        # Thư mục nhiều file cùng header (hoặc gõ glob, VD vendor/level_*.xlsx)
+        ttk.Button(input_row, text="🗂️", command=self._browse_folder, width=3, bootstyle="outline").pack(side=tk.LEFT, padx=2)
 
         # Real-time validation
         self.source_var.trace_add('write', self._validate_source)
@@ -47,6 +52,11 @@ class DataPanel(ttk.Frame):
         self.skip_rows_var = tk.IntVar(value=2)
         ttk.Spinbox(skip_row, from_=0, to=20, textvariable=self.skip_rows_var, width=5).pack(side=tk.LEFT, padx=5)
 
+        # Sheet: trống = sheet đầu, "all" = tất cả, "Chapter1, Chapter2" = nhiều sheet (tải song song)
+        ttk.Label(skip_row, text="Sheet:").pack(side=tk.LEFT, padx=(10, 0))
+        self.sheet_var = tk.StringVar()
+        ttk.Entry(skip_row, textvariable=self.sheet_var, width=15).pack(side=tk.LEFT, padx=5)
+
         ttk.Button(skip_row, text="⬇️ Tải dữ liệu", command=self._load_data, bootstyle="success").pack(side=tk.RIGHT)
         ttk.Button(skip_row, text="📊 Kiểm tra", command=self._show_quality_report,
                    bootstyle="outline-info").pack(side=tk.RIGHT, padx=5)
@@ -78,6 +88,9 @@ class DataPanel(ttk.Frame):
         self.status_label = ttk.Label(preview_header, text="Chưa có dữ liệu", foreground="gray")
         self.status_label.pack(side=tk.RIGHT, padx=10)
 
+        # Progress khi đọc file lớn (ẩn khi không tải)
+        self.load_progress = ttk.Progressbar(preview_header, length=150, bootstyle="success-striped")
+
         # Preview container (hidden by default)
         self.preview_container = ttk.Frame(self)
         self.tree_frame = ttk.Frame(self.preview_container)
@@ -104,7 +117,7 @@ class DataPanel(ttk.Frame):
 
     def _show_quality_report(self):
         """Hiển thị Data Quality Report"""
-        if self.data_manager.df is None:
+        if not self.data_manager.has_data():
             messagebox.showwarning("Chưa có dữ liệu", "Vui lòng tải dữ liệu trước!")
             return
 
@@ -114,28 +127,69 @@ class DataPanel(ttk.Frame):
         report = self.data_manager.get_data_quality_report(key_idx, text_indices)
 
         # Build report text
+        column_names = self.data_manager.column_names
         lines = [f"📊 Data Quality Report\n{'='*40}\n"]
         lines.append(f"Tổng: {report['total_rows']} dòng\n")
 
         if report['duplicate_keys'] > 0:
             lines.append(f"⚠️ Key trùng lặp: {report['duplicate_keys']}")
+        if report.get('unmatched_keys', 0) > 0:
+            lines.append(f"ℹ️ Key không thuộc level nào: {report['unmatched_keys']}")
 
         for col_idx, count in report.get('empty_rows', {}).items():
             if count > 0:
-                col_name = self.data_manager.column_names[col_idx]
-                lines.append(f"⚠️ Cột '{col_name}': {count} dòng trống")
+                whitespace = report.get('whitespace_rows', {}).get(col_idx, 0)
+                extra = f" ({whitespace} chỉ có khoảng trắng)" if whitespace else ""
+                lines.append(f"⚠️ Cột '{column_names[col_idx]}': {count} dòng trống{extra}")
 
         for col_idx, count in report.get('long_texts', {}).items():
             if count > 0:
-                col_name = self.data_manager.column_names[col_idx]
-                lines.append(f"ℹ️ Cột '{col_name}': {count} dòng > 500 ký tự")
+                lines.append(f"ℹ️ Cột '{column_names[col_idx]}': {count} dòng > 500 ký tự")
+
+        for col_idx, count in report.get('duplicate_texts', {}).items():
+            if count > 0:
+                lines.append(f"ℹ️ Cột '{column_names[col_idx]}': {count} dòng trùng nội dung")
+
+        for col_idx, stats in report.get('text_lengths', {}).items():
+            lines.append(f"📏 Cột '{column_names[col_idx]}': độ dài p50={stats['p50']}, "
+                         f"p90={stats['p90']}, p99={stats['p99']}, max={stats['max']}")
 
         for issue in report.get('issues', []):
             if issue['type'] == 'ok':
                 lines.append(f"\n{issue['message']}")
 
+        lines.extend(self._format_level_breakdown(report.get('levels', {})))
+
         messagebox.showinfo("📊 Data Quality Report", "\n".join(lines))
 
+    @staticmethod
+    def _format_level_breakdown(levels, max_lines=15):
+        """Các level có vấn đề (nhiều nhất trước) để hiển thị trong report"""
+        problems = []
+        for level, stats in levels.items():
+            empty = sum(stats['empty'].values())
+            long = sum(stats['long'].values())
+            total = empty + long + stats['duplicate_keys']
+            if total:
+                problems.append((total, level, stats, empty, long))
+        if not problems:
+            return []
+
+        problems.sort(key=lambda p: (-p[0], p[1]))
+        lines = [f"\n🔎 Theo level ({len(problems)}/{len(levels)} level có vấn đề):"]
+        for _, level, stats, empty, long in problems[:max_lines]:
+            parts = []
+            if empty:
+                parts.append(f"{empty} trống")
+            if long:
+                parts.append(f"{long} quá dài")
+            if stats['duplicate_keys']:
+                parts.append(f"{stats['duplicate_keys']} key trùng")
+            lines.append(f"  Level {level} ({stats['rows']} dòng): " + ", ".join(parts))
+        if len(problems) > max_lines:
+            lines.append(f"  ... và {len(problems) - max_lines} level khác")
+        return lines
+
     # ==================== Loading ====================
 
     def _browse_file(self):
@@ -148,30 +202,121 @@ class DataPanel(ttk.Frame):
         if path:
             self.source_var.set(path)
 
+    def _browse_folder(self):
+        path = filedialog.askdirectory()
+        if path:
+            self.source_var.set(path)
+
     def _load_data(self):
         source = self.source_var.get().strip()
         if not source:
             messagebox.showwarning("Thiếu dữ liệu", "Vui lòng nhập đường dẫn file hoặc URL Google Sheet.")
             return
+        if self._loading:
+            return
+
+        skip_rows = self.skip_rows_var.get()
+        sheets = self.data_manager.parse_sheet_selection(self.sheet_var.get())
+        key_col_index = self.get_key_column_index()
+        self._set_loading(True)
+
+        def progress(rows_read, total):
+            self.after(0, self._show_progress, rows_read, total)
+
+        # Pha 1 (thread nền): chỉ đọc header + đoán ngôn ngữ (tên cột, mẫu nội dung) để gán cột.
+        # Chế độ SQLite store: import toàn bộ nguồn 1 lần (pha 2 không còn gì để đọc)
+        def load_headers():
+            try:
+                if self.data_manager.use_store:
+                    self.data_manager.load_into_store(source, skip_rows=skip_rows, sheets=sheets,
+                                                      key_col_index=key_col_index, on_progress=progress)
+                else:
+                    self.data_manager.auto_detect_source(source, skip_rows=skip_rows, columns=[], sheets=sheets)
+                detected = self.data_manager.auto_detect_all_languages()
+                self.after(0, self._on_headers_loaded, detected)
+            except Exception as e:
+                self.after(0, self._on_load_failed, e)
+
+        threading.Thread(target=load_headers, daemon=True).start()
+
+    def _on_headers_loaded(self, detected=None):
+        self._update_column_mapping(detected)
+        # Pha 2: đọc các cột đã gán
+        self._load_columns(self.get_mapped_column_indices(), on_done=self._on_load_finished)
+
+    def _load_columns(self, col_indices, on_done=None):
+        """Đọc thêm cột trong thread nền, cập nhật progress trên UI thread"""
+        def progress(rows_read, total):
+            self.after(0, self._show_progress, rows_read, total)
+
+        def work():
+            try:
+                changed = self.data_manager.ensure_columns(col_indices, on_progress=progress)
+                self.after(0, on_done or self._on_columns_loaded, changed)
+            except Exception as e:
+                self.after(0, self._on_load_failed, e)
+
+        self._set_loading(True)
+        threading.Thread(target=work, daemon=True).start()
+
+    def _on_load_finished(self, changed=True):
+        self._set_loading(False)
+        self._update_preview()
+        self.status_label.config(
+            text=f"✅ Đã tải {self.data_manager.get_total_rows()} dòng | Nguồn: {self.data_manager.source_type}",
+            foreground="green"
+        )
+        if self.on_data_loaded:
+            self.on_data_loaded()
+        self._load_pending_columns()
 
-        try:
-            skip_rows = self.skip_rows_var.get()
-            self.data_manager.auto_detect_source(source, skip_rows=skip_rows)
-            self._update_column_mapping()
+    def _on_columns_loaded(self, changed):
+        self._set_loading(False)
+        if changed:
             self._update_preview()
-            self.status_label.config(
-                text=f"✅ Đã tải {self.data_manager.get_total_rows()} dòng | Nguồn: {self.data_manager.source_type}",
-                foreground="green"
-            )
-            if self.on_data_loaded:
-                self.on_data_loaded()
-        except Exception as e:
-            messagebox.showerror("Lỗi", f"Không thể tải dữ liệu:\n{e}")
+        self._load_pending_columns()
+
+    def _load_pending_columns(self):
+        """Cột được gán trong lúc đang tải → đọc tiếp"""
+        if self._pending_columns:
+            pending = sorted(self._pending_columns)
+            self._pending_columns.clear()
+            self._load_columns(pending)
+
+    def _on_load_failed(self, error):
+        self._set_loading(False)
+        self._pending_columns.clear()
+        self.status_label.config(text="❌ Tải thất bại", foreground="red")
+        messagebox.showerror("Lỗi", f"Không thể tải dữ liệu:\n{error}")
+
+    def _set_loading(self, loading):
+        self._loading = loading
+        if loading:
+            self.load_progress.configure(mode="indeterminate", value=0)
+            self.load_progress.pack(side=tk.RIGHT)
+            self.load_progress.start(15)
+            self.status_label.config(text="⏳ Đang tải...", foreground="gray")
+        else:
+            self.load_progress.stop()
+            self.load_progress.pack_forget()
+
+    def _show_progress(self, rows_read, total):
+        if not self._loading:
+            return
+        if total:
+            self.load_progress.stop()
+            self.load_progress.configure(mode="determinate", maximum=total, value=min(rows_read, total))
+            self.status_label.config(text=f"⏳ Đang tải {rows_read:,}/{total:,} dòng...")
+        else:
+            self.status_label.config(text=f"⏳ Đang tải {rows_read:,} dòng...")
 
     # ==================== Column Mapping ====================
 
-    def _update_column_mapping(self):
-        """Cập nhật UI column mapping — hiển thị dạng grid ngang + auto-detect"""
+    def _update_column_mapping(self, auto_detected=None):
+        """
+        Cập nhật UI column mapping — hiển thị dạng grid ngang + auto-detect.
+        auto_detected: {col_index: language} đã detect sẵn (None = detect lại)
+        """
         for widget in self.mapping_inner.winfo_children():
             widget.destroy()
         self.column_combos = {}
@@ -180,8 +325,9 @@ class DataPanel(ttk.Frame):
         languages = ["(Key/ID)", "English", "Vietnamese", "Japanese", "Korean", "Chinese", "French",
                       "German", "Spanish", "Portuguese", "Thai", "Indonesian", "(Bỏ qua)"]
 
-        # Step 1: Auto-detect languages
-        auto_detected = self.data_manager.auto_detect_all_languages()
+        # Step 1: Auto-detect languages (tên cột, không ra thì theo nội dung)
+        if auto_detected is None:
+            auto_detected = self.data_manager.auto_detect_all_languages()
 
         # Step 2: Defaults + auto-detect
         defaults = {0: "(Key/ID)"}
@@ -232,6 +378,13 @@ class DataPanel(ttk.Frame):
         elif col_index in self.data_manager.column_language_map:
             del self.data_manager.column_language_map[col_index]
 
+        # Cột mới được gán → đọc thêm cột đó từ file (nền)
+        if lang != "(Bỏ qua)" and col_index not in self.data_manager.loaded_columns:
+            if self._loading:
+                self._pending_columns.add(col_index)
+            else:
+                self._load_columns([col_index])
+
     # ==================== Preview ====================
 
     def _toggle_preview(self):
@@ -284,6 +437,10 @@ class DataPanel(ttk.Frame):
                 return idx
         return 0
 
+    def get_mapped_column_indices(self):
+        """Index các cột cần đọc: cột Key + các cột đã gán ngôn ngữ"""
+        return [self.get_key_column_index()] + list(self.get_selected_language_columns().keys())
+
     def get_selected_language_columns(self):
         """Lấy dict {col_index: language_name} cho các cột đã gán"""
         result = {}
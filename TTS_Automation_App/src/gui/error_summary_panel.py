@@ -7,22 +7,27 @@ import ttkbootstrap as ttk
 import csv
 import os
 
+from src.core.data_manager import DataManager
+
 
 class ErrorSummaryPanel(tk.Toplevel):
     """Popup hiển thị danh sách items bị lỗi"""
 
+    ALL = "(Tất cả)"
+
     def __init__(self, parent, failed_items, on_retry=None, on_retry_selected=None):
         """
-        failed_items: list of dicts {index, dialog_id, text, error?}
+        failed_items: list of dicts {index, dialog_id, text, error?, level?}
         on_retry: callback khi retry all
-        on_retry_selected: callback(selected_items) khi retry selected
+        on_retry_selected: callback(selected_items) khi retry selected / đã lọc
         """
         super().__init__(parent)
         self.title("❌ Danh sách lỗi")
-        self.geometry("650x450")
+        self.geometry("700x480")
         self.transient(parent)
 
         self.failed_items = failed_items or []
+        self.visible_items = list(self.failed_items)
         self.on_retry = on_retry
         self.on_retry_selected = on_retry_selected
 
@@ -38,17 +43,37 @@ class ErrorSummaryPanel(tk.Toplevel):
         self.count_label = ttk.Label(header, text="0 items", foreground="gray")
         self.count_label.pack(side=tk.RIGHT)
 
+        # Filters: loại lỗi + level
+        filter_row = ttk.Frame(self, padding=(10, 0, 10, 5))
+        filter_row.pack(fill=tk.X)
+
+        ttk.Label(filter_row, text="Loại lỗi:").pack(side=tk.LEFT)
+        self.error_filter_var = tk.StringVar(value=self.ALL)
+        self.error_filter = ttk.Combobox(filter_row, textvariable=self.error_filter_var,
+                                         state="readonly", width=22)
+        self.error_filter.pack(side=tk.LEFT, padx=(5, 15))
+        self.error_filter.bind("<<ComboboxSelected>>", lambda e: self._populate())
+
+        ttk.Label(filter_row, text="Level:").pack(side=tk.LEFT)
+        self.level_filter_var = tk.StringVar(value=self.ALL)
+        self.level_filter = ttk.Combobox(filter_row, textvariable=self.level_filter_var,
+                                         state="readonly", width=10)
+        self.level_filter.pack(side=tk.LEFT, padx=5)
+        self.level_filter.bind("<<ComboboxSelected>>", lambda e: self._populate())
+
         # Treeview
         tree_frame = ttk.Frame(self, padding=(10, 0))
         tree_frame.pack(fill=tk.BOTH, expand=True)
 
-        columns = ("dialog_id", "error")
+        columns = ("dialog_id", "level", "error")
         self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings",
                                  selectmode="extended", height=12)
         self.tree.heading("dialog_id", text="Dialog ID")
+        self.tree.heading("level", text="Level")
         self.tree.heading("error", text="Lỗi")
         self.tree.column("dialog_id", width=200)
-        self.tree.column("error", width=400)
+        self.tree.column("level", width=60)
+        self.tree.column("error", width=380)
 
         scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
         self.tree.configure(yscrollcommand=scrollbar.set)
@@ -64,23 +89,58 @@ class ErrorSummaryPanel(tk.Toplevel):
                    bootstyle="warning", width=15).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(btn_frame, text="🔄 Retry Đã chọn", command=self._retry_selected,
                    bootstyle="outline-warning", width=15).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btn_frame, text="🔄 Retry Đã lọc", command=self._retry_filtered,
+                   bootstyle="outline-warning", width=14).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(btn_frame, text="📄 Export CSV", command=self._export_csv,
                    bootstyle="outline-info", width=12).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(btn_frame, text="Đóng", command=self.destroy,
                    bootstyle="secondary", width=8).pack(side=tk.RIGHT)
 
+    @staticmethod
+    def _error_class(item):
+        """Loại lỗi: phần trước dấu ':' (VD: 'TimeoutError: ...' → 'TimeoutError')"""
+        error = item.get('error') or 'Unknown error'
+        return error.split(':', 1)[0].strip()
+
+    @staticmethod
+    def _item_level(item):
+        level = item.get('level')
+        if level is None:
+            level = DataManager.extract_level(item.get('dialog_id', ''))
+        return '' if level is None else str(level)
+
+    def _refresh_filters(self):
+        """Cập nhật danh sách giá trị cho các bộ lọc"""
+        errors = sorted({self._error_class(item) for item in self.failed_items})
+        levels = sorted({self._item_level(item) for item in self.failed_items} - {''}, key=int)
+        self.error_filter['values'] = [self.ALL] + errors
+        self.level_filter['values'] = [self.ALL] + levels
+
     def _populate(self):
-        """Điền dữ liệu vào tree"""
+        """Điền dữ liệu (đã lọc) vào tree"""
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-        for item in self.failed_items:
+        self._refresh_filters()
+        error_filter = self.error_filter_var.get()
+        level_filter = self.level_filter_var.get()
+        self.visible_items = [
+            item for item in self.failed_items
+            if (error_filter == self.ALL or self._error_class(item) == error_filter)
+            and (level_filter == self.ALL or self._item_level(item) == level_filter)
+        ]
+
+        for item in self.visible_items:
             self.tree.insert("", tk.END, values=(
                 item.get('dialog_id', 'N/A'),
+                self._item_level(item),
                 item.get('error', 'Unknown error'),
             ))
 
-        self.count_label.config(text=f"{len(self.failed_items)} items")
+        if len(self.visible_items) == len(self.failed_items):
+            self.count_label.config(text=f"{len(self.failed_items)} items")
+        else:
+            self.count_label.config(text=f"{len(self.visible_items)}/{len(self.failed_items)} items")
 
     def _retry_all(self):
         if self.on_retry:
@@ -96,10 +156,21 @@ class ErrorSummaryPanel(tk.Toplevel):
 
         if self.on_retry_selected:
             selected_indices = [self.tree.index(item) for item in selected]
-            selected_items = [self.failed_items[i] for i in selected_indices]
+            selected_items = [self.visible_items[i] for i in selected_indices]
             self.on_retry_selected(selected_items)
             self.destroy()
 
+    def _retry_filtered(self):
+        """Retry tất cả items đang hiển thị theo bộ lọc"""
+        if not self.visible_items:
+            return
+        if not self.on_retry_selected:
+            messagebox.showinfo("Không hỗ trợ", "Chế độ này chỉ hỗ trợ Retry Tất cả", parent=self)
+            return
+        if messagebox.askyesno("Xác nhận", f"Retry {len(self.visible_items)} items đã lọc?", parent=self):
+            self.on_retry_selected(list(self.visible_items))
+            self.destroy()
+
     def _export_csv(self):
         """Export danh sách lỗi ra CSV"""
         path = filedialog.asksaveasfilename(
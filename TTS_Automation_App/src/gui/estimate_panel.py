@@ -0,0 +1,93 @@
+"""
+Estimate Panel - Hiển thị ước tính thời gian / độ dài audio / dung lượng trước khi chạy
+"""
+import tkinter as tk
+import ttkbootstrap as ttk
+
+
+def format_size(num_bytes):
+    """Byte → chuỗi KB/MB/GB"""
+    for unit in ('B', 'KB', 'MB'):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == 'B' else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.2f} GB"
+
+
+class EstimatePanel(tk.Toplevel):
+    """Popup bảng ước tính theo level × ngôn ngữ (mỗi ngôn ngữ là 1 lượt chạy)"""
+
+    def __init__(self, parent, estimate, format_time, title="📊 Ước tính lượt chạy"):
+        """
+        estimate: RunEstimate (DataManager.estimate_run_cost)
+        format_time: hàm giây → chuỗi (ExportReporter.format_elapsed_time)
+        """
+        super().__init__(parent)
+        self.title(title)
+        self.geometry("720x420")
+        self.transient(parent)
+
+        self.estimate = estimate
+        self.format_time = format_time
+
+        self._build_ui()
+        self._populate()
+
+    def _build_ui(self):
+        header = ttk.Frame(self, padding=10)
+        header.pack(fill=tk.X)
+
+        ttk.Label(header, text="📊 Ước tính trước khi chạy", font=("", 13, "bold")).pack(side=tk.LEFT)
+        self.total_label = ttk.Label(header, text="", foreground="gray")
+        self.total_label.pack(side=tk.RIGHT)
+
+        tree_frame = ttk.Frame(self, padding=(10, 0))
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+
+        columns = ("level", "language", "rows", "chars", "time", "audio", "size")
+        headings = ("Level", "Ngôn ngữ", "Dòng", "Ký tự", "⏱ Thời gian", "🔊 Audio", "💾 Dung lượng")
+        widths = (60, 100, 70, 90, 110, 110, 110)
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=12)
+        for col, heading, width in zip(columns, headings, widths):
+            self.tree.heading(col, text=heading)
+            self.tree.column(col, width=width, anchor=tk.W if col in ("level", "language") else tk.E)
+        self.tree.tag_configure("total", font=("", 9, "bold"))
+
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        footer = ttk.Frame(self, padding=10)
+        footer.pack(fill=tk.X)
+        ttk.Label(footer, text="Mỗi ngôn ngữ là 1 lượt chạy riêng; chưa tính retry.",
+                  foreground="gray", font=("", 9)).pack(side=tk.LEFT)
+        ttk.Button(footer, text="Đóng", command=self.destroy,
+                   bootstyle="secondary", width=8).pack(side=tk.RIGHT)
+
+    def _values(self, level, language, stats):
+        return (
+            level, language,
+            f"{stats['rows']:,}", f"{int(stats['chars']):,}",
+            self.format_time(stats['seconds']),
+            self.format_time(stats['audio_seconds']),
+            format_size(stats['bytes']),
+        )
+
+    def _populate(self):
+        groups = self.estimate.groups
+        languages = list(dict.fromkeys(g['language'] for g in groups))
+        for language in languages:
+            for group in groups:
+                if group['language'] == language:
+                    level = "—" if group['level'] is None else group['level']
+                    self.tree.insert("", tk.END, values=self._values(level, language, group))
+            if len(languages) > 1:
+                self.tree.insert("", tk.END, values=self._values("Σ", language, self.estimate.totals(language)),
+                                 tags=("total",))
+
+        totals = self.estimate.totals()
+        self.tree.insert("", tk.END, values=self._values("Σ", "Tất cả", totals), tags=("total",))
+        self.total_label.config(
+            text=f"⏱ {self.format_time(totals['seconds'])} · 🔊 {self.format_time(totals['audio_seconds'])}"
+                 f" · 💾 {format_size(totals['bytes'])}")
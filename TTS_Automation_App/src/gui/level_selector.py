@@ -1,6 +1,7 @@
 """
 Level Selector Widget - Widget chọn level linh hoạt
 """
+import threading
 import tkinter as tk
 import ttkbootstrap as ttk
 
@@ -13,8 +14,13 @@ class LevelSelector(ttk.Frame):
     - Custom (8,10,12-15,20)
 
     Gọi on_change callback khi level thay đổi.
+    Số dòng được đếm từ histogram level của DataManager, cập nhật có debounce;
+    việc nặng (tạo index, preview) chạy ở thread nền.
     """
 
+    # Chờ người dùng ngừng gõ/bấm spinbox trước khi cập nhật số dòng (ms)
+    DEBOUNCE_MS = 150
+
     def __init__(self, parent, config_manager=None, data_manager=None,
                  on_change=None, **kwargs):
         super().__init__(parent, **kwargs)
@@ -22,6 +28,8 @@ class LevelSelector(ttk.Frame):
         self.data_manager = data_manager
         self.on_change = on_change
 
+        self._info_job = None
+        self._generations = {}  # {loại việc: lượt}; bỏ kết quả nền đã cũ khi levels đổi tiếp
         self._build_ui()
 
     def _build_ui(self):
@@ -119,11 +127,42 @@ class LevelSelector(ttk.Frame):
     def _on_value_changed(self):
         """Khi giá trị level thay đổi"""
         levels = self.get_levels()
-        self._update_info(levels)
+        self._schedule_info_update()
 
         if self.on_change:
             self.on_change(levels)
 
+    def _schedule_info_update(self):
+        """Debounce: chỉ cập nhật sau khi giá trị ngừng thay đổi DEBOUNCE_MS"""
+        if self._info_job is not None:
+            self.after_cancel(self._info_job)
+        self._info_job = self.after(self.DEBOUNCE_MS, self._run_info_update)
+
+    def _run_info_update(self):
+        self._info_job = None
+        self._update_info(self.get_levels())
+
+    def _run_in_background(self, kind, work, on_result):
+        """Chạy work() ở thread nền, gọi on_result(result) trên UI thread nếu chưa lỗi thời"""
+        generation = self._generations.get(kind, 0) + 1
+        self._generations[kind] = generation
+
+        def runner():
+            try:
+                result = work()
+            except Exception:
+                result = None
+
+            def deliver():
+                if generation == self._generations.get(kind):
+                    on_result(result)
+            try:
+                self.after(0, deliver)
+            except (RuntimeError, tk.TclError):
+                pass  # Widget đã bị hủy
+
+        threading.Thread(target=runner, daemon=True).start()
+
     def get_levels(self):
         """
         Lấy danh sách levels đã chọn.
@@ -164,26 +203,39 @@ class LevelSelector(ttk.Frame):
 
     def _update_info(self, levels):
         """Cập nhật thông tin số dòng"""
-        if not self.data_manager or self.data_manager.df is None:
+        if not self.data_manager or not self.data_manager.has_data():
             self.info_label.config(text="📊 Chưa load dữ liệu")
             return
 
-        try:
-            preview = self.data_manager.get_level_preview(levels=levels)
-            count = preview['total_count']
-            if levels is None:
-                self.info_label.config(
-                    text=f"📊 Tất cả: {count} dòng sẽ được xử lý",
-                    foreground="green" if count > 0 else "red"
-                )
-            else:
-                levels_str = self._format_levels(levels)
-                self.info_label.config(
-                    text=f"📊 Level {levels_str}: {count} dòng sẽ được xử lý",
-                    foreground="green" if count > 0 else "red"
-                )
-        except Exception:
+        if self.data_manager.has_level_index() or levels is None:
+            # Tra histogram: O(số level), đủ nhanh cho UI thread
+            try:
+                self._show_count(levels, self.data_manager.count_level_rows(levels=levels))
+            except Exception:
+                self._show_count(levels, None)
+            return
+
+        # Lần đầu: parse key để tạo index ở thread nền
+        self.info_label.config(text="📊 Đang đếm...", foreground="gray")
+        self._run_in_background(
+            'count', lambda: self.data_manager.count_level_rows(levels=levels),
+            lambda count: self._show_count(levels, count),
+        )
+
+    def _show_count(self, levels, count):
+        if count is None:
             self.info_label.config(text="📊 —", foreground="gray")
+        elif levels is None:
+            self.info_label.config(
+                text=f"📊 Tất cả: {count} dòng sẽ được xử lý",
+                foreground="green" if count > 0 else "red"
+            )
+        else:
+            levels_str = self._format_levels(levels)
+            self.info_label.config(
+                text=f"📊 Level {levels_str}: {count} dòng sẽ được xử lý",
+                foreground="green" if count > 0 else "red"
+            )
 
     def _format_levels(self, levels):
         """Format danh sách levels thành chuỗi ngắn gọn"""
@@ -201,25 +253,31 @@ class LevelSelector(ttk.Frame):
             self.preview_btn.config(text="👁 Preview")
             return
 
-        if not self.data_manager or self.data_manager.df is None:
+        if not self.data_manager or not self.data_manager.has_data():
             return
 
         levels = self.get_levels()
-        try:
-            preview = self.data_manager.get_level_preview(levels=levels, max_items=50)
-
-            self.preview_listbox.delete(0, tk.END)
-            for dialog_id in preview['preview_ids']:
-                self.preview_listbox.insert(tk.END, f"  {dialog_id}")
-            if preview['has_more']:
-                self.preview_listbox.insert(tk.END,
-                    f"  ... và {preview['total_count'] - len(preview['preview_ids'])} items khác")
-
-            self.preview_frame.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
-            self.preview_visible = True
-            self.preview_btn.config(text="🔽 Ẩn")
-        except Exception:
-            pass
+        self.preview_btn.config(state=tk.DISABLED)
+        self._run_in_background(
+            'preview', lambda: self.data_manager.get_level_preview(levels=levels, max_items=50),
+            self._fill_preview,
+        )
+
+    def _fill_preview(self, preview):
+        self.preview_btn.config(state=tk.NORMAL)
+        if preview is None:
+            return
+
+        self.preview_listbox.delete(0, tk.END)
+        for dialog_id in preview['preview_ids']:
+            self.preview_listbox.insert(tk.END, f"  {dialog_id}")
+        if preview['has_more']:
+            self.preview_listbox.insert(tk.END,
+                f"  ... và {preview['total_count'] - len(preview['preview_ids'])} items khác")
+
+        self.preview_frame.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        self.preview_visible = True
+        self.preview_btn.config(text="🔽 Ẩn")
 
     def set_data_manager(self, data_manager):
         """Update data manager reference"""
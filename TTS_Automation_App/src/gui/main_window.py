@@ -13,16 +13,21 @@ from src.core.config_manager import ConfigManager
 from src.core.data_manager import DataManager
 from src.core.sequence_engine import SequenceEngine
 from src.core.api_engine import APIEngine
+from src.core.source_watcher import SourceWatcher
+from src.core.execution_planner import build_plan
 from src.utils.logger import AppLogger
 from src.utils.notification_manager import NotificationManager
 from src.utils.session_manager import SessionManager
 from src.utils.export_reporter import ExportReporter
+from src.utils.voice_rates import VoiceRates
 
 from src.gui.data_panel import DataPanel
 from src.gui.capcut_panel import CapCutPanel
 from src.gui.api_panel import APIPanel
 from src.gui.settings_window import SettingsWindow
 from src.gui.error_summary_panel import ErrorSummaryPanel
+from src.gui.estimate_panel import EstimatePanel, format_size
+from src.gui.plan_panel import PlanPanel
 
 
 class MainWindow:
@@ -32,11 +37,13 @@ class MainWindow:
         # Initialize core
         self.config = ConfigManager()
         self.data_manager = DataManager()
+        self.data_manager.use_store = self.config.get_setting('performance.sqlite_store', False)
         self.sequence_engine = SequenceEngine()
         self.api_engine = APIEngine()
         self.logger = AppLogger()
         self.session_manager = SessionManager()
         self.export_reporter = ExportReporter()
+        self.voice_rates = VoiceRates()
 
         # Build UI
         theme = self.config.get_setting('general.theme', 'darkly')
@@ -49,6 +56,7 @@ class MainWindow:
         self.root.place_window_center()
 
         self._running_thread = None
+        self.source_watcher = None
         self._build_ui()
         self._setup_callbacks()
         self._setup_keyboard_shortcuts()
@@ -114,6 +122,11 @@ class MainWindow:
                                     bootstyle="outline-warning", width=8, state=tk.DISABLED)
         self.retry_btn.pack(side=tk.LEFT, padx=3)
 
+        ttk.Button(btn_frame, text="📊 Ước tính", command=self._show_estimate,
+                   bootstyle="outline-info", width=11).pack(side=tk.LEFT, padx=3)
+        ttk.Button(btn_frame, text="🗺️ Kế hoạch", command=self._show_plan,
+                   bootstyle="outline-info", width=11).pack(side=tk.LEFT, padx=3)
+
         # Status
         self.status_label = ttk.Label(btn_frame, text="⏳ Sẵn sàng", foreground="gray")
         self.status_label.pack(side=tk.RIGHT, padx=10)
@@ -188,7 +201,8 @@ class MainWindow:
         self.capcut_panel = CapCutPanel(self.mode_notebook, self.config, self.sequence_engine,
                                          data_manager=self.data_manager)
         self.api_panel = APIPanel(self.mode_notebook, self.config, self.api_engine,
-                                   data_manager=self.data_manager)
+                                   data_manager=self.data_manager,
+                                   on_watch_toggled=self._toggle_watch_mode)
 
         self.mode_notebook.add(self.capcut_panel, text="  🖥️ CapCut Automation  ")
         self.mode_notebook.add(self.api_panel, text="  🌐 API Export  ")
@@ -293,6 +307,7 @@ class MainWindow:
             'on_log': gui_log,
             'on_progress': gui_progress,
             'on_start': lambda did: gui_dialog_start(0, did),
+            'on_complete': lambda did, filepath: self.export_reporter.record_export(did, filepath),
             'on_batch_complete': gui_batch_complete,
         }
 
@@ -398,6 +413,13 @@ class MainWindow:
         backup = new_settings.get('advanced', {}).get('auto_backup', True)
         self.api_engine.set_auto_backup(backup)
 
+        # Apply concurrency
+        max_concurrent = new_settings.get('performance', {}).get('max_concurrent_exports', 3)
+        self.api_engine.set_max_concurrent(max_concurrent)
+
+        # Apply data store (có hiệu lực từ lần load dữ liệu tiếp theo)
+        self.data_manager.use_store = new_settings.get('performance', {}).get('sqlite_store', False)
+
     # ==================== Profiles ====================
 
     def _refresh_profiles(self):
@@ -421,6 +443,7 @@ class MainWindow:
             'mode': 'capcut' if mode == 0 else 'api',
             'data_source': self.data_panel.source_var.get(),
             'skip_rows': self.data_panel.skip_rows_var.get(),
+            'sheets': self.data_panel.sheet_var.get(),
             'run_config': run_config,
         }
 
@@ -443,6 +466,7 @@ class MainWindow:
             self.data_panel.source_var.set(profile['data_source'])
         if profile.get('skip_rows') is not None:
             self.data_panel.skip_rows_var.set(profile['skip_rows'])
+        self.data_panel.sheet_var.set(profile.get('sheets', ''))
 
         # Switch mode tab
         if profile.get('mode') == 'api':
@@ -471,10 +495,11 @@ class MainWindow:
                 if not resume:
                     self.session_manager.clear_session()
 
-    def _save_current_session(self, mode, completed_indices, total, config):
-        """Lưu session hiện tại"""
+    def _save_current_session(self, mode, language, completed_indices, total, config):
+        """Lưu session hiện tại (index đã xong thuộc về ngôn ngữ đã chạy)"""
         self.session_manager.save_session({
             'mode': mode,
+            'language': language,
             'completed_indices': completed_indices,
             'total': total,
             'config': config,
@@ -497,10 +522,11 @@ class MainWindow:
         ErrorSummaryPanel(
             self.root, failed,
             on_retry=self._retry_failed,
+            on_retry_selected=self._retry_failed if mode == 1 else None,
         )
 
-    def _retry_failed(self):
-        """Retry failed items"""
+    def _retry_failed(self, items=None):
+        """Retry failed items (API mode: có thể retry tập con đã lọc/chọn)"""
         mode = self.mode_notebook.index(self.mode_notebook.select())
         if mode == 0:
             if not self.sequence_engine.failed_items:
@@ -527,7 +553,8 @@ class MainWindow:
 
             def run():
                 try:
-                    self.api_engine.retry_failed(config['output_dir'], voice=config.get('voice_id'))
+                    self.api_engine.retry_failed(config['output_dir'], voice=config.get('voice_id'),
+                                                 items=items)
                 except Exception as e:
                     self.root.after(0, self._append_log, f"❌ Lỗi retry: {e}")
                 finally:
@@ -535,11 +562,218 @@ class MainWindow:
 
             threading.Thread(target=run, daemon=True).start()
 
+    # ==================== Watch Mode ====================
+
+    def _toggle_watch_mode(self, enabled):
+        """Bật/tắt watch mode: tự export dòng mới/sửa khi file nguồn thay đổi"""
+        if self.source_watcher:
+            self.source_watcher.stop()
+            self.source_watcher = None
+        if not enabled:
+            return
+
+        config = self.api_panel.get_run_config()
+        lang_cols = self.data_panel.get_selected_language_columns()
+        if not self.data_manager.has_data() or not lang_cols or not config['voice_id']:
+            messagebox.showwarning("Watch mode", "Cần tải dữ liệu, gán ngôn ngữ và chọn giọng đọc trước!")
+            self.api_panel.watch_var.set(False)
+            return
+
+        key_col_idx = self.data_panel.get_key_column_index()
+
+        def gui_log(msg):
+            self.root.after(0, self._append_log, msg)
+
+        # Engine riêng để không ảnh hưởng state của batch đang chạy
+        watch_engine = APIEngine(callbacks={'on_log': gui_log})
+        watch_engine.set_voice(config['voice_id'])
+        watch_engine.set_format(config['format'])
+        watch_engine.set_auto_backup(config.get('auto_backup', False))
+        self._apply_coalescing(watch_engine, config.get('coalesce', False))
+        watch_engine.set_retry_attempts(self.config.get_setting('advanced.retry_attempts', 2))
+
+        # Dòng đã sửa phải export lại dù file cũ đã có
+        watch_config = dict(config, skip_existing=False)
+
+        def export_changed(data_manager, changed_positions):
+            """changed_positions: {col_index: vị trí dòng mới/sửa} trên DataManager riêng của watcher"""
+            plan = self._build_plan('api', watch_config, key_col_idx, lang_cols, data_manager=data_manager)
+            plan = plan.for_rows({lang_cols[col]: positions for col, positions in changed_positions.items()})
+            for language in plan.languages:
+                language_plan = plan.for_language(language)
+                if language_plan.synthesize_count:
+                    watch_engine.export_plan(language_plan, voice=self._voice_for_language(config, language))
+
+        try:
+            self.source_watcher = SourceWatcher(self.data_manager, key_col_idx, list(lang_cols),
+                                                on_change=export_changed, on_log=gui_log)
+            self.source_watcher.start()
+        except Exception as e:
+            self.source_watcher = None
+            self.api_panel.watch_var.set(False)
+            messagebox.showwarning("Watch mode", f"Không thể bật watch mode:\n{e}")
+
+    # ==================== Cost Estimate ====================
+
+    @staticmethod
+    def _voice_for_language(config, language):
+        """Giọng đã chọn cho ngôn ngữ của config, ngôn ngữ khác → giọng đầu tiên của ngôn ngữ đó"""
+        voice = config['voice_id']
+        if language != config.get('language'):
+            presets = APIEngine.get_voices_for_language(language)
+            voice = presets[0][0] if presets else voice
+        return voice
+
+    def _row_cost_model(self, mode, config):
+        """
+        callable(language, text_lengths) → chi phí từng dòng (giây chạy, giây audio, byte) theo engine của mode.
+        Tốc độ đọc / dung lượng / tốc độ tổng hợp lấy từ VoiceRates (học từ các lần API export trước)
+        """
+        if mode == 'capcut':
+            def row_costs(language, lengths):
+                voice = f"capcut:{language}"
+                audio = lengths / self.voice_rates.speech_rate(voice, language)
+                return {
+                    'seconds': self.sequence_engine.estimate_row_costs(
+                        lengths, config['template'], config.get('timing_preset')),
+                    'audio_seconds': audio,
+                    'bytes': audio * self.voice_rates.byte_rate(voice),
+                }
+            return row_costs
+
+        self.api_engine.set_max_concurrent(
+            self.config.get_setting('performance.max_concurrent_exports', 3))
+
+        def row_costs(language, lengths):
+            voice = self._voice_for_language(config, language)
+            audio = lengths / self.voice_rates.speech_rate(voice, language)
+            return {
+                'seconds': self.api_engine.estimate_row_costs(lengths, self.voice_rates.synth_rate(voice)),
+                'audio_seconds': audio,
+                'bytes': audio * self.voice_rates.byte_rate(voice, config.get('format', 'mp3')),
+            }
+        return row_costs
+
+    def _estimate_run(self, mode, config, key_col_idx, text_columns):
+        """RunEstimate cho các cột ngôn ngữ {col_index: ngôn ngữ} theo levels của config"""
+        return self.data_manager.estimate_run_cost(
+            key_col_idx, text_columns, self._row_cost_model(mode, config), config['levels'])
+
+    def _show_estimate(self):
+        """Popup ước tính thời gian / audio / dung lượng cho mọi cột ngôn ngữ đã gán"""
+        if not self.data_manager.has_data():
+            messagebox.showwarning("Chưa có dữ liệu", "Vui lòng tải dữ liệu trước!")
+            return
+        lang_cols = self.data_panel.get_selected_language_columns()
+        if not lang_cols:
+            messagebox.showwarning("Chưa chọn ngôn ngữ", "Vui lòng gán ngôn ngữ cho ít nhất 1 cột!")
+            return
+
+        if self.mode_notebook.index(self.mode_notebook.select()) == 0:
+            mode, config = 'capcut', self.capcut_panel.get_run_config()
+        else:
+            mode, config = 'api', self.api_panel.get_run_config()
+        try:
+            estimate = self._estimate_run(mode, config, self.data_panel.get_key_column_index(), lang_cols)
+        except Exception as e:
+            messagebox.showerror("Lỗi", f"Không ước tính được:\n{e}")
+            return
+        EstimatePanel(self.root, estimate, self.export_reporter.format_elapsed_time)
+
+    def _apply_run_estimate(self, mode, config, key_col_idx, text_col_idx, lang_name):
+        """Ước tính lượt chạy sắp bắt đầu: log tổng + đặt làm prior cho ETA"""
+        try:
+            estimate = self._estimate_run(mode, config, key_col_idx, {text_col_idx: lang_name})
+        except Exception as e:
+            self.root.after(0, self._append_log, f"⚠️ Không ước tính được: {e}")
+            return
+        totals = estimate.totals()
+        if not totals['rows']:
+            return
+        self.export_reporter.set_eta_prior(estimate.seconds_per_row())
+        fmt = self.export_reporter.format_elapsed_time
+        self.root.after(0, self._append_log,
+            f"📊 Ước tính: {totals['rows']:,} dòng · ⏱ {fmt(totals['seconds'])} · "
+            f"🔊 {fmt(totals['audio_seconds'])} · 💾 {format_size(totals['bytes'])}")
+
+    def _learn_voice_rates(self, config, text_lengths):
+        """Cập nhật tốc độ đọc / tổng hợp / dung lượng của giọng từ kết quả lần export vừa xong"""
+        stats = self.export_reporter.get_statistics()
+        if self.voice_rates.learn(config['voice_id'], self.export_reporter.exported_files, text_lengths,
+                                  stats['elapsed_seconds'], config.get('format', 'mp3')):
+            self.voice_rates.save()
+
+    # ==================== Execution Plan ====================
+
+    @staticmethod
+    def _run_language(mode, config, lang_cols):
+        """(col_index, ngôn ngữ) của lượt chạy: CapCut theo ngôn ngữ chọn ở panel (không có → cột đầu), API cột đầu"""
+        if mode == 'capcut':
+            for col_idx, lang_name in lang_cols.items():
+                if lang_name == config.get('language', 'English'):
+                    return col_idx, lang_name
+        col_idx = next(iter(lang_cols))
+        return col_idx, lang_cols[col_idx]
+
+    def _resume_indices(self, mode, language):
+        """
+        {language: index đã xong} từ session đã lưu của mode + ngôn ngữ (None nếu không có).
+        Session cũ không ghi ngôn ngữ được coi là của ngôn ngữ đang chạy.
+        """
+        if self.session_manager.has_saved_session():
+            session = self.session_manager.load_session()
+            if session and session.get('mode') == mode and session.get('language', language) == language:
+                return {language: set(session.get('completed_indices', []))}
+        return None
+
+    def _build_plan(self, mode, config, key_col_idx, text_columns, resume_from=None, data_manager=None):
+        """
+        ExecutionPlan cho lượt chạy: thư mục theo level/ngôn ngữ như cấu trúc output của từng mode.
+        text_columns: {col_index: tên ngôn ngữ}; data_manager: mặc định dữ liệu đang hiển thị
+        """
+        levels = config['levels']
+        if levels is None:
+            pattern = "{lang}"
+        elif mode == 'capcut':
+            pattern = "Level_{level}/{lang}"
+        else:
+            pattern = config['subfolder_pattern']
+        return build_plan(
+            data_manager or self.data_manager, key_col_idx, text_columns,
+            config['output_dir'], levels=levels, subfolder_pattern=pattern,
+            ext=config.get('format', 'mp3'), resume_from=resume_from,
+            skip_existing=config.get('skip_existing', False),
+            row_costs=self._row_cost_model(mode, config),
+        )
+
+    def _show_plan(self):
+        """Popup xem trước kế hoạch của lượt chạy sắp tới (xuất được CSV)"""
+        if not self.data_manager.has_data():
+            messagebox.showwarning("Chưa có dữ liệu", "Vui lòng tải dữ liệu trước!")
+            return
+        lang_cols = self.data_panel.get_selected_language_columns()
+        if not lang_cols:
+            messagebox.showwarning("Chưa chọn ngôn ngữ", "Vui lòng gán ngôn ngữ cho ít nhất 1 cột!")
+            return
+
+        if self.mode_notebook.index(self.mode_notebook.select()) == 0:
+            mode, config = 'capcut', self.capcut_panel.get_run_config()
+        else:
+            mode, config = 'api', self.api_panel.get_run_config()
+        text_col_idx, lang_name = self._run_language(mode, config, lang_cols)
+        try:
+            plan = self._build_plan(mode, config, self.data_panel.get_key_column_index(),
+                                    {text_col_idx: lang_name}, self._resume_indices(mode, lang_name))
+        except Exception as e:
+            messagebox.showerror("Lỗi", f"Không dựng được kế hoạch:\n{e}")
+            return
+        PlanPanel(self.root, plan, self.export_reporter.format_elapsed_time)
+
     # ==================== Control Methods ====================
 
     def _start(self):
         """Bắt đầu chạy automation"""
-        if self.data_manager.df is None:
+        if not self.data_manager.has_data():
             messagebox.showwarning("Chưa có dữ liệu", "Vui lòng tải dữ liệu trước!")
             return
 
@@ -565,39 +799,18 @@ class MainWindow:
             messagebox.showwarning("Chưa chọn ngôn ngữ", "Vui lòng gán ngôn ngữ cho ít nhất 1 cột!")
             return
 
-        # Get selected language from CapCut panel
-        selected_language = config.get('language', 'English')
-        
-        # Find the column index for the selected language
-        text_col_idx = None
-        for col_idx, lang_name in lang_cols.items():
-            if lang_name == selected_language:
-                text_col_idx = col_idx
-                break
-        
-        # Fallback to first language if selected one not found
-        if text_col_idx is None:
-            text_col_idx = list(lang_cols.keys())[0]
-            selected_language = lang_cols[text_col_idx]
-
-        lang_name = selected_language
-        key_col = self.data_manager.column_names[key_col_idx]
-        text_col = self.data_manager.column_names[text_col_idx]
+        text_col_idx, lang_name = self._run_language('capcut', config, lang_cols)
 
         # Apply settings
         self.sequence_engine.load_template(config['template'])
         self.sequence_engine.set_timing_preset(config.get('timing_preset', 'normal'))
         self.sequence_engine.set_dry_run(config.get('dry_run', False))
+        self.sequence_engine.set_calibration(config.get('auto_calibrate', False), config['template']['name'])
         retry = self.config.get_setting('advanced.retry_attempts', 2)
         self.sequence_engine.set_retry_attempts(retry)
 
         # Check session resume
-        levels = config['levels']
-        resume_from = None
-        if self.session_manager.has_saved_session():
-            session = self.session_manager.load_session()
-            if session and session.get('mode') == 'capcut':
-                resume_from = set(session.get('completed_indices', []))
+        resume_from = self._resume_indices('capcut', lang_name)
 
         self._set_running_state(True)
         self.export_reporter.start_tracking()
@@ -608,6 +821,8 @@ class MainWindow:
 
         def run():
             try:
+                self._apply_run_estimate('capcut', config, key_col_idx, text_col_idx, lang_name)
+
                 # Countdown
                 countdown = config['countdown']
                 for i in range(countdown, 0, -1):
@@ -622,35 +837,13 @@ class MainWindow:
                         pass
                     time.sleep(1)
 
-                # Determine levels to process
-                if levels is None:
-                    # All levels - get from data
-                    all_data = self.data_manager.filter_by_levels(key_col_idx, None)
-                    rows = all_data.to_dict('records')
-                    export_dir = os.path.join(config['output_dir'], lang_name.lower()[:2])
-                    os.makedirs(export_dir, exist_ok=True)
-                    self.sequence_engine.run_batch(rows, key_col, text_col, export_dir, resume_from=resume_from)
-                else:
-                    for lv in levels:
-                        if not self.sequence_engine._check_controls():
-                            break
-
-                        self.root.after(0, self._append_log, f"\n{'='*40}\n🏁 LEVEL {lv}\n{'='*40}")
-
-                        export_dir = os.path.join(config['output_dir'], f"Level_{lv}",
-                                                  lang_name.lower()[:2])
-                        os.makedirs(export_dir, exist_ok=True)
-
-                        level_data = self.data_manager.filter_by_level(key_col_idx, lv)
-                        if level_data.empty:
-                            self.root.after(0, self._append_log, f"⚠️ Level {lv} trống, bỏ qua...")
-                            continue
-
-                        rows = level_data.to_dict('records')
-                        self.sequence_engine.run_batch(rows, key_col, text_col, export_dir, resume_from=resume_from)
+                # Kế hoạch dựng sẵn cho mọi level (thư mục, dòng trống, đã xong, trùng đường dẫn)
+                plan = self._build_plan('capcut', config, key_col_idx, {text_col_idx: lang_name}, resume_from)
+                self._record_plan_skips(plan)
+                self.sequence_engine.run_plan(plan)
 
                 # Save session
-                self._save_current_session('capcut',
+                self._save_current_session('capcut', lang_name,
                     self.sequence_engine.completed_indices,
                     self.data_manager.get_total_rows(), config)
 
@@ -671,6 +864,28 @@ class MainWindow:
         self._running_thread = threading.Thread(target=run, daemon=True)
         self._running_thread.start()
 
+    def _record_plan_skips(self, plan):
+        """Ghi nhận các dòng kế hoạch không tổng hợp (dòng trống, đã có file, trùng đường dẫn)"""
+        for dialog_id, _action, reason in plan.not_synthesized():
+            self.export_reporter.record_export(dialog_id, status='skipped', error=reason)
+
+    def _write_back_results(self, key_col_idx):
+        """Ghi trạng thái / file output / độ dài audio từng dòng vào file nguồn (1 lượt ghi mỗi file)"""
+        try:
+            written = self.data_manager.write_back_results(self.export_reporter.get_row_results(), key_col_idx)
+            for path, rows in written:
+                self.root.after(0, self._append_log, f"📝 Đã ghi kết quả {rows} dòng: {path}")
+        except Exception as e:
+            self.root.after(0, self._append_log, f"⚠️ Không ghi được kết quả vào file nguồn: {e}")
+
+    def _apply_coalescing(self, engine, enabled):
+        """Áp dụng cấu hình gộp câu ngắn cho engine"""
+        engine.set_coalescing(
+            enabled,
+            self.config.get_setting('performance.coalesce_max_words', 6),
+            self.config.get_setting('performance.coalesce_max_items', 20),
+        )
+
     def _start_api_mode(self):
         """Chạy API export mode"""
         config = self.api_panel.get_run_config()
@@ -686,25 +901,19 @@ class MainWindow:
             messagebox.showwarning("Chưa chọn ngôn ngữ", "Vui lòng gán ngôn ngữ cho ít nhất 1 cột!")
             return
 
-        text_col_idx = list(lang_cols.keys())[0]
-        lang_name = lang_cols[text_col_idx]
-
-        key_col = self.data_manager.column_names[key_col_idx]
-        text_col = self.data_manager.column_names[text_col_idx]
+        text_col_idx, lang_name = self._run_language('api', config, lang_cols)
 
         self.api_engine.set_voice(config['voice_id'])
         self.api_engine.set_format(config['format'])
         self.api_engine.set_auto_backup(config.get('auto_backup', False))
         retry = self.config.get_setting('advanced.retry_attempts', 2)
         self.api_engine.set_retry_attempts(retry)
+        self.api_engine.set_max_concurrent(
+            self.config.get_setting('performance.max_concurrent_exports', 3))
+        self._apply_coalescing(self.api_engine, config.get('coalesce', False))
 
         # Check session resume
-        levels = config['levels']
-        resume_from = None
-        if self.session_manager.has_saved_session():
-            session = self.session_manager.load_session()
-            if session and session.get('mode') == 'api':
-                resume_from = set(session.get('completed_indices', []))
+        resume_from = self._resume_indices('api', lang_name)
 
         self._set_running_state(True)
         self.export_reporter.start_tracking()
@@ -712,42 +921,25 @@ class MainWindow:
 
         def run():
             try:
-                if levels is None:
-                    # All levels
-                    all_data = self.data_manager.filter_by_levels(key_col_idx, None)
-                    rows = all_data.to_dict('records')
-                    export_dir = os.path.join(config['output_dir'], lang_name.lower()[:2])
-                    os.makedirs(export_dir, exist_ok=True)
-                    self.api_engine.export_batch(rows, key_col, text_col, export_dir,
-                                                 voice=config['voice_id'], resume_from=resume_from)
-                else:
-                    for lv in levels:
-                        if self.api_engine._stop_event.is_set():
-                            break
-
-                        subfolder = config['subfolder_pattern'].format(
-                            level=lv, lang=lang_name.lower()[:2]
-                        )
-                        export_dir = os.path.join(config['output_dir'], subfolder)
-                        os.makedirs(export_dir, exist_ok=True)
-
-                        self.root.after(0, self._append_log, f"\n🏁 LEVEL {lv} → {export_dir}")
-
-                        level_data = self.data_manager.filter_by_level(key_col_idx, lv)
-                        if level_data.empty:
-                            self.root.after(0, self._append_log, f"⚠️ Level {lv} trống")
-                            continue
-
-                        rows = level_data.to_dict('records')
-                        self.api_engine.export_batch(rows, key_col, text_col, export_dir,
-                                                     voice=config['voice_id'], resume_from=resume_from)
+                self._apply_run_estimate('api', config, key_col_idx, text_col_idx, lang_name)
+
+                # Kế hoạch dựng sẵn cho mọi level (đường dẫn output, dòng trống, đã xong, đã có file, trùng)
+                plan = self._build_plan('api', config, key_col_idx, {text_col_idx: lang_name}, resume_from)
+                self._record_plan_skips(plan)
+                self.api_engine.export_plan(plan, voice=config['voice_id'])
 
                 # Save session
-                self._save_current_session('api',
+                self._save_current_session('api', lang_name,
                     self.api_engine.completed_indices,
                     self.data_manager.get_total_rows(), config)
 
+                for item in self.api_engine.failed_items:
+                    self.export_reporter.record_export(item['dialog_id'], status='error', error=item.get('error'))
                 self.export_reporter.stop_tracking()
+                self._learn_voice_rates(config, plan.text_lengths())
+
+                if config.get('write_back'):
+                    self._write_back_results(key_col_idx)
 
                 # Generate manifest
                 output_dir = config['output_dir']
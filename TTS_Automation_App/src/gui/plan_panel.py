@@ -0,0 +1,106 @@
+"""
+Plan Panel - Xem trước kế hoạch chạy (ExecutionPlan) và xuất CSV
+"""
+import tkinter as tk
+from tkinter import filedialog, messagebox
+import ttkbootstrap as ttk
+
+from src.core.execution_planner import ACTIONS
+
+
+class PlanPanel(tk.Toplevel):
+    """Popup xem trước từng dòng sẽ làm gì: đường dẫn output, hành động, thời gian ước tính"""
+
+    ALL = "(Tất cả)"
+    MAX_ROWS = 2000   # Số dòng hiển thị tối đa trong bảng (CSV xuất đủ)
+
+    def __init__(self, parent, plan, format_time):
+        """
+        plan: ExecutionPlan (build_plan)
+        format_time: hàm giây → chuỗi (ExportReporter.format_elapsed_time)
+        """
+        super().__init__(parent)
+        self.title("🗺️ Kế hoạch chạy")
+        self.geometry("900x520")
+        self.transient(parent)
+
+        self.plan = plan
+        self.format_time = format_time
+
+        self._build_ui()
+        self._populate()
+
+    def _build_ui(self):
+        header = ttk.Frame(self, padding=10)
+        header.pack(fill=tk.X)
+
+        ttk.Label(header, text="🗺️ Kế hoạch chạy", font=("", 13, "bold")).pack(side=tk.LEFT)
+        counts = self.plan.counts()
+        summary = " · ".join(f"{name}: {count:,}" for name, count in counts.items() if count)
+        ttk.Label(header, text=f"{summary} · ⏱ {self.format_time(self.plan.total_seconds())}",
+                  foreground="gray").pack(side=tk.RIGHT)
+
+        filter_row = ttk.Frame(self, padding=(10, 0, 10, 5))
+        filter_row.pack(fill=tk.X)
+        ttk.Label(filter_row, text="Hành động:").pack(side=tk.LEFT)
+        self.action_var = tk.StringVar(value=self.ALL)
+        action_filter = ttk.Combobox(filter_row, textvariable=self.action_var, state="readonly", width=14,
+                                     values=[self.ALL] + [name for name, count in counts.items() if count])
+        action_filter.pack(side=tk.LEFT, padx=5)
+        action_filter.bind("<<ComboboxSelected>>", lambda e: self._populate())
+        self.count_label = ttk.Label(filter_row, text="", foreground="gray")
+        self.count_label.pack(side=tk.RIGHT)
+
+        tree_frame = ttk.Frame(self, padding=(10, 0))
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+
+        columns = ("level", "dialog_id", "action", "exists", "est", "output_path")
+        headings = ("Level", "Dialog ID", "Hành động", "Có file", "Ước tính", "File output")
+        widths = (50, 160, 90, 60, 70, 440)
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=15)
+        for col, heading, width in zip(columns, headings, widths):
+            self.tree.heading(col, text=heading)
+            self.tree.column(col, width=width, stretch=col == "output_path")
+
+        vsb = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+
+        btn_frame = ttk.Frame(self, padding=10)
+        btn_frame.pack(fill=tk.X)
+        ttk.Button(btn_frame, text="📄 Export CSV", command=self._export_csv,
+                   bootstyle="outline-info", width=12).pack(side=tk.LEFT)
+        ttk.Button(btn_frame, text="Đóng", command=self.destroy,
+                   bootstyle="secondary", width=8).pack(side=tk.RIGHT)
+
+    def _populate(self):
+        self.tree.delete(*self.tree.get_children())
+
+        action = self.action_var.get()
+        mask = None if action == self.ALL else self.plan.mask(ACTIONS.index(action))
+        total = len(self.plan) if mask is None else int(mask.sum())
+
+        for row in self.plan.rows(mask, limit=self.MAX_ROWS):
+            _language, level, _index, dialog_id, _length, _export_dir, output_path, exists, name, est = row
+            self.tree.insert("", tk.END, values=(
+                level, dialog_id, name, "✔" if exists else "", f"{est:.1f}s" if est else "", output_path,
+            ))
+
+        shown = min(total, self.MAX_ROWS)
+        self.count_label.config(text=f"{shown:,}/{total:,} dòng" if shown < total else f"{total:,} dòng")
+
+    def _export_csv(self):
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")],
+            initialfile="execution_plan.csv"
+        )
+        if not path:
+            return
+        try:
+            self.plan.to_csv(path)
+            messagebox.showinfo("Đã lưu", f"✅ Đã xuất {len(self.plan):,} dòng ra:\n{path}", parent=self)
+        except Exception as e:
+            messagebox.showerror("Lỗi", f"Không thể lưu file:\n{e}", parent=self)
@@ -104,6 +104,14 @@ class SettingsWindow(tk.Toplevel):
                     width=5).pack(side=tk.LEFT, padx=10)
         ttk.Label(retry_frame, text="(0 = không retry)", foreground="gray").pack(side=tk.LEFT)
 
+        # Data store
+        data_frame = ttk.Labelframe(tab, text="Dữ liệu", bootstyle="warning", padding=10)
+        data_frame.pack(fill=tk.X, pady=(0, 10))
+
+        self.sqlite_store_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(data_frame, text="🗄️ Lưu dữ liệu vào SQLite (file rất lớn, mở lại nhanh)",
+                        variable=self.sqlite_store_var, bootstyle="round-toggle").pack(anchor=tk.W, pady=3)
+
     def _build_notifications_tab(self):
         tab = ttk.Frame(self.notebook, padding=15)
         self.notebook.add(tab, text="  🔔 Thông báo  ")
@@ -166,6 +174,7 @@ class SettingsWindow(tk.Toplevel):
         self.theme_var.set(s.get('general', {}).get('theme', 'darkly'))
         self.auto_save_var.set(s.get('general', {}).get('auto_save_interval', 300))
         self.max_concurrent_var.set(s.get('performance', {}).get('max_concurrent_exports', 3))
+        self.sqlite_store_var.set(s.get('performance', {}).get('sqlite_store', False))
         self.retry_var.set(s.get('advanced', {}).get('retry_attempts', 2))
         self.sound_var.set(s.get('notifications', {}).get('sound_on_complete', True))
         self.toast_var.set(s.get('notifications', {}).get('windows_notification', True))
@@ -183,6 +192,7 @@ class SettingsWindow(tk.Toplevel):
             },
             'performance': {
                 'max_concurrent_exports': int(self.max_concurrent_var.get()),
+                'sqlite_store': self.sqlite_store_var.get(),
             },
             'notifications': {
                 'sound_on_complete': self.sound_var.get(),
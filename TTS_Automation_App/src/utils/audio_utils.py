@@ -0,0 +1,181 @@
+"""
+Audio Utils - Phân tích và cắt file MP3 theo frame (không cần decoder)
+"""
+import bisect
+import os
+import wave
+
+# Bitrate (kbps) của Layer III theo index
+_BITRATES_MPEG1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_MPEG2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+
+# Sample rate theo version bits: 0 = MPEG2.5, 2 = MPEG2, 3 = MPEG1
+_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+# main_data_begin tối đa (9 bit ở MPEG1, 8 bit ở MPEG2): đủ chừng này byte main data phía trước
+# thì mọi frame sau đều giải mã được
+MAX_RESERVOIR = 511
+
+
+def _skip_id3(data):
+    """Bỏ qua ID3v2 tag ở đầu file (nếu có)"""
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return 10 + size
+    return 0
+
+
+def _parse_frame_header(data, pos):
+    """
+    Đọc header MP3 Layer III tại pos.
+    Returns: (frame_length, duration_seconds) hoặc None nếu không phải header hợp lệ
+    """
+    if pos + 4 > len(data):
+        return None
+    b1, b2 = data[pos + 1], data[pos + 2]
+    if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    padding = (b2 >> 1) & 0x01
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if version == 3:
+        bitrate = _BITRATES_MPEG1[bitrate_index] * 1000
+        frame_length = 144 * bitrate // sample_rate + padding
+        samples = 1152
+    else:
+        bitrate = _BITRATES_MPEG2[bitrate_index] * 1000
+        frame_length = 72 * bitrate // sample_rate + padding
+        samples = 576
+    return frame_length, samples / sample_rate
+
+
+def mp3_frames(data):
+    """
+    Liệt kê các frame MP3.
+    Returns: list of (byte_offset, start_time_seconds)
+    """
+    frames = []
+    pos = _skip_id3(data)
+    elapsed = 0.0
+    while pos + 4 <= len(data):
+        header = _parse_frame_header(data, pos)
+        if header is None:
+            pos += 1  # Dữ liệu rác → dò tiếp tới sync word kế tiếp
+            continue
+        frame_length, duration = header
+        frames.append((pos, elapsed))
+        elapsed += duration
+        pos += frame_length
+    return frames
+
+
+def mp3_duration(data):
+    """Độ dài audio (giây) của dữ liệu MP3"""
+    total = 0.0
+    pos = _skip_id3(data)
+    while pos + 4 <= len(data):
+        header = _parse_frame_header(data, pos)
+        if header is None:
+            pos += 1
+            continue
+        total += header[1]
+        pos += header[0]
+    return total
+
+
+def audio_file_duration(filepath):
+    """Độ dài (giây) của file .wav / .mp3 đã export, None nếu không đọc được"""
+    try:
+        if os.path.splitext(filepath)[1].lower() == '.wav':
+            try:
+                with wave.open(filepath, 'rb') as audio:
+                    return audio.getnframes() / float(audio.getframerate())
+            except wave.Error:
+                pass  # Dữ liệu MP3 lưu với đuôi .wav
+        with open(filepath, 'rb') as f:
+            duration = mp3_duration(f.read())
+        return duration if duration > 0 else None
+    except OSError:
+        return None
+
+
+def _main_data(data, pos, frame_length):
+    """(main_data_begin, số byte main data) của frame Layer III tại pos"""
+    b1, b3 = data[pos + 1], data[pos + 3]
+    mpeg1 = (b1 >> 3) & 0x03 == 3
+    mono = (b3 >> 6) == 3
+    side = pos + 4 + (0 if b1 & 0x01 else 2)  # Protection bit = 0 → có CRC 16 bit sau header
+    side_length = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    if side + 2 > len(data):
+        return 0, 0
+    begin = (data[side] << 1 | data[side + 1] >> 7) if mpeg1 else data[side]
+    return begin, max(0, frame_length - (side - pos) - side_length)
+
+
+def split_mp3(data, cut_times, gaps=None):
+    """
+    Cắt dữ liệu MP3 tại các mốc thời gian (giây), cắt đúng ranh giới frame.
+
+    Bit reservoir: frame Layer III có thể lấy main data từ các frame trước (main_data_begin > 0),
+    cắt ngay trước frame đó thì đoạn sau thiếu dữ liệu (click / mất frame ở đầu clip). Với mỗi mốc:
+        1. Trong khoảng lặng gaps[i] = (start, end): cắt ở frame tự chứa (main_data_begin == 0) gần mốc nhất
+        2. Không có: đoạn sau bắt đầu sớm hơn vài frame (vẫn trong khoảng lặng) cho đủ bit reservoir —
+           chỉ frame đầu tiên thiếu dữ liệu, nó nằm trong khoảng lặng nên decoder ra lặng / bỏ qua
+        3. Vẫn không được → ValueError (caller export từng dòng)
+    gaps: None → khoảng lặng chỉ là chính mốc cắt
+    Returns: list gồm len(cut_times) + 1 đoạn bytes
+    """
+    frames = mp3_frames(data)
+    if not frames:
+        raise ValueError("Không tìm thấy frame MP3 hợp lệ")
+
+    starts = [start for _, start in frames]
+    info = [_main_data(data, offset, _parse_frame_header(data, offset)[0]) for offset, _ in frames]
+
+    def decodable_from(lead):
+        """Đoạn bắt đầu ở frame lead: mọi frame sau có đủ bit reservoir (trừ chính frame lead)"""
+        available = 0
+        for m in range(lead + 1, len(frames)):
+            available += info[m - 1][1]
+            if info[m][0] > available:
+                return False
+            if available >= MAX_RESERVOIR:
+                return True
+        return True
+
+    bounds = [frames[0][0]]
+    previous = 0  # Frame đầu của đoạn đang dựng
+    for cut, (gap_start, gap_end) in zip(cut_times, gaps or [(cut, cut) for cut in cut_times]):
+        index = bisect.bisect_left(starts, cut)
+        if index >= len(frames):
+            bounds += [len(data), len(data)]
+            previous = len(frames)
+            continue
+        first = max(bisect.bisect_left(starts, gap_start), previous + 1)
+        last = bisect.bisect_right(starts, gap_end)
+
+        clean = [i for i in range(first, last) if info[i][0] == 0]
+        if clean:
+            cut_frame = lead = min(clean, key=lambda i: abs(starts[i] - cut))
+        else:
+            # Frame dẫn đầu (thiếu reservoir) nằm trước mốc, trong khoảng lặng; từ frame sau nó đều đủ dữ liệu
+            cut_frame = index
+            lead = next((j for j in range(cut_frame - 1, first - 1, -1) if decodable_from(j)), None)
+            if lead is None or cut_frame <= previous:
+                raise ValueError(f"Không cắt được tại {cut:.2f}s: bit reservoir vượt ra ngoài khoảng lặng")
+        bounds += [frames[cut_frame][0], frames[lead][0]]
+        previous = lead
+
+    bounds.append(len(data))
+    return [data[bounds[i]:bounds[i + 1]] for i in range(0, len(bounds), 2)]
@@ -0,0 +1,250 @@
+"""
+Data Cache - Cache DataFrame đã parse (file local) và bản export Google Sheet (HTTP)
+"""
+import hashlib
+import json
+import os
+import re
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "cache")
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class DatasetCache:
+    """
+    Lưu DataFrame đã parse ra file nhị phân (Feather nếu có pyarrow, ngược lại pickle).
+    Khóa = path + size + mtime + tham số đọc (sheet, skip_rows, ...): file đổi → khóa đổi,
+    entry cũ của cùng file bị dọn khi ghi entry mới (tối đa max_entries entry).
+    """
+
+    # Tăng khi đổi cách xử lý DataFrame sau khi đọc để bỏ cache cũ
+    FORMAT_VERSION = 1
+
+    def __init__(self, cache_dir=None, max_entries=20):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.max_entries = max_entries
+        self._base_entries = max_entries
+        self.use_feather = _has_pyarrow()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def ensure_capacity(self, entries):
+        """Giữ thêm được entries entry ngoài giới hạn ban đầu (VD load thư mục nhiều file)"""
+        self.max_entries = max(self.max_entries, self._base_entries + entries)
+
+    def _fingerprint(self, filepath, params):
+        stat = os.stat(filepath)
+        return {
+            'path': os.path.abspath(filepath),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'params': {k: params[k] for k in sorted(params)},
+            'version': self.FORMAT_VERSION,
+        }
+
+    def _entry_paths(self, fingerprint):
+        raw = json.dumps(fingerprint, sort_keys=True, default=str).encode('utf-8')
+        key = hashlib.sha1(raw).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base
+
+    def load(self, filepath, **params):
+        """DataFrame đã cache cho file + tham số, None nếu chưa có hoặc file đã đổi"""
+        try:
+            meta_path, data_base = self._entry_paths(self._fingerprint(filepath, params))
+            if not os.path.exists(meta_path):
+                return None
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+            if meta['format'] == 'feather':
+                df = pd.read_feather(data_base + '.feather')
+            else:
+                df = pd.read_pickle(data_base + '.pkl')
+            df.columns = meta['columns']
+            return df
+        except Exception:
+            return None  # Cache hỏng → đọc lại từ file gốc
+
+    def store(self, filepath, df, **params):
+        """Lưu DataFrame vào cache. Lỗi ghi cache không ảnh hưởng việc load"""
+        try:
+            fingerprint = self._fingerprint(filepath, params)
+            meta_path, data_base = self._entry_paths(fingerprint)
+
+            fmt = 'pickle'
+            if self.use_feather:
+                try:
+                    # Feather cần tên cột kiểu str và RangeIndex
+                    df.reset_index(drop=True).set_axis(
+                        [str(c) for c in df.columns], axis=1
+                    ).to_feather(data_base + '.feather.tmp')
+                    os.replace(data_base + '.feather.tmp', data_base + '.feather')
+                    fmt = 'feather'
+                except Exception:
+                    pass  # Cột kiểu hỗn hợp → dùng pickle
+            if fmt == 'pickle':
+                df.to_pickle(data_base + '.pkl.tmp')
+                os.replace(data_base + '.pkl.tmp', data_base + '.pkl')
+
+            meta = dict(fingerprint, format=fmt, columns=list(df.columns))
+            with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(meta_path + '.tmp', meta_path)
+
+            self._prune(fingerprint)
+            return True
+        except Exception:
+            return False
+
+    def _prune(self, fingerprint):
+        """Xóa entry cũ của cùng file + tham số, giữ tối đa max_entries entry mới nhất"""
+        current = self._entry_paths(fingerprint)[0]
+        metas = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            if meta_path != current and self._is_stale_version(meta_path, fingerprint):
+                self._remove_entry(meta_path[:-len('.json')])
+            else:
+                metas.append(meta_path)
+        if len(metas) <= self.max_entries:
+            return
+        metas.sort(key=os.path.getmtime, reverse=True)
+        for meta_path in metas[self.max_entries:]:
+            self._remove_entry(meta_path[:-len('.json')])
+
+    @staticmethod
+    def _is_stale_version(meta_path, fingerprint):
+        """Entry cùng file + tham số nhưng là phiên bản file cũ"""
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return meta.get('path') == fingerprint['path'] and meta.get('params') == fingerprint['params']
+
+    def _remove_entry(self, data_base):
+        for suffix in ('.json', '.feather', '.pkl'):
+            try:
+                os.remove(data_base + suffix)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                self._remove_entry(os.path.join(self.cache_dir, name[:-len('.json')]))
+
+
+class SheetFetchCache:
+    """
+    Cache bản export CSV của Google Sheet, tải lại bằng request có điều kiện
+    (If-None-Match / If-Modified-Since): sheet không đổi → server trả 304, dùng bản local.
+    Đồng thời nhớ cách truy cập (public/private) đã thành công cho từng sheet.
+    """
+
+    def __init__(self, cache_dir=None, timeout=30):
+        self.cache_dir = cache_dir or os.path.join(CACHE_DIR, "sheets")
+        self.timeout = timeout
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        safe = re.sub(r'[^A-Za-z0-9_-]', '_', key)
+        base = os.path.join(self.cache_dir, safe)
+        return base + '.json', base + '.csv'
+
+    def _read_meta(self, key):
+        meta_path, body_path = self._paths(key)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def fetch(self, url, key):
+        """
+        Tải url (dùng cache nếu server báo không đổi).
+        Returns: (body_bytes, from_cache)
+        Raises: PermissionError nếu server không trả CSV (sheet không public)
+        """
+        meta = self._read_meta(key)
+        meta_path, body_path = self._paths(key)
+
+        request = urllib.request.Request(url)
+        if meta and meta.get('url') == url:
+            if meta.get('etag'):
+                request.add_header('If-None-Match', meta['etag'])
+            if meta.get('last_modified'):
+                request.add_header('If-Modified-Since', meta['last_modified'])
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                content_type = response.headers.get('Content-Type', '')
+                body = response.read()
+                headers = response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and meta:
+                with open(body_path, 'rb') as f:
+                    return f.read(), True
+            if e.code in (401, 403, 404):
+                raise PermissionError(f"Sheet không truy cập công khai được (HTTP {e.code})")
+            raise
+
+        # Sheet private: Google chuyển hướng tới trang đăng nhập (HTML)
+        if 'html' in content_type.lower():
+            raise PermissionError("Sheet không public (nhận trang HTML thay vì CSV)")
+
+        with open(body_path + '.tmp', 'wb') as f:
+            f.write(body)
+        os.replace(body_path + '.tmp', body_path)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': url,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'fetched_at': datetime.now().isoformat(),
+            }, f)
+        return body, False
+
+    # ==================== Access Path ====================
+
+    def _access_path(self):
+        return os.path.join(self.cache_dir, 'access.json')
+
+    def _load_access(self):
+        try:
+            with open(self._access_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get_access(self, sheet_id):
+        """Cách truy cập đã thành công lần trước: 'public', 'private' hoặc None"""
+        return self._load_access().get(sheet_id)
+
+    def set_access(self, sheet_id, access):
+        access_map = self._load_access()
+        if access_map.get(sheet_id) == access:
+            return
+        access_map[sheet_id] = access
+        try:
+            with open(self._access_path(), 'w', encoding='utf-8') as f:
+                json.dump(access_map, f, indent=2)
+        except OSError:
+            pass
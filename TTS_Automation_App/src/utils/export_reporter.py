@@ -6,20 +6,31 @@ import os
 import csv
 from datetime import datetime
 
+from src.utils.audio_utils import audio_file_duration
+
 
 class ExportReporter:
     """Generate export summary reports and manifests"""
 
+    # Số item thực tế cần có để tốc độ đo được nặng ngang ước tính trước khi chạy
+    PRIOR_WEIGHT_ITEMS = 20
+
     def __init__(self):
-        self.exported_files = []  # list of dicts: {dialog_id, filepath, size, status, error}
+        self.exported_files = []  # list of dicts: {dialog_id, filepath, size, duration, status, error}
         self.start_time = None
         self.end_time = None
+        self.prior_seconds_per_item = None
 
     def start_tracking(self):
         """Bắt đầu theo dõi export"""
         self.exported_files = []
         self.start_time = datetime.now()
         self.end_time = None
+        self.prior_seconds_per_item = None
+
+    def set_eta_prior(self, seconds_per_item):
+        """Ước tính giây/item trước khi chạy (RunEstimate) → ETA có ngay từ đầu, sau đó nghiêng dần về tốc độ đo được"""
+        self.prior_seconds_per_item = seconds_per_item
 
     def record_export(self, dialog_id, filepath=None, status='success', error=None):
         """Ghi nhận 1 file đã export"""
@@ -32,8 +43,10 @@ class ExportReporter:
         }
         if filepath and os.path.exists(filepath):
             entry['size_bytes'] = os.path.getsize(filepath)
+            entry['duration_seconds'] = audio_file_duration(filepath)
         else:
             entry['size_bytes'] = 0
+            entry['duration_seconds'] = None
         self.exported_files.append(entry)
 
     def stop_tracking(self):
@@ -47,6 +60,7 @@ class ExportReporter:
         errors = sum(1 for f in self.exported_files if f['status'] == 'error')
         skipped = sum(1 for f in self.exported_files if f['status'] == 'skipped')
         total_size = sum(f.get('size_bytes', 0) for f in self.exported_files)
+        total_duration = sum(f.get('duration_seconds') or 0 for f in self.exported_files)
 
         elapsed = None
         if self.start_time:
@@ -62,11 +76,16 @@ class ExportReporter:
             'skipped': skipped,
             'total_size_bytes': total_size,
             'total_size_mb': round(total_size / (1024 * 1024), 2) if total_size > 0 else 0,
+            'total_duration_seconds': round(total_duration, 1),
             'elapsed_seconds': round(elapsed, 1) if elapsed else 0,
             'speed_per_min': round(speed, 1),
             'success_rate': round(success / total * 100, 1) if total > 0 else 0,
         }
 
+    def get_row_results(self):
+        """Kết quả cuối cùng của từng dialog (bản ghi sau ghi đè bản trước): {dialog_id: entry}"""
+        return {entry['dialog_id']: entry for entry in self.exported_files}
+
     def get_failed_items(self):
         """Lấy danh sách items bị lỗi"""
         return [f for f in self.exported_files if f['status'] == 'error']
@@ -122,9 +141,15 @@ class ExportReporter:
 
     def estimate_eta(self, current_index, total):
         """Ước tính thời gian còn lại"""
+        prior = self.prior_seconds_per_item
         if not self.start_time or current_index <= 0:
+            if prior:
+                return self.format_elapsed_time(total * prior)
             return "Calculating..."
         elapsed = (datetime.now() - self.start_time).total_seconds()
         avg_per_item = elapsed / current_index
+        if prior:
+            weight = current_index / (current_index + self.PRIOR_WEIGHT_ITEMS)
+            avg_per_item = weight * avg_per_item + (1 - weight) * prior
         remaining = (total - current_index) * avg_per_item
         return self.format_elapsed_time(remaining)
@@ -0,0 +1,210 @@
+"""
+File Watcher - Báo file export xuất hiện trong thư mục (inotify trên Linux, quét scandir ở nơi khác)
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+SCAN_INTERVAL = 0.1      # Giây giữa 2 lần quét thư mục (backend scandir)
+
+# inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')   # wd, mask, cookie, len (+ name len byte)
+
+_libc = None
+
+
+def _inotify_libc():
+    """libc có inotify (chỉ Linux), None nếu không dùng được"""
+    global _libc
+    if _libc is None:
+        _libc = False
+        if sys.platform.startswith('linux'):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+                libc.inotify_init1, libc.inotify_add_watch  # noqa: B018 — kiểm tra có symbol
+                _libc = libc
+            except (OSError, AttributeError):
+                pass
+    return _libc or None
+
+
+class FileWatcher:
+    """
+    1 watcher cho 1 thư mục export, dùng chung cả batch:
+        expect(names) trước action export → wait_for(names, timeout) chờ 1 trong các file đó được ghi xong.
+    inotify: sự kiện IN_CLOSE_WRITE / IN_MOVED_TO (file đã đóng hoặc rename vào thư mục).
+    scandir: quét thư mục mỗi SCAN_INTERVAL, file khác lúc expect và size > 0 không đổi qua 2 lần quét.
+    Chỉ file đã expect mới được ghi nhận.
+    """
+
+    def __init__(self, directory, interval=SCAN_INTERVAL, use_inotify=True):
+        self.directory = directory
+        self.interval = interval
+        self.backend = 'inotify' if use_inotify and _inotify_libc() else 'scandir'
+        self._cond = threading.Condition()
+        self._expected = {}      # {name: (size, mtime_ns) lúc expect, None nếu chưa có} (scandir dùng)
+        self._arrived = {}       # {name: path}
+        self._pending = {}       # scandir: {name: (size, mtime_ns)} lần quét trước, chờ ổn định
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+
+    def start(self):
+        if self.backend == 'inotify':
+            try:
+                self._fd = self._open_inotify()
+            except OSError:
+                self.backend = 'scandir'
+        target = self._read_events if self.backend == 'inotify' else self._scan_loop
+        self._thread = threading.Thread(target=target, name=f"FileWatcher:{self.directory}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def expect(self, names):
+        """
+        Đăng ký tên file sắp được export (gọi trước action tạo file), thay cho danh sách cũ.
+        File tới sau đó được giữ lại tới lần expect kế tiếp → nhiều step chờ cùng 1 file vẫn thấy.
+        """
+        with self._cond:
+            self._expected = {name: self._stat(name) if self.backend == 'scandir' else None for name in names}
+            self._arrived = {}
+            self._pending = {}
+
+    def wait_for(self, names, timeout, should_continue=None):
+        """
+        Chờ 1 trong các file names được ghi xong (chưa expect thì expect ngay lúc gọi).
+        should_continue(): False → thôi chờ (stop). Gọi ngoài lock, có thể block khi pause.
+        Returns: đường dẫn file, None nếu timeout / bị dừng
+        """
+        with self._cond:
+            missing = not any(name in self._expected for name in names)
+        if missing:
+            self.expect(names)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                remaining = deadline - time.monotonic()
+                if remaining > 0 and not any(name in self._arrived for name in names):
+                    self._cond.wait(min(0.2, remaining))
+                path = next((self._arrived[name] for name in names if name in self._arrived), None)
+            if path is not None:
+                return path
+            if time.monotonic() >= deadline or (should_continue and not should_continue()):
+                return None
+
+    def _deliver(self, name):
+        with self._cond:
+            if name in self._expected:
+                self._arrived[name] = os.path.join(self.directory, name)
+                self._cond.notify_all()
+
+    # --- inotify ---
+
+    def _open_inotify(self):
+        libc = _inotify_libc()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        wd = libc.inotify_add_watch(fd, os.fsencode(self.directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, f"inotify_add_watch: {self.directory}")
+        return fd
+
+    def _read_events(self):
+        fd = self._fd
+        while not self._stop.is_set():
+            ready, _, _ = select.select([fd], [], [], 0.2)
+            if not ready:
+                continue
+            try:
+                buffer = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buffer):
+                _wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(buffer, offset)
+                offset += _EVENT_HEADER.size
+                name = buffer[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if name:
+                    self._deliver(os.fsdecode(name))
+
+    # --- scandir ---
+
+    def _stat(self, name):
+        try:
+            st = os.stat(os.path.join(self.directory, name))
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _scan_loop(self):
+        while not self._stop.wait(self.interval):
+            with self._cond:
+                if not self._expected:
+                    continue
+                expected = dict(self._expected)
+            try:
+                with os.scandir(self.directory) as entries:
+                    found = {entry.name: entry.stat() for entry in entries if entry.name in expected}
+            except OSError:
+                continue
+
+            for name, st in found.items():
+                if not st.st_size:
+                    continue
+                state = (st.st_size, st.st_mtime_ns)
+                if state == expected[name]:
+                    continue  # File cũ từ trước khi expect
+                with self._cond:
+                    stable = self._pending.get(name) == state
+                    self._pending[name] = state
+                if stable:
+                    self._deliver(name)
+
+
+class WatcherPool:
+    """1 FileWatcher cho mỗi thư mục export, mở lazily, đóng hết cuối batch"""
+
+    def __init__(self):
+        self._watchers = {}
+        self._lock = threading.Lock()
+
+    def get(self, directory):
+        """Watcher của thư mục (None nếu thư mục chưa tồn tại)"""
+        directory = os.path.abspath(directory)
+        with self._lock:
+            watcher = self._watchers.get(directory)
+            if watcher is None:
+                if not os.path.isdir(directory):
+                    return None
+                watcher = self._watchers[directory] = FileWatcher(directory).start()
+            return watcher
+
+    def close(self):
+        with self._lock:
+            watchers, self._watchers = list(self._watchers.values()), {}
+        for watcher in watchers:
+            watcher.stop()
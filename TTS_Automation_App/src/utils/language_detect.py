@@ -0,0 +1,128 @@
+"""
+Language Detect - Đoán ngôn ngữ của cột text theo thống kê Unicode script (NumPy)
+"""
+import unicodedata
+
+import numpy as np
+
+# Nhóm ký tự dùng để thống kê
+SCRIPTS = ('latin', 'vietnamese', 'kana', 'han', 'hangul', 'thai', 'other')
+_LATIN, _VIET, _KANA, _HAN, _HANGUL, _THAI, _OTHER = range(len(SCRIPTS))
+
+# (start, end, script) — khoảng code point
+_RANGES = [
+    (0x0041, 0x005A, _LATIN), (0x0061, 0x007A, _LATIN),
+    (0x00C0, 0x024F, _LATIN),                       # Latin-1 Supplement + Extended-A/B
+    (0x0E00, 0x0E7F, _THAI),
+    (0x1100, 0x11FF, _HANGUL),                      # Hangul Jamo
+    (0x1EA0, 0x1EF9, _VIET),                        # Chữ có dấu thanh tiếng Việt (ạ, ế, ữ...)
+    (0x3040, 0x30FF, _KANA),                        # Hiragana + Katakana
+    (0x3130, 0x318F, _HANGUL),
+    (0x31F0, 0x31FF, _KANA),
+    (0x3400, 0x4DBF, _HAN),
+    (0x4E00, 0x9FFF, _HAN),
+    (0xAC00, 0xD7AF, _HANGUL),
+    (0xF900, 0xFAFF, _HAN),
+    (0xFF66, 0xFF9F, _KANA),                        # Katakana half-width
+]
+
+# Chữ riêng của tiếng Việt nằm trong khối Latin: ă đ ơ ư ĩ ũ (cả chữ hoa)
+_VIET_LETTERS = 'ăĂđĐơƠưƯĩĨũŨ'
+
+# Chữ đặc trưng của các ngôn ngữ Latin khác (không có thì coi là English)
+LATIN_MARKERS = {
+    'German': 'ßäöüÄÖÜ',
+    'Spanish': 'ñÑ¿¡',
+    'Portuguese': 'ãõÃÕ',
+    'French': 'èëœçÈËŒÇ',
+}
+
+
+def _build_tables():
+    """Bảng tra theo code point (BMP): script id và marker id (0 = không phải chữ đặc trưng)"""
+    scripts = np.full(0x10000, _OTHER, dtype=np.uint8)
+    for start, end, script in _RANGES:
+        scripts[start:end + 1] = script
+    scripts[[ord(c) for c in _VIET_LETTERS]] = _VIET
+
+    markers = np.zeros(0x10000, dtype=np.uint8)
+    for marker_id, chars in enumerate(LATIN_MARKERS.values(), start=1):
+        markers[[ord(c) for c in chars]] = marker_id
+    return scripts, markers
+
+
+_SCRIPT_TABLE, _MARKER_TABLE = _build_tables()
+
+MIN_LETTERS = 20          # Ít chữ hơn → không đủ để đoán
+SCRIPT_SHARE = 0.3        # Tỉ lệ tối thiểu của 1 script trong số chữ
+VIET_SHARE = 0.02         # Tỉ lệ chữ riêng tiếng Việt trong chữ Latin
+KANA_IN_CJK = 0.1         # Có kana trong chữ Hán/kana → tiếng Nhật
+MARKER_SHARE = 0.005      # Tỉ lệ chữ đặc trưng của ngôn ngữ Latin khác
+
+
+def _codepoints(text):
+    """Chuỗi → mảng code point (NFC để dấu tổ hợp gộp vào chữ)"""
+    text = unicodedata.normalize('NFC', text)
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+def script_histograms(columns):
+    """
+    Đếm số chữ theo script cho nhiều cột trong 1 lượt.
+    columns: list các list text (mỗi phần tử là mẫu 1 cột)
+    Returns: (histograms int64 [n_cols, len(SCRIPTS)], markers {tên: int64 [n_cols]})
+    """
+    points = [_codepoints('\n'.join(texts)) for texts in columns]
+    lengths = np.array([len(p) for p in points], dtype=np.int64)
+    codes = np.concatenate(points) if points else np.array([], dtype=np.uint32)
+    col_ids = np.repeat(np.arange(len(columns)), lengths)
+
+    # Ngoài BMP (emoji, chữ hiếm) → 'other' (ô 0xFFFF của bảng là 'other')
+    bmp = np.minimum(codes, 0xFFFF)
+    n_cols, n_scripts, n_markers = len(columns), len(SCRIPTS), len(LATIN_MARKERS) + 1
+
+    histograms = np.bincount(col_ids * n_scripts + _SCRIPT_TABLE[bmp], minlength=n_cols * n_scripts)
+    marker_counts = np.bincount(col_ids * n_markers + _MARKER_TABLE[bmp],
+                                minlength=n_cols * n_markers).reshape(n_cols, n_markers)
+    markers = {lang: marker_counts[:, i] for i, lang in enumerate(LATIN_MARKERS, start=1)}
+    return histograms.reshape(n_cols, n_scripts), markers
+
+
+def classify_histogram(counts, markers=None):
+    """
+    Đoán ngôn ngữ từ histogram script của 1 cột.
+    counts: dãy số chữ theo SCRIPTS; markers: {ngôn ngữ Latin: số chữ đặc trưng}
+    Returns: tên ngôn ngữ hoặc None
+    """
+    letters = int(counts[:_OTHER].sum())
+    if letters < MIN_LETTERS:
+        return None
+
+    cjk = counts[_KANA] + counts[_HAN]
+    latin = counts[_LATIN] + counts[_VIET]
+    if counts[_HANGUL] >= letters * SCRIPT_SHARE:
+        return 'Korean'
+    if cjk >= letters * SCRIPT_SHARE:
+        return 'Japanese' if counts[_KANA] >= cjk * KANA_IN_CJK else 'Chinese'
+    if counts[_THAI] >= letters * SCRIPT_SHARE:
+        return 'Thai'
+    if latin >= letters * SCRIPT_SHARE:
+        if counts[_VIET] >= latin * VIET_SHARE:
+            return 'Vietnamese'
+        if markers:
+            lang, hits = max(markers.items(), key=lambda item: item[1])
+            if hits >= latin * MARKER_SHARE:
+                return lang
+        return 'English'
+    return None
+
+
+def detect_languages(columns):
+    """Đoán ngôn ngữ cho nhiều cột (list các list text). Returns: list tên ngôn ngữ / None"""
+    if not columns:
+        return []
+    histograms, markers = script_histograms(columns)
+    return [
+        classify_histogram(histograms[i], {lang: int(hits[i]) for lang, hits in markers.items()})
+        for i in range(len(columns))
+    ]
@@ -0,0 +1,154 @@
+"""
+Screen Region - Chụp vùng màn hình nhỏ và so sánh bằng checksum NumPy để biết UI đã sẵn sàng
+"""
+import os
+import time
+import zlib
+
+import numpy as np
+
+THUMBNAILS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "templates", "thumbnails")
+
+# Điều kiện sẵn sàng của step (trường wait_until.condition)
+CONDITIONS = ('changed', 'stable', 'matches')
+
+POLL_INTERVAL = 0.05     # Giây giữa 2 lần chụp vùng
+STABLE_FRAMES = 3        # 'stable': số lần chụp liên tiếp giống nhau
+STABLE_MIN_WAIT = 0.3    # 'stable' không có baseline: chờ tối thiểu trước khi xét (UI chưa kịp đổi sau click)
+MATCH_TOLERANCE = 6.0    # 'matches': sai khác xám trung bình mỗi ô (0-255) vẫn coi là khớp
+BLOCK = 4                # Gộp khối BLOCK×BLOCK pixel → bỏ nhiễu antialias / con trỏ nháy
+QUANT_SHIFT = 3          # Checksum trên giá trị xám đã lượng tử (>> 3): lệch 1-2 mức không tính là đổi
+
+_thumbnail_cache = {}    # {path: (mtime, signature)}
+
+
+def grab_region(region):
+    """Chụp vùng [x, y, w, h] → mảng uint8 (h, w, 3)"""
+    import pyautogui
+    x, y, w, h = (int(v) for v in region)
+    return np.asarray(pyautogui.screenshot(region=(x, y, w, h)).convert('RGB'))
+
+
+def grab_screen():
+    """Chụp toàn màn hình → mảng uint8 (h, w, 3)"""
+    import pyautogui
+    return np.asarray(pyautogui.screenshot().convert('RGB'))
+
+
+def region_signature(pixels, block=BLOCK):
+    """Ảnh (h, w, 3) → lưới xám thu nhỏ uint8: trung bình từng khối block×block (vectorized)"""
+    gray = pixels[..., :3].astype(np.uint16).sum(axis=2)
+    h, w = gray.shape
+    block = max(1, min(block, h, w))
+    h, w = h // block * block, w // block * block
+    grid = gray[:h, :w].reshape(h // block, block, w // block, block).mean(axis=(1, 3)) / 3
+    return grid.astype(np.uint8)
+
+
+def region_checksum(signature):
+    """Checksum của lưới xám đã lượng tử"""
+    return zlib.crc32(np.ascontiguousarray(signature >> QUANT_SHIFT).tobytes())
+
+
+def changed_cells(a, b):
+    """Số ô khác nhau giữa 2 lưới (sau lượng tử); khác kích thước → tất cả"""
+    if a.shape != b.shape:
+        return a.size
+    return int(np.count_nonzero((a >> QUANT_SHIFT) != (b >> QUANT_SHIFT)))
+
+
+def signature_distance(a, b):
+    """Sai khác xám trung bình mỗi ô; khác kích thước → inf"""
+    if a.shape != b.shape:
+        return float('inf')
+    return float(np.abs(a.astype(np.int16) - b.astype(np.int16)).mean())
+
+
+def thumbnail_path(name):
+    return name if os.path.isabs(name) else os.path.join(THUMBNAILS_DIR, name)
+
+
+def load_thumbnail(name):
+    """Signature của ảnh mẫu (cache theo mtime)"""
+    path = thumbnail_path(name)
+    mtime = os.path.getmtime(path)
+    cached = _thumbnail_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    from PIL import Image
+    with Image.open(path) as image:
+        signature = region_signature(np.asarray(image.convert('RGB')))
+    _thumbnail_cache[path] = (mtime, signature)
+    return signature
+
+
+def save_thumbnail(region, name):
+    """Chụp vùng hiện tại làm ảnh mẫu cho điều kiện 'matches'. Returns: đường dẫn file"""
+    from PIL import Image
+    path = thumbnail_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.fromarray(grab_region(region)).save(path)
+    _thumbnail_cache.pop(path, None)
+    return path
+
+
+def validate_wait_until(spec):
+    """Kiểm tra trường wait_until của step, lỗi → ValueError"""
+    region = spec.get('region')
+    if not isinstance(region, (list, tuple)) or len(region) != 4 or int(region[2]) <= 0 or int(region[3]) <= 0:
+        raise ValueError(f"wait_until.region phải là [x, y, w, h]: {region!r}")
+    condition = spec.get('condition', 'stable')
+    if condition not in CONDITIONS:
+        raise ValueError(f"wait_until.condition không hợp lệ: {condition!r} (chọn {', '.join(CONDITIONS)})")
+    if condition == 'matches' and not spec.get('thumbnail'):
+        raise ValueError("wait_until.condition 'matches' cần thumbnail")
+
+
+def wait_for_region(spec, timeout, baseline=None, should_continue=None, grab=grab_region):
+    """
+    Chụp vùng liên tục cho tới khi đạt điều kiện của spec (trường wait_until của step):
+        region: [x, y, w, h]
+        condition: 'changed' (khác baseline chụp trước action) | 'stable' (đã khác baseline rồi frames
+                   lần chụp liên tiếp giống nhau) | 'matches' (giống ảnh mẫu thumbnail trong templates/thumbnails/)
+        frames, tolerance, interval, min_wait: tùy chọn (mặc định STABLE_FRAMES, MATCH_TOLERANCE,
+                   POLL_INTERVAL, 0 — 'stable' không có baseline: STABLE_MIN_WAIT)
+    timeout: chờ tối đa (giây) — wait_after của step
+    baseline: signature chụp trước action (bắt buộc với 'changed'; với 'stable' để không coi vùng
+              "đứng yên" ngay sau click — trước khi UI kịp đổi — là đã sẵn sàng)
+    should_continue(): False → dừng ngay (stop)
+    Returns: số giây tới khi sẵn sàng, None nếu timeout / bị dừng
+    """
+    condition = spec.get('condition', 'stable')
+    region = spec['region']
+    interval = float(spec.get('interval', POLL_INTERVAL))
+    frames = max(2, int(spec.get('frames', STABLE_FRAMES)))
+    tolerance = float(spec.get('tolerance', MATCH_TOLERANCE))
+    target = load_thumbnail(spec['thumbnail']) if condition == 'matches' else None
+    baseline_sum = region_checksum(baseline) if baseline is not None else None
+
+    start = time.perf_counter()
+    default_min_wait = STABLE_MIN_WAIT if condition == 'stable' and baseline_sum is None else 0
+    min_wait = float(spec.get('min_wait', default_min_wait))
+    if min_wait > 0:
+        time.sleep(min(min_wait, timeout))
+
+    last_sum, same = None, 0
+    seen_change = baseline_sum is None  # 'stable': chỉ tính ổn định sau khi vùng đã đổi so với trước action
+    while True:
+        signature = region_signature(grab(region))
+        if condition == 'changed':
+            ready = baseline_sum is not None and region_checksum(signature) != baseline_sum
+        elif condition == 'matches':
+            ready = signature_distance(signature, target) <= tolerance
+        else:
+            checksum = region_checksum(signature)
+            seen_change = seen_change or checksum != baseline_sum
+            same = same + 1 if checksum == last_sum else 1
+            last_sum = checksum
+            ready = seen_change and same >= frames
+        elapsed = time.perf_counter() - start
+        if ready:
+            return elapsed
+        if elapsed + interval > timeout or (should_continue and not should_continue()):
+            return None
+        time.sleep(interval)
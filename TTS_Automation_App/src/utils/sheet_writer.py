@@ -0,0 +1,351 @@
+"""
+Sheet Writer - Ghi thêm/cập nhật cột kết quả vào file CSV/XLSX theo key, 1 lượt đọc-ghi streaming
+"""
+import csv
+import html
+import io
+import os
+import posixpath
+import re
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+# Hậu tố file kết quả cạnh file nguồn (load thư mục bỏ qua các file này)
+STATUS_SUFFIX = '.tts_status'
+
+
+def sibling_path(source_path, suffix=STATUS_SUFFIX):
+    """data.xlsx → data.tts_status.xlsx"""
+    base, ext = os.path.splitext(source_path)
+    return f"{base}{suffix}{ext}"
+
+
+def _target_columns(header, column_names):
+    """
+    Vị trí (0-based) ghi từng cột kết quả: header đã có cột cùng tên (lần ghi trước) → cột đó,
+    chưa có → thêm vào sau cột cuối có tên.
+    """
+    width = len(header)
+    while width and not header[width - 1]:
+        width -= 1
+    targets = []
+    for name in column_names:
+        if name in header[:width]:
+            targets.append(header.index(name))
+        else:
+            targets.append(width)
+            width += 1
+    return targets
+
+
+# ==================== CSV ====================
+
+def _rewrite_rows(rows, skip_rows, key_col_index, column_names, values_by_key, key_of, counter):
+    """
+    rows: iterable list giá trị từng dòng (cả dòng bị bỏ qua phía trên header).
+    Dòng có key không có kết quả giữ nguyên giá trị cũ.
+    """
+    targets = None
+    for index, row in enumerate(rows):
+        row = list(row)
+        if index < skip_rows:
+            yield row
+            continue
+
+        if targets is None:
+            targets = _target_columns([str(c).strip() if c is not None else '' for c in row], column_names)
+            values = column_names
+        else:
+            key = key_of(row[key_col_index]) if key_col_index < len(row) else None
+            values = values_by_key.get(key)
+            if values is None:
+                yield row
+                continue
+            counter[0] += 1
+
+        if len(row) <= max(targets):
+            row.extend([None] * (max(targets) + 1 - len(row)))
+        for target, value in zip(targets, values):
+            row[target] = value
+        yield row
+
+
+def _write_csv(source_path, output_path, rewrite, encoding):
+    with open(source_path, 'rb') as f:
+        has_bom = f.read(3) == b'\xef\xbb\xbf'
+    read_encoding = 'utf-8-sig' if encoding.lower().replace('_', '-') == 'utf-8' else encoding
+    write_encoding = 'utf-8-sig' if has_bom else encoding
+
+    with open(source_path, 'r', newline='', encoding=read_encoding) as fin, \
+            open(output_path, 'w', newline='', encoding=write_encoding) as fout:
+        writer = csv.writer(fout)
+        writer.writerows(
+            ['' if value is None else value for value in row]
+            for row in rewrite(csv.reader(fin))
+        )
+
+
+# ==================== XLSX ====================
+# Sửa trực tiếp XML của sheet trong file zip: các phần khác (style, sheet khác, macro...) chép nguyên byte,
+# sheet đích được đọc-ghi theo khối, chỉ các thẻ <row> có kết quả được dựng lại (ô mới dạng inline string).
+
+_NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_ROW_RE = re.compile(r'<(?P<p>(?:\w+:)?)row\b[^>]*?(?:/>|>.*?</(?P=p)row>)', re.S)
+_ROW_OPEN_RE = re.compile(r'<(?:\w+:)?row\b[^>]*?>')
+_CELL_RE = re.compile(r'<(?:\w+:)?c\b(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</(?:\w+:)?c>)', re.S)
+_ATTR_RE = re.compile(r'\s(\w+)="([^"]*)"')
+_VALUE_RE = re.compile(r'<(?:\w+:)?v>(.*?)</(?:\w+:)?v>', re.S)
+_TEXT_RE = re.compile(r'<(?:\w+:)?t(?:\s[^>]*)?>(.*?)</(?:\w+:)?t>', re.S)
+_REF_RE = re.compile(r'([A-Z]+)(\d+)')
+_DIMENSION_RE = re.compile(r'(<(?:\w+:)?dimension\b[^>]*\sref=")([^"]*)(")')
+_INVALID_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _column_letter(index):
+    """0 → A, 26 → AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _column_index(letters):
+    """A → 0, AA → 26"""
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index - 1
+
+
+def _sheet_parts(archive):
+    """[(tên sheet, đường dẫn XML trong zip)] theo thứ tự trong workbook"""
+    rels = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    paths = {}
+    for rel in rels.iter(f'{_NS_PKG_REL}Relationship'):
+        target = rel.get('Target')
+        paths[rel.get('Id')] = (target.lstrip('/') if target.startswith('/')
+                                else posixpath.normpath(posixpath.join('xl', target)))
+    workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+    return [(sheet.get('name'), paths[sheet.get(f'{_NS_REL}id')])
+            for sheet in workbook.iter(f'{_NS_MAIN}sheet')]
+
+
+def _shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == f'{_NS_MAIN}si':
+                strings.append(''.join(t.text or '' for t in elem.iter(f'{_NS_MAIN}t')))
+                elem.clear()
+    return strings
+
+
+def _cell_value(attrs, body, strings):
+    """Giá trị ô giống openpyxl (str / float / None)"""
+    cell_type = attrs.get('t', 'n')
+    if cell_type == 'inlineStr':
+        return html.unescape(''.join(_TEXT_RE.findall(body or '')))
+    match = _VALUE_RE.search(body or '')
+    if match is None:
+        return None
+    text = html.unescape(match.group(1))
+    if cell_type == 's':
+        return strings[int(text)]
+    if cell_type == 'n':
+        try:
+            return float(text)
+        except ValueError:
+            return text
+    return text
+
+
+def _new_cell(prefix, ref, value):
+    if isinstance(value, (int, float)):
+        return f'<{prefix}c r="{ref}"><{prefix}v>{value}</{prefix}v></{prefix}c>'
+    text = escape(_INVALID_XML_CHARS.sub('', str(value)))
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return (f'<{prefix}c r="{ref}" t="inlineStr"><{prefix}is>'
+            f'<{prefix}t{space}>{text}</{prefix}t></{prefix}is></{prefix}c>')
+
+
+class _SheetPatcher:
+    """Thêm/cập nhật cột kết quả trong XML của 1 sheet, từng thẻ <row> một"""
+
+    def __init__(self, skip_rows, key_col_index, column_names, values_by_key, key_of, strings, counter):
+        self.skip_rows = skip_rows
+        self.key_col_index = key_col_index
+        self.column_names = column_names
+        self.values_by_key = values_by_key
+        self.key_of = key_of
+        self.strings = strings
+        self.counter = counter
+        self.targets = None  # Cột ghi kết quả, biết sau khi đọc header
+        self.row_number = 0
+
+    @staticmethod
+    def _cells(row_xml):
+        """[(cột, attrs, body, xml gốc)] các ô trong dòng"""
+        cells = []
+        column = -1
+        for match in _CELL_RE.finditer(row_xml):
+            attrs = dict(_ATTR_RE.findall(match.group('attrs')))
+            ref = _REF_RE.match(attrs.get('r', ''))
+            column = _column_index(ref.group(1)) if ref else column + 1
+            cells.append((column, attrs, match.group('body'), match.group(0)))
+        return cells
+
+    def patch_row(self, row_xml, prefix):
+        open_tag = _ROW_OPEN_RE.match(row_xml).group(0)
+        number = dict(_ATTR_RE.findall(open_tag)).get('r')
+        self.row_number = int(number) if number else self.row_number + 1
+        if self.row_number <= self.skip_rows or row_xml.endswith('/>'):
+            return row_xml
+
+        cells = self._cells(row_xml)
+        if self.targets is None:
+            header = [''] * (max((c[0] for c in cells), default=-1) + 1)
+            for column, attrs, body, _ in cells:
+                value = _cell_value(attrs, body, self.strings)
+                header[column] = str(value).strip() if value is not None else ''
+            self.targets = _target_columns(header, self.column_names)
+            values = self.column_names
+        else:
+            key_cell = next((c for c in cells if c[0] == self.key_col_index), None)
+            key = self.key_of(_cell_value(key_cell[1], key_cell[2], self.strings)) if key_cell else None
+            values = self.values_by_key.get(key)
+            if values is None:
+                return row_xml
+            self.counter[0] += 1
+
+        replaced = set(self.targets)
+        kept = [(column, xml) for column, _, _, xml in cells if column not in replaced]
+        added = [
+            (column, _new_cell(prefix, f"{_column_letter(column)}{self.row_number}", value))
+            for column, value in zip(self.targets, values) if value is not None
+        ]
+        body = ''.join(xml for _, xml in sorted(kept + added, key=lambda item: item[0]))
+        # spans chỉ là gợi ý cho Excel, bỏ đi vì số cột của dòng đã đổi
+        open_tag = re.sub(r'\sspans="[^"]*"', '', open_tag)
+        return f"{open_tag}{body}</{prefix}row>"
+
+    def widen_dimension(self, text):
+        """Mở rộng <dimension ref="A1:D100"/> để gồm các cột kết quả"""
+        def widen(match):
+            start, _, end = match.group(2).partition(':')
+            end_ref = _REF_RE.match(end or start)
+            if not end_ref or not self.targets:
+                return match.group(0)
+            last = max(_column_index(end_ref.group(1)), max(self.targets))
+            return f"{match.group(1)}{start}:{_column_letter(last)}{end_ref.group(2)}{match.group(3)}"
+        return _DIMENSION_RE.sub(widen, text, count=1)
+
+
+def _patch_sheet_xml(fin, fout, patcher, chunk_size=1 << 20):
+    """Đọc XML sheet theo khối, sửa các <row> hoàn chỉnh; phần dòng dở dang giữ tới khối sau"""
+    buffer = ''
+    held = []  # Phần đầu sheet (có <dimension>) giữ lại tới khi đọc xong header
+    while True:
+        chunk = fin.read(chunk_size)
+        buffer += chunk
+        pieces = []
+        end = 0
+        for match in _ROW_RE.finditer(buffer):
+            pieces.append(buffer[end:match.start()])
+            pieces.append(patcher.patch_row(match.group(0), match.group('p')))
+            end = match.end()
+        if not chunk:
+            pieces.append(buffer[end:])
+            end = len(buffer)
+        buffer = buffer[end:]
+
+        if held is not None:
+            held.extend(pieces)
+            if patcher.targets is None and chunk:
+                continue
+            pieces = [patcher.widen_dimension(''.join(held))]
+            held = None
+        fout.write(''.join(pieces))
+        if not chunk:
+            return
+
+
+def _write_xlsx(source_path, output_path, patcher_args, sheets):
+    with zipfile.ZipFile(source_path) as zin, \
+            zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+        parts = _sheet_parts(zin)
+        if sheets is None:
+            targets = {path for _, path in parts}
+        else:
+            by_name = dict(parts)
+            wanted = sheets if isinstance(sheets, (list, tuple)) else [sheets]
+            targets = {parts[s][1] if isinstance(s, int) else by_name[s] for s in wanted}
+        strings = _shared_strings(zin)
+
+        for info in zin.infolist():
+            out_info = zipfile.ZipInfo(info.filename, info.date_time)
+            out_info.compress_type = info.compress_type
+            out_info.external_attr = info.external_attr
+            large = info.file_size >= 1 << 30
+            with zin.open(info) as src, zout.open(out_info, 'w', force_zip64=large) as dst:
+                if info.filename not in targets:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+                    continue
+                patcher = _SheetPatcher(strings=strings, **patcher_args)
+                fin = io.TextIOWrapper(src, encoding='utf-8')
+                fout = io.TextIOWrapper(dst, encoding='utf-8')
+                _patch_sheet_xml(fin, fout, patcher)
+                fout.flush()
+                fout.detach()
+
+
+def write_result_columns(source_path, column_names, values_by_key, output_path=None,
+                         key_col_index=0, skip_rows=0, sheets=0, encoding='utf-8',
+                         key_of=str, backup=True):
+    """
+    Ghi các cột kết quả vào bản sao của file nguồn (hoặc chính file nguồn).
+    column_names: tên các cột kết quả; values_by_key: {key: tuple giá trị theo column_names}
+    output_path: None = file cạnh file nguồn (xem sibling_path); = source_path để ghi đè
+                 (backup=True → giữ bản cũ ở source_path + '.bak')
+    sheets: sheet cần thêm cột (.xlsx, tên/index hoặc list, None = tất cả); sheet khác,
+            định dạng và công thức giữ nguyên
+    key_of(cell): chuẩn hóa giá trị ô key giống lúc đọc dữ liệu
+    Returns: (output_path, số dòng đã ghi kết quả)
+    """
+    output_path = output_path or sibling_path(source_path)
+    in_place = os.path.abspath(output_path) == os.path.abspath(source_path)
+    column_names = list(column_names)
+    counter = [0]
+
+    ext = os.path.splitext(source_path)[1].lower()
+    if ext not in ('.csv', '.xlsx', '.xlsm'):
+        raise ValueError(f"Định dạng không hỗ trợ ghi kết quả: {ext}")
+
+    tmp_path = output_path + '.tmp' + ext
+    try:
+        if ext == '.csv':
+            def rewrite(rows):
+                return _rewrite_rows(rows, skip_rows, key_col_index, column_names,
+                                     values_by_key, key_of, counter)
+            _write_csv(source_path, tmp_path, rewrite, encoding)
+        else:
+            patcher_args = dict(skip_rows=skip_rows, key_col_index=key_col_index, column_names=column_names,
+                                values_by_key=values_by_key, key_of=key_of, counter=counter)
+            _write_xlsx(source_path, tmp_path, patcher_args, sheets)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if in_place and backup:
+        shutil.copy2(source_path, source_path + '.bak')
+    os.replace(tmp_path, output_path)
+    return output_path, counter[0]
@@ -0,0 +1,133 @@
+"""
+Step Calibration - Thời gian sẵn sàng thực tế của từng bước CapCut, học từ các lần chạy trước
+"""
+import json
+import os
+import platform
+import re
+
+import numpy as np
+
+CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "templates", "calibration")
+
+MIN_SAMPLES = 20        # Số mẫu tối thiểu trước khi dùng wait đã hiệu chỉnh
+MAX_SAMPLES = 200       # Chỉ giữ các mẫu gần nhất
+PERCENTILE = 99
+MARGIN_RATIO = 0.2      # wait = p99 × (1 + margin) + MIN_MARGIN
+MIN_MARGIN = 0.1
+MARGIN_BUMP = 1.5       # Retry tăng vọt → nới margin
+MARGIN_RELAX = 1.1      # Batch chạy êm → thu margin dần về MARGIN_RATIO
+MAX_MARGIN_RATIO = 2.0
+UNOBSERVED_LIMIT = 3    # Số lần đo không thấy màn hình đổi → step không hiệu chỉnh được, luôn chờ đủ
+
+
+def environment_key(screen_size=None):
+    """Máy + độ phân giải màn hình (UI phản hồi nhanh chậm khác nhau giữa các máy)"""
+    node = platform.node() or 'unknown'
+    if screen_size is None:
+        try:
+            import pyautogui
+            screen_size = tuple(pyautogui.size())
+        except Exception:
+            return node
+    return f"{node}|{screen_size[0]}x{screen_size[1]}"
+
+
+def step_fingerprint(step):
+    """Đổi action / target / source / wait_after → mẫu cũ không còn đúng"""
+    return json.dumps([step.get('action'), step.get('target'), step.get('source'), step.get('wait_after')],
+                      ensure_ascii=False)
+
+
+class StepCalibration:
+    """
+    Mẫu thời gian sẵn sàng (giây sau action tới khi màn hình ngừng đổi) theo template × môi trường,
+    lưu ở templates/calibration/<template>.json:
+    {environment: {margin, steps: {step_id: {fingerprint, samples: [...]}}}}
+    """
+
+    def __init__(self, template_name, environment=None, directory=None):
+        name = re.sub(r'[^\w.-]+', '_', template_name or 'current')
+        self.path = os.path.join(directory or CALIBRATION_DIR, f"{name}.json")
+        self.environment = environment or environment_key()
+        self.data = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            return True
+        except OSError:
+            return False
+
+    @property
+    def _env(self):
+        return self.data.setdefault(self.environment, {'margin': MARGIN_RATIO, 'steps': {}})
+
+    @property
+    def margin(self):
+        return self._env.get('margin', MARGIN_RATIO)
+
+    def _samples(self, key, step, create=False):
+        steps = self._env['steps']
+        entry = steps.get(key)
+        fingerprint = step_fingerprint(step)
+        if entry is None or entry.get('fingerprint') != fingerprint:
+            if not create:
+                return []
+            entry = steps[key] = {'fingerprint': fingerprint, 'samples': []}
+        return entry['samples']
+
+    def _entry(self, key, step):
+        self._samples(key, step, create=True)
+        return self._env['steps'][key]
+
+    def mark_unobserved(self, key, step):
+        """Đo xong mà màn hình không đổi. Returns: True nếu step vừa bị coi là không hiệu chỉnh được"""
+        entry = self._entry(key, step)
+        entry['unobserved'] = entry.get('unobserved', 0) + 1
+        return entry['unobserved'] == UNOBSERVED_LIMIT
+
+    def is_observable(self, key, step):
+        """False khi step nhiều lần không thấy màn hình đổi (không đo, không dùng wait đã hiệu chỉnh)"""
+        entry = self._env['steps'].get(key)
+        if entry is None or entry.get('fingerprint') != step_fingerprint(step):
+            return True
+        return entry.get('unobserved', 0) < UNOBSERVED_LIMIT
+
+    def record(self, key, step, seconds):
+        """Thêm 1 mẫu thời gian sẵn sàng của step"""
+        samples = self._samples(key, step, create=True)
+        samples.append(round(float(seconds), 3))
+        del samples[:-MAX_SAMPLES]
+
+    def sample_count(self, key, step):
+        return len(self._samples(key, step))
+
+    def calibrated_wait(self, key, step, limit):
+        """Wait đã hiệu chỉnh (p99 + margin, không vượt limit), None nếu chưa đủ mẫu"""
+        samples = self._samples(key, step)
+        if len(samples) < MIN_SAMPLES or not self.is_observable(key, step):
+            return None
+        wait = float(np.percentile(samples, PERCENTILE)) * (1 + self.margin) + MIN_MARGIN
+        return min(wait, limit)
+
+    def widen_margin(self):
+        """Retry tăng vọt với wait đã hiệu chỉnh → lần sau chờ dư hơn"""
+        self._env['margin'] = min(self.margin * MARGIN_BUMP, MAX_MARGIN_RATIO)
+
+    def relax_margin(self):
+        self._env['margin'] = max(self.margin / MARGIN_RELAX, MARGIN_RATIO)
+
+    def calibrated_steps(self, steps):
+        """Số step đã đủ mẫu trong danh sách steps"""
+        return sum(1 for step in steps if self.sample_count(str(step.get('id', 0)), step) >= MIN_SAMPLES)
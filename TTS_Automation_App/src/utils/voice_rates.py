@@ -0,0 +1,110 @@
+"""
+Voice Rates - Tốc độ đọc / tốc độ tổng hợp / dung lượng audio học từ các lần export trước
+"""
+import json
+import os
+
+RATES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "sessions", "voice_rates.json")
+
+# Số ký tự đọc được mỗi giây audio khi chưa có dữ liệu học (tốc độ đọc trung bình của TTS)
+DEFAULT_SPEECH_RATES = {
+    'Vietnamese': 14.0,
+    'English': 15.0,
+    'German': 14.0,
+    'Spanish': 15.0,
+    'Portuguese': 15.0,
+    'French': 14.0,
+    'Japanese': 7.5,
+    'Korean': 7.0,
+    'Chinese': 4.5,
+    'Thai': 11.0,
+}
+DEFAULT_SPEECH_RATE = 14.0
+
+# Byte mỗi giây audio: Edge TTS mp3 24kHz 48kbps mono, wav 24kHz 16-bit mono
+DEFAULT_BYTE_RATES = {
+    'mp3': 6000.0,
+    'wav': 48000.0,
+}
+
+# Trọng số dữ liệu cũ mỗi lần học thêm → tốc độ bám theo các lần chạy gần nhất
+DECAY = 0.5
+
+
+class VoiceRates:
+    """
+    Tốc độ theo từng giọng đọc, lưu dạng tổng tích lũy (có suy giảm) trong 1 file JSON:
+    {voice: {chars, audio_seconds, bytes, byte_seconds, wall_chars, wall_seconds, format}}
+    """
+
+    def __init__(self, path=None):
+        self.path = path or RATES_PATH
+        self.rates = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.rates = json.load(f)
+        except (OSError, ValueError):
+            self.rates = {}
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.rates, f, indent=2, ensure_ascii=False)
+            return True
+        except OSError:
+            return False
+
+    def speech_rate(self, voice=None, language=None):
+        """Ký tự / giây audio: học được của giọng → mặc định theo ngôn ngữ"""
+        stats = self.rates.get(voice) or {}
+        if stats.get('audio_seconds'):
+            return stats['chars'] / stats['audio_seconds']
+        return DEFAULT_SPEECH_RATES.get(language, DEFAULT_SPEECH_RATE)
+
+    def byte_rate(self, voice=None, fmt='mp3'):
+        """Byte / giây audio: học được của giọng → mặc định theo định dạng"""
+        stats = self.rates.get(voice) or {}
+        if stats.get('byte_seconds') and stats.get('format') == fmt:
+            return stats['bytes'] / stats['byte_seconds']
+        return DEFAULT_BYTE_RATES.get(fmt, DEFAULT_BYTE_RATES['mp3'])
+
+    def synth_rate(self, voice):
+        """Ký tự / giây thực (cả batch, đã tính request song song), None nếu chưa học"""
+        stats = self.rates.get(voice) or {}
+        if stats.get('wall_seconds'):
+            return stats['wall_chars'] / stats['wall_seconds']
+        return None
+
+    def learn(self, voice, entries, text_lengths, wall_seconds, fmt='mp3'):
+        """
+        Học thêm từ 1 lần export.
+        entries: bản ghi ExportReporter (success có duration_seconds)
+        text_lengths: {dialog_id: số ký tự}
+        wall_seconds: thời gian thực của cả lần chạy
+        Returns: True nếu có dữ liệu để học
+        """
+        chars = audio = size = 0
+        for entry in entries:
+            length = text_lengths.get(entry['dialog_id'])
+            if entry['status'] != 'success' or not length or not entry.get('duration_seconds'):
+                continue
+            chars += length
+            audio += entry['duration_seconds']
+            size += entry.get('size_bytes', 0)
+        if not chars:
+            return False
+
+        old = self.rates.get(voice) or {}
+        if old.get('format') != fmt:
+            # Đổi định dạng → dung lượng cũ không còn đúng, tốc độ đọc vẫn dùng được
+            old = {key: value for key, value in old.items() if key not in ('bytes', 'byte_seconds')}
+        new = {'chars': chars, 'audio_seconds': audio, 'bytes': size, 'byte_seconds': audio if size else 0,
+               'wall_chars': chars if wall_seconds else 0, 'wall_seconds': wall_seconds or 0}
+        merged = {key: old.get(key, 0) * DECAY + value for key, value in new.items()}
+        merged['format'] = fmt
+        self.rates[voice] = merged
+        return True
@@ -0,0 +1,130 @@
+"""
+Kiểm tra SheetFetchCache + thứ tự public/OAuth của DataManager.load_google_sheet
+với 1 HTTP server local (không cần mạng / Google).
+
+Chạy: python -m pytest tests  hoặc  python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.data_manager import DataManager  # noqa: E402
+from src.utils.data_cache import SheetFetchCache  # noqa: E402
+
+SHEET_ID = 'sheet123'
+
+
+class _FakeSheetHandler(BaseHTTPRequestHandler):
+    """Giả lập export CSV của Google: trả 304 khi ETag khớp, trang đăng nhập HTML khi sheet private"""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers.get('If-None-Match')))
+        if server.private:
+            body = b"<html><body>Sign in</body></html>"
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+        elif self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.send_header('ETag', server.etag)
+            self.end_headers()
+            return
+        else:
+            body = server.body
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv')
+            self.send_header('ETag', server.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SheetFetchCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _FakeSheetHandler)
+        self.server.requests = []
+        self.server.private = False
+        self.server.etag = '"v1"'
+        self.server.body = b"ID,English\nd1,Hello\n"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = SheetFetchCache(cache_dir=self.cache_dir, timeout=5)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/spreadsheets/d"
+
+        self.private_calls = []
+        self.data_manager = DataManager(use_cache=False)
+        self.data_manager.sheet_cache = self.cache
+        self.data_manager.sheet_base_url = self.base_url
+        # OAuth thật cần trình duyệt → thay bằng loader ghi lại lời gọi
+        self.data_manager._load_private_sheet = (
+            lambda sheet_id, worksheet_index, skip_rows: self.private_calls.append((sheet_id, worksheet_index)))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _url(self):
+        return f"{self.base_url}/{SHEET_ID}/export?format=csv"
+
+    def test_not_modified_reloads_from_cache(self):
+        body, from_cache = self.cache.fetch(self._url(), SHEET_ID)
+        self.assertEqual(body, self.server.body)
+        self.assertFalse(from_cache)
+
+        body, from_cache = self.cache.fetch(self._url(), SHEET_ID)
+        self.assertEqual(body, self.server.body)
+        self.assertTrue(from_cache)
+        self.assertEqual(self.server.requests[-1][1], '"v1"')
+
+    def test_new_etag_refreshes_body(self):
+        self.data_manager.load_google_sheet(SHEET_ID, skip_rows=0)
+        self.assertEqual(self.data_manager.df.iloc[0, 1], 'Hello')
+
+        self.server.etag = '"v2"'
+        self.server.body = b"ID,English\nd1,Goodbye\n"
+        body, from_cache = self.cache.fetch(self._url(), SHEET_ID)
+        self.assertFalse(from_cache)
+        self.assertEqual(body, self.server.body)
+
+        self.data_manager.load_google_sheet(SHEET_ID, skip_rows=0)
+        self.assertEqual(self.data_manager.df.iloc[0, 1], 'Goodbye')
+        self.assertEqual(self.cache.get_access(SHEET_ID), 'public')
+        self.assertEqual(self.private_calls, [])
+
+    def test_html_login_page_falls_through_to_oauth(self):
+        self.server.private = True
+        with self.assertRaises(PermissionError):
+            self.cache.fetch(self._url(), SHEET_ID)
+
+        self.assertTrue(self.data_manager.load_google_sheet(SHEET_ID, skip_rows=0))
+        self.assertEqual(self.private_calls, [(SHEET_ID, 0)])
+        self.assertEqual(self.cache.get_access(SHEET_ID), 'private')
+
+        # Lần sau thử OAuth trước, không tải lại trang đăng nhập
+        requests = len(self.server.requests)
+        self.data_manager.load_google_sheet(SHEET_ID, skip_rows=0)
+        self.assertEqual(len(self.server.requests), requests)
+
+    def test_other_worksheet_goes_straight_to_oauth(self):
+        for worksheet in (1, 'Sheet2', [0, 1], None):
+            self.data_manager.load_google_sheet(SHEET_ID, worksheet_index=worksheet, skip_rows=0)
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(self.private_calls, [(SHEET_ID, 1), (SHEET_ID, 'Sheet2'),
+                                              (SHEET_ID, [0, 1]), (SHEET_ID, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()